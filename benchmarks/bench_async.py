@@ -0,0 +1,83 @@
+import sys
+import os
+import time
+import asyncio
+import random
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import FastAPI, HTTPException
+from schemas.models import User, Enrollment, EnrollmentCreate, UserCreate, CourseCreate
+from services.dependencies import get_services
+from main import app as async_app
+
+CONCURRENCY = 1_000
+REQUESTS = 20_000
+
+
+def build_sync_app() -> FastAPI:
+    user_service, _, enrollment_service = get_services()
+    sync_app = FastAPI()
+
+    @sync_app.get("/users/{user_id}", response_model=User)
+    def get_user(user_id: str):
+        user = user_service.get_user(user_id)
+        if not user:
+            raise HTTPException(status_code=404)
+        return user
+
+    @sync_app.post("/enrollments/", response_model=Enrollment, status_code=201)
+    def enroll_user(enrollment_data: EnrollmentCreate):
+        enrollment = enrollment_service.enroll_user(enrollment_data)
+        if not enrollment:
+            raise HTTPException(status_code=400)
+        return enrollment
+
+    return sync_app
+
+
+def seed():
+    user_service, course_service, _ = get_services()
+    users = user_service.create_users([UserCreate(name=f"A{i}", email=f"a{i}@example.com") for i in range(5_000)])
+    courses = course_service.create_courses([CourseCreate(title=f"C{i}", description="bench") for i in range(200)])
+    return [u.id for u in users], [c.id for c in courses]
+
+
+async def drive(app, user_ids, course_ids):
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+    queue = asyncio.Queue()
+    for i in range(REQUESTS):
+        queue.put_nowait(i)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            while not queue.empty():
+                i = queue.get_nowait()
+                start = time.perf_counter()
+                if i % 5 == 0:
+                    await client.post("/enrollments/", json={"user_id": random.choice(user_ids), "course_id": random.choice(course_ids)})
+                else:
+                    await client.get(f"/users/{random.choice(user_ids)}")
+                latencies.append(time.perf_counter() - start)
+
+        began = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+        elapsed = time.perf_counter() - began
+
+    latencies.sort()
+    return REQUESTS / elapsed, statistics.median(latencies), latencies[int(len(latencies) * 0.99)]
+
+
+def main():
+    user_ids, course_ids = seed()
+    print(f"{'path':>6} {'req/s':>10} {'p50_ms':>8} {'p99_ms':>8}  ({CONCURRENCY} concurrent)")
+    for name, app in (("sync", build_sync_app()), ("async", async_app)):
+        rate, p50, p99 = asyncio.run(drive(app, user_ids, course_ids))
+        print(f"{name:>6} {rate:>10,.0f} {p50 * 1e3:>8.1f} {p99 * 1e3:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
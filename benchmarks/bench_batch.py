@@ -0,0 +1,53 @@
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+from main import app
+
+ITEMS = 5_000
+BATCH_SIZE = 1_000
+
+
+def rate(count: int, elapsed: float) -> str:
+    return f"{count / elapsed:>10,.0f} items/s"
+
+
+def main(items: int):
+    client = TestClient(app)
+    users = [{"name": f"Bench {i}", "email": f"bench{i}@example.com"} for i in range(items)]
+    batch_users_data = [{"name": f"Batch {i}", "email": f"batch{i}@example.com"} for i in range(items)]
+    course_id = client.post("/courses/", json={"title": "Bench", "description": "Bench"}).json()["id"]
+
+    start = time.perf_counter()
+    single_ids = [client.post("/users/", json=user).json()["id"] for user in users]
+    single_users = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch_ids = []
+    for offset in range(0, items, BATCH_SIZE):
+        results = client.post("/users/batch", json=batch_users_data[offset:offset + BATCH_SIZE]).json()
+        batch_ids.extend(result["id"] for result in results)
+    batch_users = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for user_id in single_ids:
+        client.post("/enrollments/", json={"user_id": user_id, "course_id": course_id})
+    single_enroll = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for offset in range(0, items, BATCH_SIZE):
+        chunk = batch_ids[offset:offset + BATCH_SIZE]
+        client.post("/enrollments/batch", json=[{"user_id": user_id, "course_id": course_id} for user_id in chunk])
+    batch_enroll = time.perf_counter() - start
+
+    print(f"POST /users/             {rate(items, single_users)}")
+    print(f"POST /users/batch        {rate(items, batch_users)}  ({single_users / batch_users:.1f}x)")
+    print(f"POST /enrollments/       {rate(items, single_enroll)}")
+    print(f"POST /enrollments/batch  {rate(items, batch_enroll)}  ({single_enroll / batch_enroll:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else ITEMS)
@@ -0,0 +1,57 @@
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from schemas.models import UserCreate, CourseCreate, EnrollmentCreate
+from services.business_logic import UserService, CourseService, EnrollmentService
+from services.storage import create_backend
+
+ENROLLMENTS = 50_000
+PROBES = 200
+
+
+def main(enrollments: int, backend_name: str):
+    backend = create_backend(
+        "memory" if backend_name == "compact" else backend_name,
+        sqlite_path="bench_cascade.db",
+        sqlite_pool_size=4,
+        compact_enrollments=backend_name == "compact"
+    )
+    user_service = UserService(backend.users)
+    course_service = CourseService(backend.courses)
+    enrollment_service = EnrollmentService(user_service, course_service, backend.enrollments)
+    course = course_service.create_course(CourseCreate(title="Fan-out", description="Fan-out"))
+    other = course_service.create_course(CourseCreate(title="Other", description="Other"))
+    users = user_service.create_users([UserCreate(name=f"U{i}", email=f"u{i}@example.com") for i in range(enrollments)])
+    enrollment_service.enroll_users([EnrollmentCreate(user_id=user.id, course_id=course.id) for user in users])
+    enrollment_service.enroll_users([EnrollmentCreate(user_id=user.id, course_id=other.id) for user in users[:PROBES]])
+
+    start = time.perf_counter()
+    course_service.delete_course(course.id)
+    delete_ms = (time.perf_counter() - start) * 1000
+
+    probes = []
+    while enrollment_service.compactor.pending():
+        probe = time.perf_counter()
+        enrollment_service.get_user_enrollments(users[len(probes) % PROBES].id)
+        probes.append(time.perf_counter() - probe)
+    enrollment_service.compactor.drain()
+    status = enrollment_service.compaction_status()
+    probes.sort()
+
+    print(f"DELETE course with {enrollments:,} enrollments ({backend_name})")
+    print(f"  request latency            {delete_ms:>9.2f} ms")
+    print(f"  background purge           {status.busy_seconds * 1000:>9.2f} ms in {status.batches} batches")
+    if probes:
+        print(f"  reads during purge  p50    {probes[len(probes) // 2] * 1000:>9.3f} ms   p99 {probes[int(len(probes) * 0.99)] * 1000:.3f} ms")
+    backend.close()
+    if backend_name == "sqlite":
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists("bench_cascade.db" + suffix):
+                os.remove("bench_cascade.db" + suffix)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else ENROLLMENTS, sys.argv[2] if len(sys.argv) > 2 else "memory")
@@ -0,0 +1,82 @@
+import sys
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("EDUTRACK_STORAGE", "sqlite")
+os.environ.setdefault("EDUTRACK_SQLITE_PATH", os.path.join(tempfile.mkdtemp(), "contention.db"))
+os.environ.setdefault("EDUTRACK_ADMISSION", "0")
+
+import httpx
+from main import app
+
+USERS = 4_000
+CAPACITY = 500
+COLD_COURSES = 50
+
+
+async def seed(client: httpx.AsyncClient, users: int, capacity: int) -> Dict[str, List[str]]:
+    run_id = time.time_ns()
+    user_ids: List[str] = []
+    for offset in range(0, users, 1000):
+        batch = [{"name": f"Rush {i}", "email": f"rush-{run_id}-{i}@example.com"} for i in range(offset, min(offset + 1000, users))]
+        user_ids.extend(item["id"] for item in (await client.post("/users/batch", json=batch)).json())
+    hot = (await client.post("/courses/", json={"title": "Hot", "description": "rush", "capacity": capacity})).json()["id"]
+    cold = [item["id"] for item in (await client.post("/courses/batch", json=[
+        {"title": f"Cold {i}", "description": "rush"} for i in range(COLD_COURSES)
+    ])).json()]
+    return {"users": user_ids, "hot": [hot], "cold": cold}
+
+
+async def rush(client: httpx.AsyncClient, pairs: List[tuple]) -> Dict[int, int]:
+    statuses: Dict[int, int] = {}
+
+    async def enroll(user_id: str, course_id: str):
+        response = await client.post("/enrollments/", json={"user_id": user_id, "course_id": course_id})
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    await asyncio.gather(*(enroll(user_id, course_id) for user_id, course_id in pairs))
+    return statuses
+
+
+def report(label: str, count: int, elapsed: float, statuses: Dict[int, int]) -> None:
+    print(f"{label:<34} {count:>7,} enrolls {count / elapsed:>9,.0f}/s  {dict(sorted(statuses.items()))}")
+
+
+async def run(users: int, capacity: int) -> None:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        ids = await seed(client, users, capacity)
+        hot = ids["hot"][0]
+        half = users // 2
+
+        start = time.perf_counter()
+        statuses = await rush(client, [(user_id, hot) for user_id in ids["users"][:half]])
+        report("hot course alone", half, time.perf_counter() - start, statuses)
+
+        cold = ids["cold"]
+        pairs = [(user_id, hot) for user_id in ids["users"][half:]]
+        pairs += [(user_id, cold[i % len(cold)]) for i, user_id in enumerate(ids["users"][:half])]
+        start = time.perf_counter()
+        statuses = await rush(client, pairs)
+        report("hot course + 50 cold courses", len(pairs), time.perf_counter() - start, statuses)
+
+        roster = (await client.get(f"/courses/{hot}/users")).json()
+        waitlist = (await client.get(f"/courses/{hot}/waitlist")).json()
+        print(f"hot course seats taken {len(roster):,} of {capacity:,}, waitlist {len(waitlist):,}")
+        assert len(roster) == min(capacity, users)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent POST /enrollments/ against one capped course")
+    parser.add_argument("users", type=int, nargs="?", default=USERS)
+    parser.add_argument("--capacity", type=int, default=CAPACITY)
+    args = parser.parse_args()
+    asyncio.run(run(args.users, args.capacity))
+
+
+if __name__ == "__main__":
+    main()
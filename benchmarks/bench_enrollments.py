@@ -0,0 +1,68 @@
+import sys
+import os
+import time
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from schemas.models import UserCreate, CourseCreate, EnrollmentCreate
+from services.business_logic import UserService, CourseService, EnrollmentService
+
+COURSES = 1000
+SAMPLES = 2000
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 5_000_000]
+
+
+def build_services(max_size: int):
+    user_service = UserService()
+    course_service = CourseService()
+    enrollment_service = EnrollmentService(user_service, course_service)
+    course_ids = [
+        course_service.create_course(CourseCreate(title=f"Course {i}", description="bench")).id
+        for i in range(COURSES)
+    ]
+    user_count = (max_size + SAMPLES) // COURSES + 1
+    user_ids = [
+        user_service.create_user(UserCreate(name=f"User {i}", email=f"user{i}@example.com")).id
+        for i in range(user_count)
+    ]
+    return enrollment_service, user_ids, course_ids
+
+
+def enroll_pairs(user_ids, course_ids):
+    for user_id in user_ids:
+        for course_id in course_ids:
+            yield EnrollmentCreate(user_id=user_id, course_id=course_id)
+
+
+def main(sizes):
+    enrollment_service, user_ids, course_ids = build_services(max(sizes))
+    pairs = enroll_pairs(user_ids, course_ids)
+
+    print(f"{'enrollments':>12} {'mean_us':>10} {'p50_us':>10} {'p99_us':>10} {'dup_check_us':>13}")
+    for size in sorted(sizes):
+        while len(enrollment_service.enrollments) < size:
+            enrollment_service.enroll_user(next(pairs))
+
+        latencies = []
+        for _ in range(SAMPLES):
+            data = next(pairs)
+            start = time.perf_counter()
+            enrollment_service.enroll_user(data)
+            latencies.append((time.perf_counter() - start) * 1e6)
+
+        start = time.perf_counter()
+        for _ in range(SAMPLES):
+            enrollment_service.enroll_user(data)
+        duplicate = (time.perf_counter() - start) * 1e6 / SAMPLES
+
+        latencies.sort()
+        print(
+            f"{size:>12,} {statistics.fmean(latencies):>10.2f} "
+            f"{latencies[len(latencies) // 2]:>10.2f} "
+            f"{latencies[int(len(latencies) * 0.99)]:>10.2f} {duplicate:>13.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
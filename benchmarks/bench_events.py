@@ -0,0 +1,69 @@
+import sys
+import os
+import time
+import asyncio
+import threading
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from schemas.models import Enrollment
+from services.async_services import AsyncEventFeed
+from services.events import EventLog
+from routes.events import EventQuery, event_batches
+
+SUBSCRIBERS = [100, 1_000, 5_000]
+EVENTS = 2_000
+BURST = 10
+PAUSE = 0.01
+
+
+def publish(log: EventLog, stamps: list) -> None:
+    enrollment = Enrollment(id="e", user_id="u", course_id="c")
+    for i in range(EVENTS):
+        stamps.append(time.perf_counter())
+        log.publish("enrollment.created", enrollment)
+        if i % BURST == BURST - 1:
+            time.sleep(PAUSE)
+
+
+async def fan_out(subscribers: int):
+    log = EventLog()
+    feed = AsyncEventFeed(log, blocking=False)
+    stamps: list = []
+    lags: list = []
+    done = asyncio.Event()
+    remaining = [subscribers]
+
+    async def subscriber():
+        query = EventQuery(0, None, True)
+        async for _, events in event_batches(feed, query, 0):
+            now = time.perf_counter()
+            lags.extend(now - stamps[seq - 1] for seq, _, _ in events[::BURST])
+            if events and events[-1][0] == EVENTS:
+                remaining[0] -= 1
+                if not remaining[0]:
+                    done.set()
+                return
+
+    tasks = [asyncio.create_task(subscriber()) for _ in range(subscribers)]
+    await asyncio.sleep(0.1)
+    began = time.perf_counter()
+    threading.Thread(target=publish, args=(log, stamps)).start()
+    await done.wait()
+    elapsed = time.perf_counter() - began
+    await asyncio.gather(*tasks)
+    lags.sort()
+    return subscribers * EVENTS / elapsed, statistics.median(lags), lags[int(len(lags) * 0.99)]
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or SUBSCRIBERS
+    print(f"{'subscribers':>11} {'deliveries/s':>14} {'p50_lag_ms':>11} {'p99_lag_ms':>11}  ({EVENTS} events, {BURST / PAUSE:,.0f}/s in bursts of {BURST})")
+    for size in sizes:
+        rate, p50, p99 = asyncio.run(fan_out(size))
+        print(f"{size:>11} {rate:>14,.0f} {p50 * 1e3:>11.2f} {p99 * 1e3:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import sys
+import os
+import time
+import asyncio
+import argparse
+import statistics
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from schemas.models import CourseCreate, Enrollment, EnrollmentCreate, UserCreate
+from services.async_services import AsyncEnrollmentService
+from services.business_logic import UserService, CourseService, EnrollmentService, new_id
+from services.dependencies import get_services
+from main import app
+
+ENROLLMENTS_PER_USER = 20
+DASHBOARDS = 200
+CONCURRENT_READS = 200
+REPORT_ROWS = 200_000
+
+
+def seed_dashboards():
+    user_service, course_service, enrollment_service = get_services()
+    users = user_service.create_users([UserCreate(name=f"D{i}", email=f"dash-{i}@example.com") for i in range(DASHBOARDS)])
+    courses = course_service.create_courses([CourseCreate(title=f"Course {i}", description="bench") for i in range(100)])
+    enrollment_service.enroll_users([
+        EnrollmentCreate(user_id=user.id, course_id=courses[(i * 7 + j) % len(courses)].id)
+        for i, user in enumerate(users) for j in range(ENROLLMENTS_PER_USER)
+    ])
+    return [user.id for user in users]
+
+
+async def n_plus_one(client: httpx.AsyncClient, user_id: str) -> int:
+    enrollments = (await client.get(f"/enrollments/user/{user_id}")).json()
+    await asyncio.gather(*(client.get(f"/courses/{enrollment['course_id']}") for enrollment in enrollments))
+    return 1 + len(enrollments)
+
+
+async def lookup(client: httpx.AsyncClient, user_id: str) -> int:
+    enrollments = (await client.get(f"/enrollments/user/{user_id}")).json()
+    await client.post("/courses/lookup", json=[enrollment["course_id"] for enrollment in enrollments])
+    return 2
+
+
+async def expand(client: httpx.AsyncClient, user_id: str) -> int:
+    await client.get(f"/enrollments/user/{user_id}", params={"expand": "course"})
+    return 1
+
+
+async def dashboards(user_ids) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, render in (("N+1 course reads", n_plus_one), ("/courses/lookup", lookup), ("?expand=course", expand)):
+            latencies, requests = [], 0
+            for user_id in user_ids:
+                started = time.perf_counter()
+                requests += await render(client, user_id)
+                latencies.append((time.perf_counter() - started) * 1000)
+            print(
+                f"dashboard {name:<18} {requests / len(user_ids):>5.1f} requests/page   "
+                f"p50 {statistics.median(latencies):>7.2f} ms   p99 {sorted(latencies)[int(len(latencies) * 0.99)]:>7.2f} ms"
+            )
+
+
+def report_service(rows: int) -> EnrollmentService:
+    service = EnrollmentService(UserService(), CourseService())
+    start = datetime(2024, 1, 1)
+    service.enrollments.put_many([
+        Enrollment.model_construct(
+            id=new_id(), user_id=f"user-{i}", course_id=f"course-{i % 500}", enrolled_date=start + timedelta(minutes=i), completed=i % 3 == 0
+        )
+        for i in range(rows)
+    ])
+    service.rebuild()
+    return service
+
+
+async def hot_reads(service: EnrollmentService, coalesce: bool) -> None:
+    facade = AsyncEnrollmentService(service, True, coalesce)
+    since = datetime(2024, 1, 1)
+    calls = 0
+    original = service.course_reports
+
+    def counted(*args):
+        nonlocal calls
+        calls += 1
+        return original(*args)
+
+    service.course_reports = counted
+    started = time.perf_counter()
+    await asyncio.gather(*(facade.course_reports(since) for _ in range(CONCURRENT_READS)))
+    elapsed = time.perf_counter() - started
+    service.course_reports = original
+    label = "coalesced" if coalesce else "independent"
+    print(f"{CONCURRENT_READS} concurrent bounded reports, {label:<12} {calls:>4} store calls   {elapsed * 1000:>8.1f} ms total")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dashboard round trips with lookup/expand, and hot-read coalescing")
+    parser.add_argument("--rows", type=int, default=REPORT_ROWS, help="Enrollments behind the coalesced report")
+    args = parser.parse_args()
+    asyncio.run(dashboards(seed_dashboards()))
+    service = report_service(args.rows)
+    for coalesce in (False, True):
+        asyncio.run(hot_reads(service, coalesce))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import sys
+import os
+import gc
+import json
+import resource
+import subprocess
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from schemas.models import CourseCreate, EnrollmentCreate, UserCreate
+from services.business_logic import CourseService, EnrollmentService, UserService
+from services.storage import MemoryEnrollmentCollection
+from services.columnar import CompactEnrollmentCollection
+
+DEFAULT_ROWS = 10_000_000
+PYDANTIC_DEFAULT_ROWS = 1_000_000
+ENROLLMENTS_PER_USER = 8
+COURSES = 5_000
+CHUNK = 10_000
+
+
+def seed(rows: int):
+    user_service, course_service = UserService(), CourseService()
+    users = []
+    for offset in range(0, rows // ENROLLMENTS_PER_USER + 1, CHUNK):
+        count = min(CHUNK, rows // ENROLLMENTS_PER_USER + 1 - offset)
+        users.extend(user.id for user in user_service.create_users([
+            UserCreate(name=f"U{offset + i}", email=f"u{offset + i}@example.com") for i in range(count)
+        ]))
+    courses = [course.id for course in course_service.create_courses([
+        CourseCreate(title=f"C{i}", description="bench") for i in range(COURSES)
+    ])]
+    return user_service, course_service, users, courses
+
+
+def fill(service: EnrollmentService, users, courses, rows: int) -> None:
+    for offset in range(0, rows, CHUNK):
+        service.enroll_users([
+            EnrollmentCreate(user_id=users[row // ENROLLMENTS_PER_USER], course_id=courses[row % COURSES])
+            for row in range(offset, min(offset + CHUNK, rows))
+        ])
+        if offset // CHUNK % 5 == 4:
+            service.mark_completion(service.get_user_enrollments(users[offset // ENROLLMENTS_PER_USER])[0].id)
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def measure(kind: str, rows: int) -> None:
+    factories = {"pydantic": MemoryEnrollmentCollection, "compact": CompactEnrollmentCollection}
+    user_service, course_service, users, courses = seed(rows)
+    gc.collect()
+    baseline = rss_bytes()
+    began = time.perf_counter()
+    service = EnrollmentService(user_service, course_service, factories[kind]())
+    fill(service, users, courses, rows)
+    elapsed = time.perf_counter() - began
+    gc.collect()
+    print(json.dumps({"bytes": rss_bytes() - baseline, "seconds": elapsed, "rows": service.count()}))
+
+
+def main(sizes: Dict[str, int]):
+    results = {}
+    print(f"{'store':>10} {'rows':>12} {'MB':>10} {'bytes/row':>10} {'fill_s':>8}")
+    for kind, rows in sizes.items():
+        output = subprocess.run(
+            [sys.executable, __file__, "--measure", kind, str(rows)], check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        results[kind] = result["bytes"] / rows
+        print(f"{kind:>10} {rows:>12,} {result['bytes'] / 1e6:>10.1f} {result['bytes'] / rows:>10.1f} {result['seconds']:>8.1f}")
+    if len(results) == 2:
+        print(f"reduction per row: {results['pydantic'] / results['compact']:.1f}x")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--measure"]:
+        measure(sys.argv[2], int(sys.argv[3]))
+    else:
+        args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+        rows = int(args[0]) if args else DEFAULT_ROWS
+        sizes = {} if "--compact-only" in sys.argv else {"pydantic": rows if args else PYDANTIC_DEFAULT_ROWS}
+        sizes["compact"] = rows
+        main(sizes)
@@ -0,0 +1,94 @@
+import sys
+import os
+import time
+import asyncio
+import random
+import argparse
+import tempfile
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("EDUTRACK_STORAGE", "sqlite")
+os.environ.setdefault("EDUTRACK_SQLITE_PATH", os.path.join(tempfile.mkdtemp(), "overload.db"))
+
+import httpx
+import harness
+from load_test import seed
+from main import app
+
+USERS = 20_000
+COURSES = 200
+READ_RATE = 200
+SCAN_RATE = 200
+
+
+async def arrivals(rate: float, seconds: float, rng: random.Random, request) -> List[asyncio.Task]:
+    tasks: List[asyncio.Task] = []
+    start = time.perf_counter()
+    due = start
+    while due - start < seconds:
+        due += rng.expovariate(rate)
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        tasks.append(asyncio.create_task(request(time.perf_counter())))
+    return tasks
+
+
+async def flood(client: httpx.AsyncClient, ids: Dict[str, List[str]], seconds: float, read_rate: float, scan_rate: float) -> Dict[str, float]:
+    reads: List[float] = []
+    counts = {"scan_ok": 0, "scan_shed": 0, "read_shed": 0}
+    rng = random.Random(0)
+
+    async def read(issued: float):
+        response = await client.get(f"/users/{rng.choice(ids['users'])}")
+        reads.append(time.perf_counter() - issued)
+        if response.status_code == 503:
+            counts["read_shed"] += 1
+
+    async def scan(issued: float):
+        response = await client.get("/users/")
+        counts["scan_shed" if response.status_code == 503 else "scan_ok"] += 1
+
+    began = time.perf_counter()
+    batches = await asyncio.gather(
+        arrivals(read_rate, seconds, random.Random(1), read),
+        arrivals(scan_rate, seconds, random.Random(2), scan)
+    )
+    await asyncio.gather(*(task for tasks in batches for task in tasks))
+    result = harness.summarize(reads, time.perf_counter() - began, "req_per_s")
+    result.update(counts)
+    return result
+
+
+async def run_async(seconds: float, read_rate: float, scan_rate: float) -> Dict[str, Dict[str, float]]:
+    controller = app.state.admission
+    if controller is None:
+        raise SystemExit("admission control is disabled (EDUTRACK_ADMISSION=0)")
+    limiters = controller.limiters
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://overload") as client:
+        ids = await seed(client, USERS, COURSES)
+        results = {}
+        for mode, active in (("unlimited", {}), ("admission", limiters)):
+            controller.limiters = active
+            results[mode] = await flood(client, ids, seconds, read_rate, scan_rate)
+        controller.limiters = limiters
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Point-read latency while a scan flood saturates the app, with and without admission control")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--read-rate", type=float, default=READ_RATE, help="point reads per second")
+    parser.add_argument("--scan-rate", type=float, default=SCAN_RATE, help="full user-list scans per second")
+    args = parser.parse_args()
+    results = asyncio.run(run_async(args.seconds, args.read_rate, args.scan_rate))
+    print(f"{'mode':<10} {'reads':>7} {'read_p50_ms':>12} {'read_p99_ms':>12} {'scans_ok':>9} {'scans_shed':>11} {'reads_shed':>11}")
+    for mode, result in results.items():
+        print(
+            f"{mode:<10} {result['calls']:>7,} {result['p50_ms']:>12.2f} {result['p99_ms']:>12.2f} "
+            f"{result['scan_ok']:>9,} {result['scan_shed']:>11,} {result['read_shed']:>11,}"
+        )
+
+
+if __name__ == "__main__":
+    main()
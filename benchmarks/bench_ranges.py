@@ -0,0 +1,83 @@
+import sys
+import os
+import uuid
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+from typing import Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import harness
+from schemas.models import Enrollment
+from services.business_logic import UserService, CourseService, EnrollmentService, new_id, time_ordered_id
+from services.storage import StorageBackend, create_backend
+
+SIZES = [10_000, 100_000, 1_000_000]
+WINDOW = timedelta(hours=1)
+PAGE = 100
+CHUNK = 50_000
+START = datetime(2024, 1, 1)
+SPAN = timedelta(days=365)
+
+
+def build(backend_name: str, size: int, path: str) -> Tuple[StorageBackend, EnrollmentService]:
+    backend = create_backend(
+        "memory" if backend_name == "compact" else backend_name, sqlite_path=path, compact_enrollments=backend_name == "compact"
+    )
+    step = SPAN / size
+    for offset in range(0, size, CHUNK):
+        backend.enrollments.put_many([
+            Enrollment.model_construct(
+                id=str(uuid.uuid4()), user_id=f"user-{i}", course_id=f"course-{i % 100}",
+                enrolled_date=START + step * i, completed=False
+            )
+            for i in range(offset, min(offset + CHUNK, size))
+        ])
+    user_service, course_service = UserService(backend.users), CourseService(backend.courses)
+    return backend, EnrollmentService(user_service, course_service, backend.enrollments)
+
+
+def full_scan(service: EnrollmentService, since: datetime, until: datetime):
+    matches = [enrollment for enrollment in service.get_all_enrollments() if since <= enrollment.enrolled_date < until]
+    return sorted(matches, key=lambda enrollment: enrollment.enrolled_date)[:PAGE]
+
+
+def windows(count: int):
+    rng = random.Random(7)
+    return [START + SPAN * rng.random() for _ in range(count)]
+
+
+def run(backend_name: str, size: int) -> None:
+    with tempfile.TemporaryDirectory(prefix="edutrack-ranges-") as directory:
+        backend, service = build(backend_name, size, os.path.join(directory, "edutrack.db"))
+        starts = windows(2000)
+        indexed = harness.measure(lambda i: service.list_enrollments_between(starts[i], starts[i] + WINDOW, PAGE), budget=1.0)
+        scanned = harness.measure(lambda i: full_scan(service, starts[i], starts[i] + WINDOW), budget=1.0, min_calls=3, max_calls=20)
+        print(
+            f"{backend_name:<8} {size:>10,}  index p50 {indexed['p50_ms']:>8.3f} ms  p99 {indexed['p99_ms']:>8.3f} ms"
+            f"   scan+sort p50 {scanned['p50_ms']:>10.1f} ms"
+        )
+        backend.close()
+
+
+def id_rates() -> None:
+    for name, factory in (("uuid4", new_id), ("uuid7", time_ordered_id)):
+        result = harness.measure(lambda _: [factory() for _ in range(1000)], budget=0.5)
+        print(f"{name} ids                 {1000 / (result['p50_ms'] / 1000):>12,.0f} ids/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Date-range page latency: sorted index vs. full scan and sort")
+    parser.add_argument("sizes", type=int, nargs="*", default=SIZES)
+    parser.add_argument("--backends", nargs="+", default=["memory", "compact", "sqlite"])
+    args = parser.parse_args()
+    for backend_name in args.backends:
+        for size in args.sizes:
+            run(backend_name, size)
+    id_rates()
+
+
+if __name__ == "__main__":
+    main()
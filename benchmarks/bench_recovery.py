@@ -0,0 +1,106 @@
+import sys
+import os
+import time
+import uuid
+import shutil
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import harness
+from schemas.models import User, Course, Enrollment, EnrollmentCreate
+from services.business_logic import UserService, CourseService, EnrollmentService
+from services.durability import DurableBackend
+from services.storage import MemoryBackend
+
+ENROLLMENTS = 5_000_000
+USERS = 100_000
+COURSES = 1_000
+TAIL = 20_000
+CHUNK = 100_000
+WRITERS = 32
+
+
+def open_store(directory: str, compact: bool):
+    backend = DurableBackend(MemoryBackend(compact), directory, snapshot_interval=1e9, snapshot_bytes=1 << 62)
+    backend.progress.enter("indexes")
+    user_service = UserService(backend.users)
+    course_service = CourseService(backend.courses)
+    enrollment_service = EnrollmentService(user_service, course_service, backend.enrollments)
+    started = time.perf_counter()
+    reaped = enrollment_service.reap_orphans()
+    backend.progress.finish()
+    return backend, (user_service, course_service, enrollment_service), (time.perf_counter() - started, reaped)
+
+
+def populate(directory: str, enrollments: int, compact: bool) -> None:
+    backend, _, _ = open_store(directory, compact)
+    inner = backend.inner
+    users = [User.model_construct(id=str(uuid.uuid4()), name=f"Recovery {i}", email=f"recovery-{i}@example.com", is_active=True) for i in range(USERS)]
+    courses = [Course.model_construct(id=str(uuid.uuid4()), title=f"Course {i}", description="recovery", is_open=True) for i in range(COURSES)]
+    inner.users.put_many(users)
+    inner.courses.put_many(courses)
+    start = datetime(2024, 1, 1)
+    for offset in range(0, enrollments, CHUNK):
+        inner.enrollments.put_many([
+            Enrollment.model_construct(
+                id=str(uuid.uuid4()), user_id=users[i % USERS].id, course_id=courses[(i // USERS) % COURSES].id,
+                enrolled_date=start + timedelta(minutes=i), completed=i % 3 == 0
+            )
+            for i in range(offset, min(offset + CHUNK, enrollments))
+        ])
+    started = time.perf_counter()
+    backend.snapshot()
+    print(f"snapshot written               {time.perf_counter() - started:>8.2f} s  {snapshot_size(directory) / 1e6:>8,.1f} MB")
+    backend.close()
+
+    backend, (user_service, course_service, enrollment_service), _ = open_store(directory, compact)
+    course_ids = [course.id for course in course_service.courses.values()[:COURSES]]
+    user_ids = [user.id for user in user_service.users.values()[:TAIL]]
+    requests = [EnrollmentCreate(user_id=user_id, course_id=course_ids[(i + 7) % COURSES]) for i, user_id in enumerate(user_ids)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(WRITERS) as pool:
+        written = sum(1 for enrollment in pool.map(enrollment_service.enroll_user, requests) if enrollment is not None)
+    elapsed = time.perf_counter() - started
+    journal = backend.journal
+    print(f"journal tail ({WRITERS} writers)        {elapsed:>8.2f} s  {written / elapsed:>8,.0f} writes/s  {journal.records / max(1, journal.commits):,.1f} records/fsync")
+    backend.close()
+
+
+def snapshot_size(directory: str) -> int:
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory) if name.endswith(".snap"))
+
+
+def restart(directory: str, compact: bool) -> None:
+    started = time.perf_counter()
+    backend, (_, _, enrollment_service), (reaping, reaped) = open_store(directory, compact)
+    ready = time.perf_counter() - started
+    progress = backend.progress
+    print(f"restart to ready               {ready:>8.2f} s  {progress.rows_loaded:>10,} snapshot rows  {progress.journal_records:,} journal records")
+    print(f"orphan reap (within ready)     {reaping:>8.2f} s  {reaped:>10,} orphans")
+    print(f"enrollments after recovery     {len(enrollment_service.enrollments):>10,}  peak RSS {harness.peak_rss_mb():,.0f} MB")
+    backend.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Restart-to-ready time from a snapshot plus journal tail")
+    parser.add_argument("enrollments", type=int, nargs="?", default=ENROLLMENTS)
+    parser.add_argument("--dict-store", action="store_true", help="Use the model-per-row enrollment store instead of the compact columns")
+    parser.add_argument("--directory", help="Reuse an existing data directory instead of building one")
+    args = parser.parse_args()
+    compact = not args.dict_store
+    directory = args.directory or tempfile.mkdtemp(prefix="edutrack-recovery-")
+    try:
+        if not args.directory:
+            populate(directory, args.enrollments, compact)
+        restart(directory, compact)
+    finally:
+        if not args.directory:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import sys
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from schemas.models import Enrollment
+from services import analytics
+from services.business_logic import UserService, CourseService, EnrollmentService
+from services.columnar import CompactEnrollmentCollection
+
+ROWS = 1_000_000
+COURSES = 1_000
+CHUNK = 100_000
+
+
+def timed(label: str, fn, repeat: int = 5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"  {label:<44} {best * 1000:>10.2f} ms")
+    return result
+
+
+def main(rows: int):
+    store = CompactEnrollmentCollection()
+    service = EnrollmentService(UserService(), CourseService(), store)
+    start_date = datetime(2025, 1, 1)
+    for offset in range(0, rows, CHUNK):
+        chunk = [
+            Enrollment.model_construct(
+                id=str(uuid.uuid4()), user_id=f"user-{i}", course_id=f"course-{i % COURSES}",
+                enrolled_date=start_date + timedelta(minutes=i % 525_600), completed=i % 3 == 0
+            )
+            for i in range(offset, min(offset + CHUNK, rows))
+        ]
+        store.put_many(chunk)
+        service.stats.added(chunk)
+
+    print(f"{rows:,} enrollments over {COURSES} courses (NumPy {'on' if analytics.numpy is not None else 'off'})")
+    timed("counters: one course", lambda: service.course_report("course-7"))
+    timed("counters: every course", service.course_reports)
+    timed("counters: daily histogram", service.daily_report)
+    since, until = datetime(2025, 3, 1), datetime(2025, 6, 1)
+    timed("columnar snapshot", store.columns, repeat=3)
+    service.course_reports(since, until)
+    timed("ad-hoc range, cached snapshot", lambda: service.course_reports(since, until), repeat=3)
+    timed("full scan of materialized models", lambda: sum(1 for e in store.values() if since <= e.enrolled_date < until), repeat=1)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else ROWS)
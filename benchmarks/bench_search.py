@@ -0,0 +1,52 @@
+import sys
+import os
+import random
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from schemas.models import UserCreate
+from services.business_logic import UserService
+
+USERS = 1_000_000
+CHUNK = 10_000
+QUERIES = 200
+FIRST_NAMES = ["ada", "alan", "grace", "linus", "barbara", "edsger", "donald", "margaret", "ken", "dennis"]
+
+
+def latency(service: UserService, queries, limit: int = 20):
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        service.search_users(query, limit)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2] * 1000, samples[int(len(samples) * 0.99)] * 1000
+
+
+def main(users: int):
+    rng = random.Random(42)
+    service = UserService()
+    surnames = [f"{rng.choice('bcdfghjklmnprstvz')}{rng.choice('aeiou')}{i:07d}" for i in range(users)]
+    start = time.perf_counter()
+    for offset in range(0, users, CHUNK):
+        service.create_users([
+            UserCreate(name=f"{FIRST_NAMES[i % len(FIRST_NAMES)]} {surnames[i]}", email=f"user{i}@example.com")
+            for i in range(offset, min(offset + CHUNK, users))
+        ])
+    print(f"Indexed {users:,} users in {time.perf_counter() - start:.1f}s")
+
+    picks = [rng.randrange(users) for _ in range(QUERIES)]
+    cases = [
+        ("exact surname", [surnames[i] for i in picks]),
+        ("surname prefix", [surnames[i][:6] for i in picks]),
+        ("email", [f"user{i}@example.com" for i in picks]),
+        ("first name + surname prefix", [f"{FIRST_NAMES[i % len(FIRST_NAMES)]} {surnames[i][:5]}" for i in picks]),
+    ]
+    for label, queries in cases:
+        p50, p99 = latency(service, queries)
+        print(f"  {label:<30} p50 {p50:>7.3f} ms   p99 {p99:>7.3f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else USERS)
@@ -0,0 +1,51 @@
+import sys
+import os
+import asyncio
+import json
+import timeit
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from schemas.models import User, UserCreate
+from routes.users import USER_LIST
+from services.business_logic import UserService
+from services.serialization import dumps
+
+USERS = 1_000
+NUMBER = 200
+REPEAT = 5
+
+
+def cpu_ms(fn, number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=REPEAT)) / number * 1000
+
+
+def main(users: int, number: int):
+    service = UserService()
+    service.create_users([UserCreate(name=f"Bench {i}", email=f"bench{i}@example.com") for i in range(users)])
+    items = service.get_all_users()
+    field = create_model_field(name="response", type_=List[User], mode="serialization")
+    loop = asyncio.new_event_loop()
+
+    def response_model(dump_json: bool):
+        return lambda: loop.run_until_complete(serialize_response(field=field, response_content=items, dump_json=dump_json))
+
+    cases = [
+        ("jsonable_encoder + json.dumps", lambda: json.dumps(jsonable_encoder(items)).encode()),
+        ("response_model + orjson", lambda: dumps(response_model(False)())),
+        ("response_model, dump_json", response_model(True)),
+        ("TypeAdapter.dump_json bytes", lambda: USER_LIST.dump_json(items)),
+    ]
+    results = [(name, cpu_ms(fn, number)) for name, fn in cases]
+    baseline = results[0][1]
+    print(f"Serializing {users} users per list response")
+    for name, ms in results:
+        print(f"  {name:<34} {ms:>8.3f} ms  ({baseline / ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else USERS, int(sys.argv[2]) if len(sys.argv) > 2 else NUMBER)
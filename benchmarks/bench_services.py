@@ -0,0 +1,125 @@
+import sys
+import os
+import argparse
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import harness
+from schemas.models import UserCreate, UserUpdate, CourseCreate, CourseUpdate, EnrollmentCreate
+from services.business_logic import UserService, CourseService, EnrollmentService
+from services.storage import create_backend
+
+SIZES = [1_000, 10_000, 100_000]
+CHUNK = 10_000
+PAGE = 100
+
+Case = Tuple[str, Callable[[int], object]]
+
+
+def build(size: int, backend_name: str):
+    backend = create_backend(
+        "memory" if backend_name == "compact" else backend_name,
+        sqlite_path=f"bench_services_{size}.db",
+        sqlite_pool_size=4,
+        compact_enrollments=backend_name == "compact"
+    )
+    users = UserService(backend.users)
+    courses = CourseService(backend.courses)
+    enrollments = EnrollmentService(users, courses, backend.enrollments)
+    course_ids = [c.id for c in courses.create_courses([CourseCreate(title=f"Course {i}", description=f"Topic {i % 97}") for i in range(max(10, size // 100))])]
+    user_ids: List[str] = []
+    for offset in range(0, size, CHUNK):
+        created = users.create_users([
+            UserCreate(name=f"User {i}", email=f"user{i}@example.com") for i in range(offset, min(offset + CHUNK, size))
+        ])
+        user_ids.extend(user.id for user in created)
+        enrollments.enroll_users([
+            EnrollmentCreate(user_id=user.id, course_id=course_ids[(offset + i) % len(course_ids)]) for i, user in enumerate(created)
+        ])
+    return backend, users, courses, enrollments, user_ids, course_ids
+
+
+def cases(users: UserService, courses: CourseService, enrollments: EnrollmentService, user_ids: List[str], course_ids: List[str]) -> List[Case]:
+    size = len(user_ids)
+    enrollment_ids = [e.id for e, _ in zip(enrollments.get_all_enrollments(), range(5_000))]
+    fresh_course = courses.create_course(CourseCreate(title="Fresh", description="Fresh")).id
+    bulk = lambda i: [UserCreate(name=f"Bulk {i}-{j}", email=f"bulk-{i}-{j}@example.com") for j in range(PAGE)]
+    pick = lambda i: user_ids[(i * 7919) % size]
+    course = lambda i: course_ids[i % len(course_ids)]
+    ranged = (datetime(2000, 1, 1), datetime(2999, 1, 1))
+    return [
+        ("UserService.create_user", lambda i: users.create_user(UserCreate(name=f"New {i}", email=f"new-{i}@example.com"))),
+        ("UserService.create_users[100]", lambda i: users.create_users(bulk(i))),
+        ("UserService.get_user", lambda i: users.get_user(pick(i))),
+        ("UserService.get_many[100]", lambda i: users.get_many([pick(i + j) for j in range(PAGE)])),
+        ("UserService.get_all_users", lambda i: users.get_all_users()),
+        ("UserService.list_users[100]", lambda i: users.list_users(PAGE)),
+        ("UserService.search_users", lambda i: users.search_users(f"user {(i * 7919) % size}", 20)),
+        ("UserService.update_user", lambda i: users.update_user(pick(i), UserUpdate(name=f"Renamed {i}"))),
+        ("UserService.deactivate_user", lambda i: users.deactivate_user(pick(i))),
+        ("CourseService.create_course", lambda i: courses.create_course(CourseCreate(title=f"New {i}", description="New"))),
+        ("CourseService.create_courses[100]", lambda i: courses.create_courses([CourseCreate(title=f"Bulk {j}", description="Bulk") for j in range(PAGE)])),
+        ("CourseService.get_course", lambda i: courses.get_course(course(i))),
+        ("CourseService.get_all_courses", lambda i: courses.get_all_courses()),
+        ("CourseService.list_courses[100]", lambda i: courses.list_courses(PAGE)),
+        ("CourseService.search_courses", lambda i: courses.search_courses(f"topic {i % 97}", 20)),
+        ("CourseService.update_course", lambda i: courses.update_course(course(i), CourseUpdate(description=f"Topic {i % 97}"))),
+        ("CourseService.close_enrollment", lambda i: courses.close_enrollment(fresh_course)),
+        ("EnrollmentService.enroll_user", lambda i: enrollments.enroll_user(EnrollmentCreate(user_id=pick(i), course_id=course(i + 1)))),
+        ("EnrollmentService.enroll_users[100]", lambda i: enrollments.enroll_users([
+            EnrollmentCreate(user_id=pick(i * PAGE + j), course_id=course(i + 2)) for j in range(PAGE)
+        ])),
+        ("EnrollmentService.get_enrollment", lambda i: enrollments.get_enrollment(enrollment_ids[i % len(enrollment_ids)])),
+        ("EnrollmentService.get_all_enrollments", lambda i: enrollments.get_all_enrollments()),
+        ("EnrollmentService.list_enrollments[100]", lambda i: enrollments.list_enrollments(PAGE)),
+        ("EnrollmentService.get_user_enrollments", lambda i: enrollments.get_user_enrollments(pick(i))),
+        ("EnrollmentService.get_course_enrollments", lambda i: enrollments.get_course_enrollments(course(i))),
+        ("EnrollmentService.get_user_course_enrollment", lambda i: enrollments.get_user_course_enrollment(pick(i), course(i))),
+        ("EnrollmentService.get_course_users", lambda i: enrollments.get_course_users(course(i))),
+        ("EnrollmentService.list_course_users[100]", lambda i: enrollments.list_course_users(course(i), PAGE)),
+        ("EnrollmentService.mark_completion", lambda i: enrollments.mark_completion(enrollment_ids[i % len(enrollment_ids)])),
+        ("EnrollmentService.course_report", lambda i: enrollments.course_report(course(i))),
+        ("EnrollmentService.course_reports", lambda i: enrollments.course_reports()),
+        ("EnrollmentService.course_reports[range]", lambda i: enrollments.course_reports(*ranged)),
+        ("EnrollmentService.daily_report", lambda i: enrollments.daily_report()),
+        ("EnrollmentService.compaction_status", lambda i: enrollments.compaction_status()),
+        ("EnrollmentService.delete_enrollment", lambda i: enrollments.delete_enrollment(enrollment_ids[-1 - i % len(enrollment_ids)])),
+        ("UserService.delete_user", lambda i: users.delete_user(user_ids[-1 - i])),
+        ("CourseService.delete_course", lambda i: courses.delete_course(course_ids[-1 - i % len(course_ids)])),
+    ]
+
+
+def run(sizes: List[int], backend_name: str = "memory", budget: float = 0.25) -> harness.Results:
+    results: harness.Results = {}
+    for size in sizes:
+        backend, users, courses, enrollments, user_ids, course_ids = build(size, backend_name)
+        for name, call in cases(users, courses, enrollments, user_ids, course_ids):
+            limit = 200 if "delete" in name else 2000
+            results[f"micro/{backend_name}/{name}/n={size}"] = harness.measure(call, budget=budget, max_calls=limit)
+        enrollments.compactor.drain()
+        results[f"micro/{backend_name}/n={size}"] = {"peak_rss_mb": harness.peak_rss_mb()}
+        backend.close()
+        for suffix in ("", "-wal", "-shm"):
+            path = f"bench_services_{size}.db{suffix}"
+            if os.path.exists(path):
+                os.remove(path)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of every service method")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--backend", choices=["memory", "compact", "sqlite"], default="memory")
+    parser.add_argument("--budget", type=float, default=0.25, help="seconds spent per method and size")
+    args = parser.parse_args()
+    results = run(args.sizes, args.backend, args.budget)
+    harness.print_table({name: result for name, result in results.items() if "p95_ms" in result})
+    for name, result in results.items():
+        if "peak_rss_mb" in result:
+            print(f"  {name:<58} peak RSS {result['peak_rss_mb']:,.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import sys
+import os
+import time
+import random
+import secrets
+import subprocess
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from schemas.models import UserCreate, CourseCreate, EnrollmentCreate
+from services.sharding import connect_shards
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AUTHKEY = secrets.token_hex(16)
+DURATION = 5.0
+CLIENTS = 8
+USERS = 2_000
+COURSES = 50
+SHARD_COUNTS = [1, 2, 4]
+
+
+def connect(addresses):
+    for _ in range(200):
+        try:
+            return connect_shards(addresses, AUTHKEY.encode())
+        except (FileNotFoundError, ConnectionRefusedError):
+            time.sleep(0.05)
+    raise RuntimeError("shards did not come up")
+
+
+def client(addresses, user_ids, course_ids, deadline: float, seed: int) -> int:
+    users, courses, enrollments = connect(addresses)
+    rng = random.Random(seed)
+    done = 0
+    while time.time() < deadline:
+        roll = rng.random()
+        if roll < 0.5:
+            users.get_user(rng.choice(user_ids))
+        elif roll < 0.7:
+            courses.get_course(rng.choice(course_ids))
+        elif roll < 0.9:
+            enrollments.get_user_enrollments(rng.choice(user_ids))
+        else:
+            enrollments.enroll_user(EnrollmentCreate(user_id=rng.choice(user_ids), course_id=rng.choice(course_ids)))
+        done += 1
+    return done
+
+
+def run(shards: int) -> float:
+    directory = tempfile.mkdtemp()
+    addresses = [os.path.join(directory, f"shard-{i}.sock") for i in range(shards)]
+    servers = [
+        subprocess.Popen(
+            [sys.executable, "-m", "services.shared", "--address", address, "--shard", str(i), "--shards", str(shards)],
+            cwd=ROOT, stdout=subprocess.DEVNULL, env={**os.environ, "EDUTRACK_STORE_AUTHKEY": AUTHKEY}
+        )
+        for i, address in enumerate(addresses)
+    ]
+    try:
+        users, courses, _ = connect(addresses)
+        user_ids = [user.id for user in users.create_users([UserCreate(name=f"S{i}", email=f"s{i}@example.com") for i in range(USERS)])]
+        course_ids = [course.id for course in courses.create_courses([CourseCreate(title=f"C{i}", description="bench") for i in range(COURSES)])]
+        deadline = time.time() + DURATION
+        with multiprocessing.Pool(CLIENTS) as pool:
+            counts = pool.starmap(client, [(addresses, user_ids, course_ids, deadline, i) for i in range(CLIENTS)])
+        return sum(counts) / DURATION
+    finally:
+        for server in servers:
+            server.terminate()
+        for server in servers:
+            server.wait()
+
+
+def main(shard_counts) -> None:
+    print(f"{'shards':>8} {'ops/s':>10}  ({CLIENTS} client processes, {os.cpu_count()} CPUs)")
+    for shards in shard_counts:
+        print(f"{shards:>8} {run(shards):>10,.0f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or SHARD_COUNTS)
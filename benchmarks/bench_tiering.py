@@ -0,0 +1,108 @@
+import sys
+import os
+import gc
+import random
+import argparse
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import harness
+from schemas.models import Enrollment
+from services.archive import EnrollmentArchive
+from services.business_logic import UserService, CourseService, EnrollmentService
+
+SIZES = [100_000, 1_000_000]
+ENROLLMENTS_PER_USER = 8
+COURSES = 1_000
+SPAN = timedelta(days=720)
+ARCHIVE_AFTER = timedelta(days=90)
+BATCH = 5_000
+CHUNK = 50_000
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except OSError:
+        return harness.peak_rss_mb()
+
+
+def fill(service: EnrollmentService, size: int) -> None:
+    user_ids = [str(uuid.uuid4()) for _ in range(size // ENROLLMENTS_PER_USER + 1)]
+    course_ids = [str(uuid.uuid4()) for _ in range(COURSES)]
+    start, step = datetime.now() - SPAN, SPAN / size
+    for offset in range(0, size, CHUNK):
+        service.enrollments.put_many([
+            Enrollment.model_construct(
+                id=str(uuid.uuid4()), user_id=user_ids[i // ENROLLMENTS_PER_USER], course_id=course_ids[i % COURSES],
+                enrolled_date=start + step * i, completed=i % 10 < 7
+            )
+            for i in range(offset, min(offset + CHUNK, size))
+        ])
+    service.rebuild()
+
+
+def scans(service: EnrollmentService) -> str:
+    full = harness.measure(lambda _: [e for e in service.get_all_enrollments() if not e.completed], budget=1.0, min_calls=3, max_calls=20)
+    since = datetime.now() - SPAN
+    reports = harness.measure(lambda _: service.course_reports(since=since), budget=1.0, min_calls=3, max_calls=20)
+    return f"full scan p50 {full['p50_ms']:>9.1f} ms   bounded reports p50 {reports['p50_ms']:>8.1f} ms"
+
+
+def lookups(archive: EnrollmentArchive, ids) -> None:
+    cold = harness.measure(lambda i: archive.get(ids[i % len(ids)]), budget=1.0, max_calls=len(ids))
+    cached = harness.measure(lambda _: archive.get(ids[0]), budget=0.5)
+    print(f"  lookup by id   cold p50 {cold['p50_ms']:>7.3f} ms  p99 {cold['p99_ms']:>7.3f} ms   cached p50 {cached['p50_ms']:>7.3f} ms")
+
+
+def run(size: int) -> None:
+    with tempfile.TemporaryDirectory(prefix="edutrack-tiering-") as directory:
+        service = EnrollmentService(UserService(), CourseService(), archive=EnrollmentArchive(directory))
+        fill(service, size)
+        gc.collect()
+        before = rss_mb()
+        print(f"{size:>10,} rows   live {len(service.enrollments):>10,}   RSS {before:>7.0f} MB   {scans(service)}")
+
+        cutoff = datetime.now() - ARCHIVE_AFTER
+        old = [enrollment.id for enrollment in service.enrollments.values() if enrollment.completed and enrollment.enrolled_date < cutoff]
+        sample = random.Random(7).sample(old, min(500, len(old)))
+        began = time.perf_counter()
+        moved = 0
+        while True:
+            archived, done = service.archive_completed(cutoff, BATCH)
+            moved += archived
+            if done:
+                break
+        elapsed = time.perf_counter() - began
+        del old
+        gc.collect()
+        after = rss_mb()
+        print(f"{'archived':>10} {moved:>10,}   in {elapsed:.1f} s ({moved / elapsed:,.0f} rows/s)")
+        print(f"{'':>10}      live {len(service.enrollments):>10,}   RSS {after:>7.0f} MB   {scans(service)}")
+        print(
+            f"  archive on disk {service.archive.bytes / 1024 / 1024:>8.1f} MB "
+            f"({service.archive.bytes / max(moved, 1):.1f} bytes/row, {service.archive.segments} segments)"
+        )
+        service.stop_tiering()
+        began = time.perf_counter()
+        archive = EnrollmentArchive(directory)
+        print(f"  reopen archive {time.perf_counter() - began:>8.2f} s")
+        lookups(archive, sample)
+        archive.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Live store size and scan cost before and after archiving old completed enrollments")
+    parser.add_argument("sizes", type=int, nargs="*", default=SIZES)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size)
+
+
+if __name__ == "__main__":
+    main()
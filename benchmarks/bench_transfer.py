@@ -0,0 +1,106 @@
+import sys
+import os
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+from typing import Iterator, Union
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("EDUTRACK_STORAGE", "sqlite")
+os.environ.setdefault("EDUTRACK_SQLITE_PATH", os.path.join(tempfile.mkdtemp(), "transfer.db"))
+
+import harness
+from main import app
+
+ROWS = 200_000
+COURSES = 100
+CHUNK_ROWS = 2_000
+
+
+async def call(method: str, path: str, query: str, chunks: Iterator[bytes] = iter(())) -> Union[bytes, int]:
+    sent = {"bytes": 0, "head": b""}
+    pending = iter(chunks)
+    finished = asyncio.Event()
+
+    async def receive():
+        if finished.is_set():
+            await asyncio.Event().wait()
+        chunk = next(pending, None)
+        if chunk is None:
+            finished.set()
+            return {"type": "http.request", "body": b"", "more_body": False}
+        return {"type": "http.request", "body": chunk, "more_body": True}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            body = message.get("body", b"")
+            sent["bytes"] += len(body)
+            if len(sent["head"]) < 4096:
+                sent["head"] += body[:4096]
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method, "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": query.encode(), "root_path": "",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    await app(scope, receive, send)
+    return sent["head"] if method == "POST" else sent["bytes"]
+
+
+def ndjson(rows: Iterator[dict]) -> Iterator[bytes]:
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(row))
+        if len(lines) == CHUNK_ROWS:
+            yield ("\n".join(lines) + "\n").encode()
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode()
+
+
+def report(label: str, rows: int, elapsed: float, detail: str = "") -> None:
+    print(f"{label:<28} {rows:>10,} rows {rows / elapsed:>10,.0f} rows/s  peak RSS {harness.peak_rss_mb():>6,.0f} MB  {detail}")
+
+
+async def run(rows: int) -> None:
+    run_id = time.time_ns()
+    start = time.perf_counter()
+    users = (({"name": f"Transfer {i}", "email": f"transfer-{run_id}-{i}@example.com"}) for i in range(rows))
+    summary = json.loads(await call("POST", "/import", "entity=users", ndjson(users)))
+    report("import users (ndjson)", summary["rows"], time.perf_counter() - start, f"{summary['failed']} failed")
+
+    start = time.perf_counter()
+    courses = ({"title": f"Transfer {i}", "description": "bulk"} for i in range(COURSES))
+    summary = json.loads(await call("POST", "/import", "entity=courses", ndjson(courses)))
+    report("import courses (ndjson)", summary["rows"], time.perf_counter() - start)
+
+    for format in ("ndjson", "csv"):
+        start = time.perf_counter()
+        size = await call("GET", "/export", f"entity=users&format={format}")
+        report(f"export users ({format})", rows, time.perf_counter() - start, f"{size / 1e6:,.1f} MB")
+
+    from services.dependencies import get_services
+    user_service, course_service, _ = get_services()
+    user_ids = [user.id for user in user_service.list_users(rows)[0]]
+    course_ids = [course.id for course in course_service.list_courses(COURSES)[0]]
+    start = time.perf_counter()
+    enrollments = ({"user_id": user_id, "course_id": course_ids[i % len(course_ids)]} for i, user_id in enumerate(user_ids))
+    summary = json.loads(await call("POST", "/import", "entity=enrollments", ndjson(enrollments)))
+    report("import enrollments (ndjson)", summary["rows"], time.perf_counter() - start, f"{summary['failed']} failed")
+
+    start = time.perf_counter()
+    size = await call("GET", "/export", "entity=enrollments&format=csv")
+    report("export enrollments (csv)", len(user_ids), time.perf_counter() - start, f"{size / 1e6:,.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming /import and /export throughput and peak memory")
+    parser.add_argument("rows", type=int, nargs="?", default=ROWS)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows))
+
+
+if __name__ == "__main__":
+    main()
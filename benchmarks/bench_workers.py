@@ -0,0 +1,99 @@
+import sys
+import os
+import secrets
+import time
+import random
+import socket
+import subprocess
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DURATION = 5.0
+CLIENTS = 32
+WORKER_COUNTS = [1, 2, 4]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url: str) -> None:
+    for _ in range(200):
+        try:
+            httpx.get(url)
+            return
+        except httpx.TransportError:
+            time.sleep(0.05)
+    raise RuntimeError(f"{url} did not come up")
+
+
+def seed(base: str):
+    users = httpx.post(f"{base}/users/batch", json=[{"name": f"W{i}", "email": f"w{i}@example.com"} for i in range(500)]).json()
+    courses = httpx.post(f"{base}/courses/batch", json=[{"title": f"C{i}", "description": "bench"} for i in range(20)]).json()
+    user_ids, course_ids = [u["id"] for u in users], [c["id"] for c in courses]
+    httpx.post(f"{base}/enrollments/batch", json=[
+        {"user_id": user_id, "course_id": random.choice(course_ids)} for user_id in user_ids
+    ])
+    return user_ids, course_ids
+
+
+def client(base: str, user_ids, course_ids, deadline: float, counts, index: int) -> None:
+    with httpx.Client(base_url=base) as http:
+        done = 0
+        while time.perf_counter() < deadline:
+            roll = random.random()
+            if roll < 0.6:
+                http.get(f"/users/{random.choice(user_ids)}")
+            elif roll < 0.9:
+                http.get(f"/courses/{random.choice(course_ids)}/users")
+            else:
+                http.post("/enrollments/", json={"user_id": random.choice(user_ids), "course_id": random.choice(course_ids)})
+            done += 1
+        counts[index] = done
+
+
+def run(workers: int) -> float:
+    address = os.path.join(tempfile.mkdtemp(), "store.sock")
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = {**os.environ, "EDUTRACK_STORE_ADDRESS": address, "EDUTRACK_STORE_AUTHKEY": secrets.token_hex(16)}
+    store = subprocess.Popen([sys.executable, "-m", "services.shared", "--address", address], cwd=ROOT, env=env)
+    api = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=ROOT, env=env
+    )
+    try:
+        wait_for(f"{base}/")
+        user_ids, course_ids = seed(base)
+        counts = [0] * CLIENTS
+        deadline = time.perf_counter() + DURATION
+        threads = [
+            threading.Thread(target=client, args=(base, user_ids, course_ids, deadline, counts, i)) for i in range(CLIENTS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sum(counts) / DURATION
+    finally:
+        api.terminate()
+        store.terminate()
+        api.wait()
+        store.wait()
+
+
+def main(worker_counts) -> None:
+    print(f"{'workers':>8} {'req/s':>10}")
+    for workers in worker_counts:
+        print(f"{workers:>8} {run(workers):>10,.0f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or WORKER_COUNTS)
@@ -0,0 +1,134 @@
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+Result = Dict[str, float]
+Results = Dict[str, Result]
+
+HIGHER_IS_BETTER = ("ops_per_s", "req_per_s")
+LOWER_IS_BETTER = ("p50_ms",)
+NOISE_FLOOR_MS = 0.02
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarize(samples: List[float], elapsed: float, rate_key: str = "ops_per_s") -> Result:
+    return {
+        rate_key: len(samples) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(samples, 0.50) * 1000,
+        "p95_ms": percentile(samples, 0.95) * 1000,
+        "p99_ms": percentile(samples, 0.99) * 1000,
+        "calls": len(samples),
+    }
+
+
+def measure(call: Callable[[int], object], budget: float = 0.25, min_calls: int = 5, max_calls: int = 2000) -> Result:
+    samples: List[float] = []
+    began = time.perf_counter()
+    while len(samples) < max_calls and (len(samples) < min_calls or time.perf_counter() - began < budget):
+        start = time.perf_counter()
+        call(len(samples))
+        samples.append(time.perf_counter() - start)
+    return summarize(samples, sum(samples))
+
+
+def calibrate(rounds: int = 5) -> Result:
+    def workload(_):
+        index = {}
+        for i in range(20_000):
+            index[str(i)] = i * i
+        return sorted(index, key=index.get)
+
+    return {"p50_ms": min(measure(workload, budget=0, min_calls=rounds)["p50_ms"] for _ in range(3))}
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def metadata() -> Dict[str, str]:
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = "unknown"
+    return {
+        "revision": revision,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": str(os.cpu_count()),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def save(path: str, results: Results) -> None:
+    with open(path, "w") as handle:
+        json.dump({"meta": metadata(), "results": results}, handle, indent=2, sort_keys=True)
+
+
+def load(path: str) -> Results:
+    with open(path) as handle:
+        return json.load(handle)["results"]
+
+
+def best(runs: List[Results]) -> Results:
+    merged: Results = {}
+    for results in runs:
+        for name, result in results.items():
+            current = merged.setdefault(name, dict(result))
+            for metric, value in result.items():
+                if metric in HIGHER_IS_BETTER:
+                    current[metric] = max(current[metric], value)
+                elif metric in LOWER_IS_BETTER:
+                    current[metric] = min(current[metric], value)
+    return merged
+
+
+def compare(results: Results, baseline: Results, threshold: float) -> List[Tuple[str, str, float, float, float]]:
+    regressions = []
+    speed = 1.0
+    if "calibration" in results and "calibration" in baseline:
+        speed = baseline["calibration"]["p50_ms"] / results["calibration"]["p50_ms"]
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None or name == "calibration":
+            continue
+        for metric, value in result.items():
+            old = previous.get(metric)
+            if not old:
+                continue
+            if metric in HIGHER_IS_BETTER:
+                value /= speed
+                change = (old - value) / old
+            elif metric in LOWER_IS_BETTER:
+                value *= speed
+                if max(old, value) < NOISE_FLOOR_MS:
+                    continue
+                change = (value - old) / old
+            else:
+                continue
+            if change > threshold:
+                regressions.append((name, metric, old, value, change))
+    return regressions
+
+
+def print_table(results: Results, rate_key: Optional[str] = None) -> None:
+    for name, result in results.items():
+        rate = result.get(rate_key) if rate_key else result.get("ops_per_s", result.get("req_per_s"))
+        print(
+            f"  {name:<58} {rate or 0:>12,.0f}/s  p50 {result['p50_ms']:>8.3f}  "
+            f"p95 {result['p95_ms']:>8.3f}  p99 {result['p99_ms']:>8.3f} ms"
+        )
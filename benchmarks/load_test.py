@@ -0,0 +1,120 @@
+import sys
+import os
+import time
+import asyncio
+import random
+import argparse
+from typing import Awaitable, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import harness
+from main import app
+
+USERS = 20_000
+COURSES = 200
+CONCURRENCY = 64
+BATCH = 5_000
+
+Request = Callable[[httpx.AsyncClient, random.Random], Awaitable[httpx.Response]]
+
+
+async def seed(client: httpx.AsyncClient, users: int, courses: int) -> Dict[str, List[str]]:
+    run = random.getrandbits(32)
+    course_ids: List[str] = []
+    response = await client.post("/courses/batch", json=[{"title": f"Load {i}", "description": "load test"} for i in range(courses)])
+    course_ids.extend(item["id"] for item in response.json())
+    user_ids: List[str] = []
+    for offset in range(0, users, BATCH):
+        response = await client.post("/users/batch", json=[
+            {"name": f"Load {i}", "email": f"load-{run}-{i}@example.com"} for i in range(offset, min(offset + BATCH, users))
+        ])
+        created = [item["id"] for item in response.json()]
+        user_ids.extend(created)
+        await client.post("/enrollments/batch", json=[
+            {"user_id": user_id, "course_id": course_ids[(offset + i) % len(course_ids)]} for i, user_id in enumerate(created)
+        ])
+    return {"users": user_ids, "courses": course_ids}
+
+
+def scenarios(ids: Dict[str, List[str]]) -> Dict[str, List[Request]]:
+    user_ids, course_ids = ids["users"], ids["courses"]
+    etags: Dict[str, str] = {}
+
+    async def enroll(client: httpx.AsyncClient, rng: random.Random) -> httpx.Response:
+        return await client.post("/enrollments/", json={"user_id": rng.choice(user_ids), "course_id": rng.choice(course_ids)})
+
+    async def roster(client: httpx.AsyncClient, rng: random.Random) -> httpx.Response:
+        return await client.get(f"/courses/{rng.choice(course_ids)}/users", params={"limit": 50})
+
+    async def poll(client: httpx.AsyncClient, rng: random.Random) -> httpx.Response:
+        headers = {"If-None-Match": etags["poll"]} if "poll" in etags else {}
+        response = await client.get("/enrollments/", params={"limit": 100}, headers=headers)
+        if "etag" in response.headers:
+            etags["poll"] = response.headers["etag"]
+        return response
+
+    async def user(client: httpx.AsyncClient, rng: random.Random) -> httpx.Response:
+        return await client.get(f"/users/{rng.choice(user_ids)}")
+
+    return {
+        "enroll_burst": [enroll],
+        "roster_reads": [roster],
+        "list_polling": [poll],
+        "mixed": [user] * 6 + [roster] * 2 + [poll, enroll],
+    }
+
+
+async def drive(client: httpx.AsyncClient, mix: List[Request], seconds: float, concurrency: int) -> harness.Result:
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+
+    async def worker(seed: int):
+        nonlocal errors
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            request = rng.choice(mix)
+            start = time.perf_counter()
+            response = await request(client, rng)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 500:
+                errors += 1
+
+    began = time.perf_counter()
+    await asyncio.gather(*(worker(seed) for seed in range(concurrency)))
+    result = harness.summarize(latencies, time.perf_counter() - began, "req_per_s")
+    result["errors"] = errors
+    return result
+
+
+async def run_async(seconds: float, concurrency: int, users: int, courses: int) -> harness.Results:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load") as client:
+        ids = await seed(client, users, courses)
+        results: harness.Results = {}
+        for name, mix in scenarios(ids).items():
+            results[f"load/{name}"] = await drive(client, mix, seconds, concurrency)
+        results["load"] = {"peak_rss_mb": harness.peak_rss_mb()}
+        return results
+
+
+def run(seconds: float = 2.0, concurrency: int = CONCURRENCY, users: int = USERS, courses: int = COURSES) -> harness.Results:
+    return asyncio.run(run_async(seconds, concurrency, users, courses))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-process load driver replaying request mixes against the ASGI app")
+    parser.add_argument("--seconds", type=float, default=2.0, help="duration of each scenario")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--users", type=int, default=USERS)
+    parser.add_argument("--courses", type=int, default=COURSES)
+    args = parser.parse_args()
+    results = run(args.seconds, args.concurrency, args.users, args.courses)
+    harness.print_table({name: result for name, result in results.items() if "p95_ms" in result})
+    print(f"  peak RSS {results['load']['peak_rss_mb']:,.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
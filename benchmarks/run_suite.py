@@ -0,0 +1,57 @@
+import sys
+import os
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import harness
+import bench_services
+import load_test
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the micro-benchmark and load suites and compare against a baseline")
+    parser.add_argument("--sizes", type=int, nargs="+", default=bench_services.SIZES)
+    parser.add_argument("--backend", choices=["memory", "compact", "sqlite"], default="memory")
+    parser.add_argument("--budget", type=float, default=0.25, help="seconds spent per method and size")
+    parser.add_argument("--load-seconds", type=float, default=2.0, help="duration of each load scenario, 0 to skip")
+    parser.add_argument("--concurrency", type=int, default=load_test.CONCURRENCY)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark; the best of each metric is kept")
+    parser.add_argument("--out", default="benchmark-results.json")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.5, help="allowed fractional slowdown before flagging")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    runs = []
+    for _ in range(args.repeat):
+        results = {"calibration": harness.calibrate()}
+        results.update(bench_services.run(args.sizes, args.backend, args.budget))
+        if args.load_seconds > 0:
+            results.update(load_test.run(args.load_seconds, args.concurrency))
+        runs.append(results)
+    results = harness.best(runs)
+    harness.print_table({name: result for name, result in results.items() if "p95_ms" in result})
+    print(f"  calibration {results['calibration']['p50_ms']:.2f} ms, peak RSS {harness.peak_rss_mb():,.0f} MB")
+    harness.save(args.out, results)
+    print(f"Results written to {args.out}")
+
+    if args.update_baseline:
+        harness.save(args.baseline, results)
+        print(f"Baseline updated at {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one")
+        return
+    regressions = harness.compare(results, harness.load(args.baseline), args.threshold)
+    for name, metric, old, new, change in regressions:
+        print(f"REGRESSION {name} {metric}: {old:,.3f} -> {new:,.3f} ({change:+.0%})")
+    if regressions:
+        sys.exit(1)
+    print(f"No regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import sys
+import os
+import time
+import threading
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from schemas.models import UserCreate, CourseCreate, EnrollmentCreate, UserUpdate
+from services.business_logic import UserService, CourseService, EnrollmentService
+from services.concurrency import StripedLock
+
+USERS = 2_000
+COURSES = 50
+OPERATIONS_PER_CLIENT = 2_000
+CLIENT_COUNTS = [1, 2, 4, 8, 16, 32, 64]
+
+
+def build():
+    locks = StripedLock()
+    user_service = UserService(locks=locks)
+    course_service = CourseService(locks=locks)
+    enrollment_service = EnrollmentService(user_service, course_service, locks=locks)
+    user_ids = [user_service.create_user(UserCreate(name=f"U{i}", email=f"u{i}@example.com")).id for i in range(USERS)]
+    course_ids = [course_service.create_course(CourseCreate(title=f"C{i}", description="stress")).id for i in range(COURSES)]
+    return user_service, enrollment_service, user_ids, course_ids
+
+
+def client(worker: int, user_service, enrollment_service, user_ids, course_ids, barrier) -> None:
+    barrier.wait()
+    for op in range(OPERATIONS_PER_CLIENT):
+        user_id = user_ids[(op * 7 + worker) % len(user_ids)]
+        course_id = course_ids[op % len(course_ids)]
+        if op % 10 == 9:
+            user_service.update_user(user_id, UserUpdate(name=f"U{worker}-{op}"))
+        else:
+            enrollment_service.enroll_user(EnrollmentCreate(user_id=user_id, course_id=course_id))
+
+
+def run(clients: int):
+    user_service, enrollment_service, user_ids, course_ids = build()
+    barrier = threading.Barrier(clients + 1)
+    threads = [
+        threading.Thread(target=client, args=(worker, user_service, enrollment_service, user_ids, course_ids, barrier))
+        for worker in range(clients)
+    ]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    pairs = Counter((e.user_id, e.course_id) for e in enrollment_service.get_all_enrollments())
+    duplicates = sum(count - 1 for count in pairs.values() if count > 1)
+    return clients * OPERATIONS_PER_CLIENT / elapsed, duplicates
+
+
+def main(client_counts):
+    print(f"{'clients':>8} {'ops/s':>12} {'duplicates':>11}")
+    for clients in client_counts:
+        throughput, duplicates = run(clients)
+        print(f"{clients:>8} {throughput:>12,.0f} {duplicates:>11}")
+        if duplicates:
+            sys.exit(f"{duplicates} duplicate enrollments with {clients} clients")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or CLIENT_COUNTS)
@@ -1,12 +1,44 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from routes import users, courses, enrollments
+from routes import users, courses, enrollments, reports, maintenance, metrics, events, transfer, health
+from middleware.admission import AdmissionMiddleware
+from middleware.metrics import MetricsMiddleware
+from middleware.profiling import ProfilingMiddleware
+from services.dependencies import (
+    ADMISSION_ENABLED, PROFILING_ENABLED, PROFILING_TOKEN, PROFILE_INTERVAL, PROFILE_DIR, RATE_LIMIT_KEY_HEADER,
+    build_admission_controller, shutdown_services, start_recovery
+)
+from services.metrics import RequestMetrics
+from services.profiling import ProfileStore
 
-app = FastAPI(title="EduTrack Lite API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_recovery()
+    yield
+    shutdown_services()
+
+app = FastAPI(title="EduTrack Lite API", version="1.0.0", lifespan=lifespan)
+
+app.state.metrics = RequestMetrics()
+app.state.profiles = ProfileStore(directory=PROFILE_DIR)
+app.state.admission = build_admission_controller() if ADMISSION_ENABLED else None
+
+if app.state.admission is not None:
+    app.add_middleware(AdmissionMiddleware, controller=app.state.admission, client_header=RATE_LIMIT_KEY_HEADER)
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware, store=app.state.profiles, interval=PROFILE_INTERVAL, token=PROFILING_TOKEN)
+app.add_middleware(MetricsMiddleware, metrics=app.state.metrics)
 
 app.include_router(users.router)
 app.include_router(courses.router)
 app.include_router(enrollments.router)
+app.include_router(reports.router)
+app.include_router(maintenance.router)
+app.include_router(metrics.router)
+app.include_router(events.router)
+app.include_router(transfer.router)
+app.include_router(health.router)
 
 @app.get("/")
-def root():
+async def root():
     return {"message": "EduTrack Lite"}
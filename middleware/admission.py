@@ -0,0 +1,91 @@
+import time
+import typing
+from fastapi.routing import APIRoute
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from typing import Iterator, List, Optional, Pattern, Sequence, Set, Tuple
+from services.admission import READ, SCAN, WRITE, AdmissionController, Rejection
+
+EXEMPT_TAGS = {"metrics", "events", "health"}
+READ_TAGS = {"lookup"}
+
+RouteClass = Tuple[Pattern, Set[str], Optional[str]]
+
+
+def api_routes(routes: Sequence) -> Iterator[APIRoute]:
+    for route in routes:
+        if isinstance(route, APIRoute):
+            yield route
+        elif getattr(route, "original_router", None) is not None:
+            yield from api_routes(route.original_router.routes)
+
+
+def route_class(route: APIRoute) -> Optional[str]:
+    if EXEMPT_TAGS.intersection(route.tags):
+        return None
+    if READ_TAGS.intersection(route.tags):
+        return READ
+    if route.methods - {"GET", "HEAD"}:
+        return WRITE
+    if route.response_class is StreamingResponse or typing.get_origin(route.response_model) in (list, List):
+        return SCAN
+    return READ
+
+
+class AdmissionMiddleware:
+    def __init__(self, app: ASGIApp, controller: AdmissionController, client_header: Optional[str] = None):
+        self.app = app
+        self.controller = controller
+        self.client_header = client_header.lower() if client_header else None
+        self._routes: Optional[List[RouteClass]] = None
+
+    def classify(self, scope: Scope) -> Optional[str]:
+        if self._routes is None:
+            self._routes = [
+                (route.path_regex, route.methods, route_class(route))
+                for route in api_routes(scope["app"].routes)
+            ]
+        path, method = scope["path"], scope["method"]
+        for pattern, methods, name in self._routes:
+            if method in methods and pattern.match(path):
+                return name
+        return READ
+
+    def client(self, scope: Scope) -> str:
+        if self.client_header is not None:
+            key = Headers(scope=scope).get(self.client_header)
+            if key:
+                return "key:" + key
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        name = self.classify(scope)
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        rejection = self.controller.check_rate(self.client(scope), name)
+        if rejection is None:
+            limiter, rejection = await self.controller.admit(name)
+        if rejection is not None:
+            await self.reject(rejection, scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if limiter is not None:
+                limiter.release(time.perf_counter() - started)
+
+    @staticmethod
+    async def reject(rejection: Rejection, scope: Scope, receive: Receive, send: Send) -> None:
+        response = JSONResponse(
+            {"detail": rejection.detail}, status_code=rejection.status_code, headers={"Retry-After": str(rejection.retry_after)}
+        )
+        await response(scope, receive, send)
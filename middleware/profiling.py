@@ -0,0 +1,48 @@
+import threading
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from services.metrics import current_timings
+from services.profiling import Profile, ProfileStore, SamplingProfiler
+
+PROFILE_HEADER = "x-profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+PROFILE_URL_HEADER = "X-Profile-Url"
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp, store: ProfileStore, interval: float, token: Optional[str] = None):
+        self.app = app
+        self.store = store
+        self.interval = interval
+        self.token = token
+        self._busy = threading.Lock()
+
+    def _requested(self, scope: Scope) -> bool:
+        value = Headers(scope=scope).get(PROFILE_HEADER)
+        if not value:
+            return False
+        return value == self.token if self.token else True
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._requested(scope) or not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(self.store.new_id(), scope["method"], scope["path"], self.interval)
+        timings = current_timings()
+        profiler = SamplingProfiler(profile, timings.threads if timings is not None else {threading.get_ident()})
+
+        async def send_with_profile(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers[PROFILE_ID_HEADER] = profile.id
+                headers[PROFILE_URL_HEADER] = f"/metrics/profiles/{profile.id}"
+            await send(message)
+
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            self.store.add(profiler.stop())
+            self._busy.release()
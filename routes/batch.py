@@ -0,0 +1,22 @@
+from fastapi import HTTPException, Response, status
+from pydantic import TypeAdapter
+from typing import List, Sized
+from schemas.models import BatchItemResult
+from services.serialization import adapter_json
+from routes.responses import json_bytes_response
+
+MAX_BATCH_SIZE = 10_000
+
+BATCH_RESULTS = TypeAdapter(List[BatchItemResult])
+
+
+def check_batch_size(items: Sized) -> None:
+    if len(items) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch size exceeds the maximum of {MAX_BATCH_SIZE} items"
+        )
+
+
+def batch_response(results: List[BatchItemResult]) -> Response:
+    return json_bytes_response(adapter_json(BATCH_RESULTS, results))
@@ -0,0 +1,47 @@
+from fastapi import Request, Response, status
+from typing import Awaitable, Callable, Dict, Tuple
+from services.cache import LRUCache
+from services.serialization import model_json
+from routes.responses import json_bytes_response
+
+BODY_CACHE_SIZE = 512
+MAX_CACHED_BODY_BYTES = 1 << 20
+
+Rendered = Tuple[bytes, Dict[str, str]]
+
+_bodies: LRUCache[Rendered] = LRUCache(BODY_CACHE_SIZE)
+
+
+def etag_for(*versions: int) -> str:
+    return '"' + "-".join(str(version) for version in versions) + '"'
+
+
+def if_none_match(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+
+async def conditional_response(
+    request: Request, versions: Tuple[int, ...], render: Callable[[], Awaitable[Rendered]]
+) -> Response:
+    etag = etag_for(*versions)
+    if if_none_match(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    key = (request.url.path, request.url.query, etag)
+    rendered = _bodies.get(key)
+    if rendered is None:
+        rendered = await render()
+        if len(rendered[0]) <= MAX_CACHED_BODY_BYTES:
+            _bodies.put(key, rendered)
+    body, headers = rendered
+    return json_bytes_response(body, headers={**headers, "ETag": etag})
+
+
+def entity_body(entity) -> Callable[[], Awaitable[Rendered]]:
+    async def render() -> Rendered:
+        return model_json(entity), {}
+    return render
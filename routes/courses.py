@@ -1,61 +1,126 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request
+from pydantic import TypeAdapter
 from typing import List
-from schemas.models import Course, CourseCreate, CourseUpdate, User
-from services.business_logic import CourseService, UserService, EnrollmentService
-from services.dependencies import get_course_service, get_user_service, get_enrollment_service
+from schemas.models import Course, CourseCreate, CourseUpdate, User, BatchItemResult, WaitlistEntry
+from services.async_services import AsyncCourseService, AsyncEnrollmentService
+from services.business_logic import CapacityNotSupportedError
+from services.dependencies import get_course_service, get_enrollment_service
+from services.serialization import adapter_json
+from routes.pagination import ListParams, list_params, list_response, search_params
+from routes.batch import batch_response, check_batch_size
+from routes.responses import entity_response, json_bytes_response
+from routes.conditional import conditional_response, entity_body
+from routes.timing import TimedRoute
 
-router = APIRouter(prefix="/courses", tags=["courses"])
+router = APIRouter(prefix="/courses", tags=["courses"], route_class=TimedRoute)
+
+COURSE_LIST = TypeAdapter(List[Course])
+USER_LIST = TypeAdapter(List[User])
+SHARDED_CAPACITY_DETAIL = "Course capacity is not supported across shards"
 
 @router.post("/", response_model=Course, status_code=status.HTTP_201_CREATED)
-def create_course(course: CourseCreate, course_service: CourseService = Depends(get_course_service)):
-    return course_service.create_course(course)
+async def create_course(course: CourseCreate, course_service: AsyncCourseService = Depends(get_course_service)):
+    try:
+        return entity_response(await course_service.create_course(course), status.HTTP_201_CREATED)
+    except CapacityNotSupportedError:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=SHARDED_CAPACITY_DETAIL)
+
+@router.post("/batch", response_model=List[BatchItemResult])
+async def create_courses(courses: List[CourseCreate], course_service: AsyncCourseService = Depends(get_course_service)):
+    check_batch_size(courses)
+    try:
+        created = await course_service.create_courses(courses)
+    except CapacityNotSupportedError:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=SHARDED_CAPACITY_DETAIL)
+    return batch_response([
+        BatchItemResult(index=index, status=status.HTTP_201_CREATED, id=course.id)
+        for index, course in enumerate(created)
+    ])
+
+@router.post("/lookup", tags=["lookup"], response_model=List[Course])
+async def lookup_courses(course_ids: List[str], course_service: AsyncCourseService = Depends(get_course_service)):
+    check_batch_size(course_ids)
+    return json_bytes_response(adapter_json(COURSE_LIST, await course_service.get_many(list(dict.fromkeys(course_ids)))))
 
 @router.get("/", response_model=List[Course])
-def get_all_courses(course_service: CourseService = Depends(get_course_service)):
-    return course_service.get_all_courses()
+async def get_all_courses(request: Request, params: ListParams = Depends(list_params), course_service: AsyncCourseService = Depends(get_course_service)):
+    return await list_response(
+        request, params, course_service.list_courses, course_service.get_all_courses, COURSE_LIST, (await course_service.version(),)
+    )
+
+@router.get("/search", response_model=List[Course])
+async def search_courses(
+    request: Request,
+    q: str = Query(..., min_length=1, description="Words or word prefixes to match against title and description"),
+    params: ListParams = Depends(search_params),
+    course_service: AsyncCourseService = Depends(get_course_service)
+):
+    async def fetch(limit, cursor):
+        return await course_service.search_courses(q, limit, cursor)
+
+    return await list_response(request, params, fetch, None, COURSE_LIST, (await course_service.version(),))
 
 @router.get("/{course_id}", response_model=Course)
-def get_course(course_id: str, course_service: CourseService = Depends(get_course_service)):
-    course = course_service.get_course(course_id)
+async def get_course(course_id: str, request: Request, course_service: AsyncCourseService = Depends(get_course_service)):
+    course = await course_service.get_course(course_id)
     if not course:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
-    return course
+    return await conditional_response(request, (await course_service.version(course_id),), entity_body(course))
 
 @router.put("/{course_id}", response_model=Course)
-def update_course(course_id: str, course_data: CourseUpdate, course_service: CourseService = Depends(get_course_service)):
-    course = course_service.update_course(course_id, course_data)
+async def update_course(course_id: str, course_data: CourseUpdate, course_service: AsyncCourseService = Depends(get_course_service)):
+    try:
+        course = await course_service.update_course(course_id, course_data)
+    except CapacityNotSupportedError:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=SHARDED_CAPACITY_DETAIL)
     if not course:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
-    return course
+    return entity_response(course)
 
 @router.delete("/{course_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_course(course_id: str, course_service: CourseService = Depends(get_course_service)):
-    if not course_service.delete_course(course_id):
+async def delete_course(course_id: str, course_service: AsyncCourseService = Depends(get_course_service)):
+    if not await course_service.delete_course(course_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
 
 @router.patch("/{course_id}/close-enrollment", response_model=Course)
-def close_enrollment(course_id: str, course_service: CourseService = Depends(get_course_service)):
-    course = course_service.close_enrollment(course_id)
+async def close_enrollment(course_id: str, course_service: AsyncCourseService = Depends(get_course_service)):
+    course = await course_service.close_enrollment(course_id)
     if not course:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
-    return course
+    return entity_response(course)
 
 @router.get("/{course_id}/users", response_model=List[User])
-def get_course_users(
+async def get_course_users(
     course_id: str,
-    course_service: CourseService = Depends(get_course_service),
-    user_service: UserService = Depends(get_user_service),
-    enrollment_service: EnrollmentService = Depends(get_enrollment_service)
+    request: Request,
+    params: ListParams = Depends(list_params),
+    course_service: AsyncCourseService = Depends(get_course_service),
+    enrollment_service: AsyncEnrollmentService = Depends(get_enrollment_service)
 ):
-    course = course_service.get_course(course_id)
+    course = await course_service.get_course(course_id)
     if not course:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
 
-    enrollments = enrollment_service.get_course_enrollments(course_id)
-    users = []
-    for enrollment in enrollments:
-        user = user_service.get_user(enrollment.user_id)
-        if user:
-            users.append(user)
+    async def fetch(limit, cursor):
+        return await enrollment_service.list_course_users(course_id, limit, cursor)
+
+    async def fetch_all():
+        return await enrollment_service.get_course_users(course_id)
+
+    version = (await course_service.version(course_id), await enrollment_service.version(f"course:{course_id}"))
+    return await list_response(request, params, fetch, fetch_all, USER_LIST, version)
+
+@router.get("/{course_id}/waitlist", response_model=List[WaitlistEntry])
+async def get_waitlist(
+    course_id: str,
+    course_service: AsyncCourseService = Depends(get_course_service),
+    enrollment_service: AsyncEnrollmentService = Depends(get_enrollment_service)
+):
+    if not await course_service.get_course(course_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
+    return await enrollment_service.get_waitlist(course_id)
 
-    return users
+@router.delete("/{course_id}/waitlist/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def leave_waitlist(course_id: str, user_id: str, enrollment_service: AsyncEnrollmentService = Depends(get_enrollment_service)):
+    if not await enrollment_service.leave_waitlist(course_id, user_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User is not on the waitlist")
@@ -1,47 +1,137 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from typing import List
-from schemas.models import Enrollment, EnrollmentCreate
-from services.business_logic import EnrollmentService, UserService
-from services.dependencies import get_enrollment_service, get_user_service
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request
+from pydantic import TypeAdapter
+from datetime import datetime
+from functools import partial
+from typing import List, Optional, Union
+from schemas.models import Enrollment, EnrollmentCreate, ExpandedEnrollment, BatchItemResult, WaitlistEntry
+from services.async_services import AsyncCourseService, AsyncEnrollmentService, AsyncUserService
+from services.dependencies import get_course_service, get_enrollment_service, get_user_service
+from routes.pagination import ListParams, list_params, list_response
+from services.serialization import adapter_json
+from routes.batch import batch_response, check_batch_size
+from routes.responses import entity_response
+from routes.conditional import Rendered, conditional_response, entity_body
+from routes.timing import TimedRoute
 
-router = APIRouter(prefix="/enrollments", tags=["enrollments"])
+ENROLL_REJECTED_DETAIL = "Cannot enroll user. User may be inactive, course may be closed, or user already enrolled"
 
-@router.post("/", response_model=Enrollment, status_code=status.HTTP_201_CREATED)
-def enroll_user(enrollment_data: EnrollmentCreate, enrollment_service: EnrollmentService = Depends(get_enrollment_service)):
-    enrollment = enrollment_service.enroll_user(enrollment_data)
+router = APIRouter(prefix="/enrollments", tags=["enrollments"], route_class=TimedRoute)
+
+ENROLLMENT_LIST = TypeAdapter(List[Enrollment])
+EXPANDED_LIST = TypeAdapter(List[ExpandedEnrollment])
+
+EnrollmentView = Union[ExpandedEnrollment, Enrollment]
+
+EXPAND = Query(None, pattern="^course$", description="course embeds each enrollment's course")
+
+async def expand_courses(enrollments: List[Enrollment], course_service: AsyncCourseService) -> List[ExpandedEnrollment]:
+    course_ids = list(dict.fromkeys(enrollment.course_id for enrollment in enrollments))
+    courses = {course.id: course for course in await course_service.get_many(course_ids)} if course_ids else {}
+    return [ExpandedEnrollment.model_construct(**dict(enrollment), course=courses.get(enrollment.course_id)) for enrollment in enrollments]
+
+@router.post("/", response_model=Enrollment, status_code=status.HTTP_201_CREATED, responses={202: {"model": WaitlistEntry}})
+async def enroll_user(enrollment_data: EnrollmentCreate, enrollment_service: AsyncEnrollmentService = Depends(get_enrollment_service)):
+    enrollment = await enrollment_service.enroll_user(enrollment_data)
     if not enrollment:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Cannot enroll user. User may be inactive, course may be closed, or user already enrolled"
-        )
-    return enrollment
-
-@router.get("/", response_model=List[Enrollment])
-def get_all_enrollments(enrollment_service: EnrollmentService = Depends(get_enrollment_service)):
-    return enrollment_service.get_all_enrollments()
-
-@router.get("/{enrollment_id}", response_model=Enrollment)
-def get_enrollment(enrollment_id: str, enrollment_service: EnrollmentService = Depends(get_enrollment_service)):
-    enrollment = enrollment_service.get_enrollment(enrollment_id)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=ENROLL_REJECTED_DETAIL)
+    if isinstance(enrollment, WaitlistEntry):
+        return entity_response(enrollment, status.HTTP_202_ACCEPTED)
+    return entity_response(enrollment, status.HTTP_201_CREATED)
+
+@router.post("/batch", response_model=List[BatchItemResult])
+async def enroll_users(enrollments_data: List[EnrollmentCreate], enrollment_service: AsyncEnrollmentService = Depends(get_enrollment_service)):
+    check_batch_size(enrollments_data)
+    results = []
+    for index, enrollment in enumerate(await enrollment_service.enroll_users(enrollments_data)):
+        if enrollment is None:
+            results.append(BatchItemResult(index=index, status=status.HTTP_400_BAD_REQUEST, detail=ENROLL_REJECTED_DETAIL))
+        elif isinstance(enrollment, WaitlistEntry):
+            results.append(BatchItemResult(index=index, status=status.HTTP_202_ACCEPTED, detail=f"Waitlisted at position {enrollment.position}"))
+        else:
+            results.append(BatchItemResult(index=index, status=status.HTTP_201_CREATED, id=enrollment.id))
+    return batch_response(results)
+
+@router.get("/", response_model=List[EnrollmentView])
+async def get_all_enrollments(
+    request: Request,
+    params: ListParams = Depends(list_params),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    expand: Optional[str] = EXPAND,
+    course_service: AsyncCourseService = Depends(get_course_service),
+    enrollment_service: AsyncEnrollmentService = Depends(get_enrollment_service)
+):
+    if since is not None and until is not None and since > until:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="since must not be after until")
+    if since is not None or until is not None:
+        fetch, fetch_all = partial(enrollment_service.list_enrollments_between, since, until), None
+    else:
+        fetch, fetch_all = enrollment_service.list_enrollments, enrollment_service.get_all_enrollments
+    version = (await enrollment_service.version(),)
+    if not expand:
+        return await list_response(request, params, fetch, fetch_all, ENROLLMENT_LIST, version)
+
+    async def fetch_expanded(limit, cursor):
+        enrollments, next_cursor = await fetch(limit, cursor)
+        return await expand_courses(enrollments, course_service), next_cursor
+
+    async def fetch_all_expanded():
+        return await expand_courses(await fetch_all(), course_service)
+
+    return await list_response(
+        request, params, fetch_expanded, fetch_all_expanded if fetch_all is not None else None, EXPANDED_LIST,
+        version + (await course_service.version(),)
+    )
+
+@router.get("/{enrollment_id}", response_model=EnrollmentView)
+async def get_enrollment(
+    enrollment_id: str,
+    request: Request,
+    expand: Optional[str] = EXPAND,
+    course_service: AsyncCourseService = Depends(get_course_service),
+    enrollment_service: AsyncEnrollmentService = Depends(get_enrollment_service)
+):
+    enrollment = await enrollment_service.get_enrollment(enrollment_id)
     if not enrollment:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Enrollment not found")
-    return enrollment
+    version = (await enrollment_service.version(enrollment_id),)
+    if not expand:
+        return await conditional_response(request, version, entity_body(enrollment))
+    version += (await course_service.version(enrollment.course_id),)
+    return await conditional_response(request, version, entity_body((await expand_courses([enrollment], course_service))[0]))
+
+@router.delete("/{enrollment_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_enrollment(enrollment_id: str, enrollment_service: AsyncEnrollmentService = Depends(get_enrollment_service)):
+    if not await enrollment_service.delete_enrollment(enrollment_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Enrollment not found")
 
 @router.patch("/{enrollment_id}/complete", response_model=Enrollment)
-def mark_completion(enrollment_id: str, enrollment_service: EnrollmentService = Depends(get_enrollment_service)):
-    enrollment = enrollment_service.mark_completion(enrollment_id)
+async def mark_completion(enrollment_id: str, enrollment_service: AsyncEnrollmentService = Depends(get_enrollment_service)):
+    enrollment = await enrollment_service.mark_completion(enrollment_id)
     if not enrollment:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Enrollment not found")
-    return enrollment
+    return entity_response(enrollment)
 
-@router.get("/user/{user_id}", response_model=List[Enrollment])
-def get_user_enrollments(
+@router.get("/user/{user_id}", response_model=List[EnrollmentView])
+async def get_user_enrollments(
     user_id: str,
-    user_service: UserService = Depends(get_user_service),
-    enrollment_service: EnrollmentService = Depends(get_enrollment_service)
+    request: Request,
+    expand: Optional[str] = EXPAND,
+    user_service: AsyncUserService = Depends(get_user_service),
+    course_service: AsyncCourseService = Depends(get_course_service),
+    enrollment_service: AsyncEnrollmentService = Depends(get_enrollment_service)
 ):
-    user = user_service.get_user(user_id)
+    user = await user_service.get_user(user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-    return enrollment_service.get_user_enrollments(user_id)
+    async def render() -> Rendered:
+        enrollments = await enrollment_service.get_user_enrollments(user_id)
+        if expand:
+            return adapter_json(EXPANDED_LIST, await expand_courses(enrollments, course_service)), {}
+        return adapter_json(ENROLLMENT_LIST, enrollments), {}
+
+    version = (await enrollment_service.version(f"user:{user_id}"),)
+    if expand:
+        version += (await course_service.version(),)
+    return await conditional_response(request, version, render)
@@ -0,0 +1,111 @@
+import anyio
+from fastapi import APIRouter, Depends, Header, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, List, Optional, Tuple
+from services.async_services import AsyncEventFeed
+from services.dependencies import get_event_feed
+from services.events import Event
+from routes.timing import TimedRoute
+
+SSE_MEDIA_TYPE = "text/event-stream"
+EVENT_BATCH_SIZE = 256
+HEARTBEAT_SECONDS = 15.0
+SEND_TIMEOUT_SECONDS = 30.0
+TRY_AGAIN_LATER = 1013
+
+Gap = Optional[Tuple[int, int]]
+
+router = APIRouter(prefix="/events", tags=["events"], route_class=TimedRoute)
+
+
+class EventQuery:
+    def __init__(self, after: Optional[int], types: Optional[str], follow: bool):
+        self.after = after
+        self.types = tuple(t.strip() for t in types.split(",") if t.strip()) if types else ()
+        self.follow = follow
+
+    def wants(self, event_type: str) -> bool:
+        if not self.types:
+            return True
+        return any(event_type == t or event_type.startswith(t + ".") for t in self.types)
+
+
+async def event_query(
+    after: Optional[int] = Query(None, ge=0, description="Stream events after this sequence number; defaults to new events only"),
+    types: Optional[str] = Query(None, description="Comma-separated event types or entity names, e.g. enrollment or enrollment.completed"),
+    follow: bool = Query(True, description="Keep the stream open for new events; false returns the backlog and closes"),
+) -> EventQuery:
+    return EventQuery(after, types, follow)
+
+
+async def event_batches(feed: AsyncEventFeed, query: EventQuery, after: Optional[int]) -> AsyncIterator[Tuple[Gap, List[Event]]]:
+    if after is None:
+        after = await feed.last_seq()
+    while True:
+        oldest, events = await feed.read(after, EVENT_BATCH_SIZE)
+        gap = (after + 1, oldest) if oldest > after + 1 else None
+        if events:
+            after = events[-1][0]
+            yield gap, [event for event in events if query.wants(event[1])] if query.types else events
+            continue
+        if not query.follow:
+            return
+        if not await feed.wait(after, HEARTBEAT_SECONDS):
+            yield None, []
+
+
+def sse_frame(event: Event) -> bytes:
+    seq, event_type, payload = event
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (seq, event_type.encode(), payload)
+
+
+async def sse_stream(feed: AsyncEventFeed, query: EventQuery, after: Optional[int]) -> AsyncIterator[bytes]:
+    async for gap, events in event_batches(feed, query, after):
+        chunk = b"".join(sse_frame(event) for event in events)
+        if gap is not None:
+            chunk = b'event: reset\ndata: {"missed_from":%d,"resume_at":%d}\n\n' % gap + chunk
+        yield chunk or b": keepalive\n\n"
+
+
+@router.get("", response_class=StreamingResponse)
+async def stream_events(
+    query: EventQuery = Depends(event_query),
+    last_event_id: Optional[int] = Header(None, ge=0),
+    feed: AsyncEventFeed = Depends(get_event_feed)
+):
+    after = last_event_id if last_event_id is not None else query.after
+    return StreamingResponse(
+        sse_stream(feed, query, after),
+        media_type=SSE_MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.websocket("/ws")
+async def stream_events_ws(websocket: WebSocket, query: EventQuery = Depends(event_query), feed: AsyncEventFeed = Depends(get_event_feed)):
+    await websocket.accept()
+
+    async def send_events(cancel: anyio.CancelScope) -> None:
+        try:
+            async for gap, events in event_batches(feed, query, query.after):
+                with anyio.fail_after(SEND_TIMEOUT_SECONDS):
+                    if gap is not None:
+                        await websocket.send_text('{"type":"reset","missed_from":%d,"resume_at":%d}' % gap)
+                    for _, _, payload in events:
+                        await websocket.send_text(payload.decode())
+        except TimeoutError:
+            await websocket.close(code=TRY_AGAIN_LATER)
+        else:
+            await websocket.close()
+        cancel.cancel()
+
+    async def watch_disconnect(cancel: anyio.CancelScope) -> None:
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            cancel.cancel()
+
+    async with anyio.create_task_group() as tasks:
+        tasks.start_soon(send_events, tasks.cancel_scope)
+        tasks.start_soon(watch_disconnect, tasks.cancel_scope)
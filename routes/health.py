@@ -0,0 +1,27 @@
+from fastapi import APIRouter, status
+from schemas.models import Readiness
+from routes.responses import entity_response
+from routes.timing import TimedRoute
+from services.dependencies import get_durable, get_recovery, start_recovery
+
+router = APIRouter(tags=["health"], route_class=TimedRoute)
+
+@router.get("/ready", response_model=Readiness, responses={503: {"model": Readiness}})
+async def get_readiness():
+    progress = get_recovery()
+    if progress is None:
+        return entity_response(Readiness(ready=True, phase="ready"))
+    if not progress.ready:
+        start_recovery()
+    durable = get_durable()
+    readiness = Readiness(
+        ready=progress.ready,
+        phase=progress.phase,
+        snapshot_segment=progress.snapshot_segment,
+        rows_loaded=progress.rows_loaded,
+        journal_records=progress.journal_records,
+        elapsed_seconds=round(progress.elapsed(), 3),
+        error=progress.error,
+        snapshot_error=durable.snapshot_error if durable is not None else None
+    )
+    return entity_response(readiness, status.HTTP_200_OK if progress.ready else status.HTTP_503_SERVICE_UNAVAILABLE)
@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Depends
+from schemas.models import CompactionStatus, TieringStatus
+from services.async_services import AsyncEnrollmentService
+from services.dependencies import get_enrollment_service
+from routes.timing import TimedRoute
+
+router = APIRouter(prefix="/maintenance", tags=["maintenance"], route_class=TimedRoute)
+
+@router.get("/compaction", response_model=CompactionStatus)
+async def get_compaction_status(enrollment_service: AsyncEnrollmentService = Depends(get_enrollment_service)):
+    return await enrollment_service.compaction_status()
+
+
+@router.get("/tiering", response_model=TieringStatus)
+async def get_tiering_status(enrollment_service: AsyncEnrollmentService = Depends(get_enrollment_service)):
+    return await enrollment_service.tiering_status()
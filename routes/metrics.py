@@ -0,0 +1,100 @@
+import anyio.to_thread
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from typing import List
+from schemas.models import TieringStatus
+from services.async_services import AsyncCourseService, AsyncEnrollmentService, AsyncUserService
+from services.dependencies import get_course_service, get_durable, get_enrollment_service, get_user_service
+from services.durability import DurableBackend
+from services.metrics import counter, gauge, render
+from routes.timing import TimedRoute
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+SVG_MEDIA_TYPE = "image/svg+xml"
+
+router = APIRouter(prefix="/metrics", tags=["metrics"], route_class=TimedRoute)
+
+
+def threadpool_metrics() -> List[str]:
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    statistics = limiter.statistics()
+    return (
+        gauge("edutrack_threadpool_threads", "Size of the worker threadpool.", {(): limiter.total_tokens})
+        + gauge("edutrack_threadpool_busy_threads", "Worker threads running a blocking call.", {(): statistics.borrowed_tokens})
+        + gauge("edutrack_threadpool_queue_depth", "Blocking calls waiting for a worker thread.", {(): statistics.tasks_waiting})
+    )
+
+
+def tiering_metrics(tiering: TieringStatus) -> List[str]:
+    return (
+        gauge(
+            "edutrack_enrollment_tier_rows", "Enrollments held in the live store and the cold archive.",
+            {(("tier", "live"),): tiering.live_rows, (("tier", "archive"),): tiering.archived_rows}
+        )
+        + counter(
+            "edutrack_archive_lookups_total", "Archive reads that fell through from the live store, by result.",
+            {(("result", "hit"),): tiering.archive_hits, (("result", "miss"),): tiering.archive_misses}
+        )
+        + counter(
+            "edutrack_archive_block_reads_total", "Archive blocks served from the block cache or read from disk.",
+            {(("source", "cache"),): tiering.block_cache_hits, (("source", "disk"),): tiering.block_reads}
+        )
+    )
+
+
+def snapshot_metrics(durable: DurableBackend) -> List[str]:
+    return (
+        counter(
+            "edutrack_snapshots_total", "Snapshots written (ok) and background snapshot attempts that failed.",
+            {(("result", "ok"),): durable.snapshots, (("result", "failed"),): durable.snapshot_failures}
+        )
+        + gauge(
+            "edutrack_snapshot_failing", "1 while the latest background snapshot attempt has failed.",
+            {(): int(durable.snapshot_error is not None)}
+        )
+    )
+
+
+@router.get("", response_class=Response)
+async def get_metrics(
+    request: Request,
+    user_service: AsyncUserService = Depends(get_user_service),
+    course_service: AsyncCourseService = Depends(get_course_service),
+    enrollment_service: AsyncEnrollmentService = Depends(get_enrollment_service)
+):
+    rows = {
+        (("service", "users"),): await user_service.count(),
+        (("service", "courses"),): await course_service.count(),
+        (("service", "enrollments"),): await enrollment_service.count(),
+    }
+    flights = {
+        (("service", name), ("role", role)): getattr(service.flights, role)
+        for name, service in (("users", user_service), ("courses", course_service), ("enrollments", enrollment_service))
+        if service.flights is not None
+        for role in ("leaders", "followers")
+    }
+    tiering = await enrollment_service.tiering_status()
+    admission = request.app.state.admission
+    durable = get_durable()
+    body = render(
+        request.app.state.metrics.render(),
+        threadpool_metrics(),
+        gauge("edutrack_store_rows", "Rows held by each service's store.", rows),
+        tiering_metrics(tiering) if tiering.enabled or tiering.archived_rows else [],
+        counter(
+            "edutrack_coalesced_reads_total",
+            "Reads that ran the store call (leaders) or shared an identical in-flight call (followers).", flights
+        ) if flights else [],
+        snapshot_metrics(durable) if durable is not None else [],
+        admission.render() if admission is not None else []
+    )
+    return Response(content=body, media_type=PROMETHEUS_MEDIA_TYPE)
+
+
+@router.get("/profiles/{profile_id}", response_class=Response)
+async def get_profile(request: Request, profile_id: str, format: str = Query("svg", pattern="^(svg|folded)$")):
+    profile = request.app.state.profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    if format == "folded":
+        return Response(content=profile.folded(), media_type="text/plain; charset=utf-8")
+    return Response(content=profile.svg(), media_type=SVG_MEDIA_TYPE)
@@ -0,0 +1,77 @@
+from fastapi import HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+from pydantic import BaseModel, TypeAdapter
+from services.pagination import decode_cursor
+from services.serialization import adapter_json, model_json
+from routes.conditional import Rendered, conditional_response
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MAX_PAGE_SIZE = 1000
+SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 100
+STREAM_CHUNK_SIZE = 500
+
+Fetch = Callable[[int, Optional[str]], Awaitable[Tuple[List[BaseModel], Optional[str]]]]
+FetchAll = Callable[[], Awaitable[List[BaseModel]]]
+
+
+class ListParams:
+    def __init__(self, limit: Optional[int], cursor: Optional[str], stream: bool):
+        self.limit = limit
+        self.cursor = cursor
+        self.stream = stream
+
+    @property
+    def paginated(self) -> bool:
+        return self.stream or self.limit is not None or self.cursor is not None
+
+
+async def list_params(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; enables cursor pagination"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    stream: bool = Query(False, description="Stream every record from the cursor onwards as NDJSON"),
+) -> ListParams:
+    return ListParams(limit, cursor, stream)
+
+
+async def search_params(
+    limit: int = Query(SEARCH_PAGE_SIZE, ge=1, le=MAX_SEARCH_PAGE_SIZE, description="Number of ranked results per page"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+) -> ListParams:
+    return ListParams(limit, cursor, False)
+
+
+async def iter_pages(fetch: Fetch, cursor: Optional[str] = None, chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[BaseModel]:
+    while True:
+        items, cursor = await fetch(chunk_size, cursor)
+        for item in items:
+            yield item
+        if cursor is None:
+            return
+
+
+async def ndjson_lines(fetch: Fetch, cursor: Optional[str]) -> AsyncIterator[bytes]:
+    async for item in iter_pages(fetch, cursor):
+        yield model_json(item) + b"\n"
+
+
+async def list_response(
+    request: Request, params: ListParams, fetch: Fetch, fetch_all: Optional[FetchAll], adapter: TypeAdapter, version: Tuple[int, ...]
+) -> Response:
+    try:
+        decode_cursor(params.cursor)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    if params.stream:
+        return StreamingResponse(ndjson_lines(fetch, params.cursor), media_type=NDJSON_MEDIA_TYPE)
+
+    async def render() -> Rendered:
+        if fetch_all is not None and not params.paginated:
+            return adapter_json(adapter, await fetch_all()), {}
+        items, next_cursor = await fetch(params.limit or MAX_PAGE_SIZE, params.cursor)
+        return adapter_json(adapter, items), {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+
+    return await conditional_response(request, version, render)
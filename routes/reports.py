@@ -0,0 +1,54 @@
+from fastapi import APIRouter, HTTPException, status, Depends, Request
+from pydantic import TypeAdapter
+from datetime import datetime
+from typing import List, Optional
+from schemas.models import CourseReport, DailyReport
+from services.async_services import AsyncCourseService, AsyncEnrollmentService
+from services.dependencies import get_course_service, get_enrollment_service
+from services.serialization import adapter_json
+from routes.conditional import Rendered, conditional_response, entity_body
+from routes.timing import TimedRoute
+
+router = APIRouter(prefix="/reports", tags=["reports"], route_class=TimedRoute)
+
+COURSE_REPORT_LIST = TypeAdapter(List[CourseReport])
+DAILY_REPORT_LIST = TypeAdapter(List[DailyReport])
+
+@router.get("/courses", response_model=List[CourseReport])
+async def get_course_reports(
+    request: Request,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    enrollment_service: AsyncEnrollmentService = Depends(get_enrollment_service)
+):
+    if since is not None and until is not None and since > until:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="since must not be after until")
+
+    async def render() -> Rendered:
+        return adapter_json(COURSE_REPORT_LIST, await enrollment_service.course_reports(since, until)), {}
+
+    return await conditional_response(request, (await enrollment_service.version(),), render)
+
+@router.get("/courses/{course_id}", response_model=CourseReport)
+async def get_course_report(
+    course_id: str,
+    request: Request,
+    course_service: AsyncCourseService = Depends(get_course_service),
+    enrollment_service: AsyncEnrollmentService = Depends(get_enrollment_service)
+):
+    if not await course_service.get_course(course_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
+    version = await enrollment_service.version(f"course:{course_id}")
+    return await conditional_response(request, (version,), entity_body(await enrollment_service.course_report(course_id)))
+
+@router.get("/daily", response_model=List[DailyReport])
+async def get_daily_report(
+    request: Request,
+    course_id: Optional[str] = None,
+    enrollment_service: AsyncEnrollmentService = Depends(get_enrollment_service)
+):
+    async def render() -> Rendered:
+        return adapter_json(DAILY_REPORT_LIST, await enrollment_service.daily_report(course_id)), {}
+
+    version = await enrollment_service.version() if course_id is None else await enrollment_service.version(f"course:{course_id}")
+    return await conditional_response(request, (version,), render)
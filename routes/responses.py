@@ -0,0 +1,13 @@
+from fastapi import Response, status
+from pydantic import BaseModel
+from typing import Dict, Optional
+from services.serialization import model_json
+
+JSON_MEDIA_TYPE = "application/json"
+
+def json_bytes_response(body: bytes, status_code: int = status.HTTP_200_OK, headers: Optional[Dict[str, str]] = None) -> Response:
+    return Response(content=body, status_code=status_code, media_type=JSON_MEDIA_TYPE, headers=headers)
+
+
+def entity_response(entity: BaseModel, status_code: int = status.HTTP_200_OK) -> Response:
+    return json_bytes_response(model_json(entity), status_code)
@@ -0,0 +1,37 @@
+import functools
+import time
+from typing import Awaitable, Callable
+from fastapi import Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+from services.metrics import current_timings
+
+
+def timed_endpoint(endpoint: Callable[..., Awaitable]) -> Callable[..., Awaitable]:
+    @functools.wraps(endpoint)
+    async def call(*args, **kwargs):
+        timings = current_timings()
+        if timings is not None:
+            timings.parsed()
+        return await endpoint(*args, **kwargs)
+    return call
+
+
+class TimedRoute(APIRoute):
+    def __init__(self, path: str, endpoint: Callable[..., Awaitable], **kwargs):
+        super().__init__(path, timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable[[Request], Awaitable[Response]]:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request: Request) -> Response:
+            timings = current_timings()
+            if timings is not None:
+                timings.parsing = time.perf_counter()
+            try:
+                return await handler(request)
+            except RequestValidationError:
+                if timings is not None:
+                    timings.parsed()
+                raise
+        return timed_handler
@@ -0,0 +1,131 @@
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, TypeAdapter
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Type
+from schemas.models import User, UserCreate, Course, CourseCreate, Enrollment, EnrollmentCreate, ImportRowError, ImportSummary, WaitlistEntry
+from services.async_services import AsyncCourseService, AsyncEnrollmentService, AsyncUserService
+from services.business_logic import CapacityNotSupportedError
+from services.dependencies import get_course_service, get_enrollment_service, get_user_service
+from services.transfer import CSV, NDJSON, RecordReader, RecordWriter, RowError, validate_records
+from routes.courses import SHARDED_CAPACITY_DETAIL
+from routes.enrollments import ENROLL_REJECTED_DETAIL
+from routes.pagination import NDJSON_MEDIA_TYPE, Fetch
+from routes.users import DUPLICATE_EMAIL_DETAIL
+from routes.timing import TimedRoute
+
+CSV_MEDIA_TYPE = "text/csv; charset=utf-8"
+IMPORT_BATCH_SIZE = 1000
+EXPORT_CHUNK_SIZE = 1000
+MAX_IMPORT_ERRORS = 1000
+
+ENTITY_PATTERN = "^(users|courses|enrollments)$"
+FORMAT_PATTERN = "^(csv|ndjson)$"
+
+Create = Callable[[List[BaseModel]], Awaitable[List[Optional[BaseModel]]]]
+
+router = APIRouter(tags=["transfer"], route_class=TimedRoute)
+
+
+class Services:
+    def __init__(
+        self,
+        user_service: AsyncUserService = Depends(get_user_service),
+        course_service: AsyncCourseService = Depends(get_course_service),
+        enrollment_service: AsyncEnrollmentService = Depends(get_enrollment_service)
+    ):
+        self.user_service = user_service
+        self.course_service = course_service
+        self.enrollment_service = enrollment_service
+
+    def importer(self, entity: str) -> Tuple[Type[BaseModel], Create, str]:
+        if entity == "users":
+            return UserCreate, self.user_service.create_users, DUPLICATE_EMAIL_DETAIL
+        if entity == "courses":
+            return CourseCreate, self.course_service.create_courses, ""
+        return EnrollmentCreate, self.enrollment_service.enroll_users, ENROLL_REJECTED_DETAIL
+
+    def exporter(self, entity: str) -> Tuple[Type[BaseModel], Fetch]:
+        if entity == "users":
+            return User, self.user_service.list_users
+        if entity == "courses":
+            return Course, self.course_service.list_courses
+        return Enrollment, self.enrollment_service.list_enrollments
+
+
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.waitlisted = 0
+        self.failed = 0
+        self.errors: List[ImportRowError] = []
+        self.truncated = False
+
+    def fail(self, errors: List[RowError]) -> None:
+        self.failed += len(errors)
+        room = MAX_IMPORT_ERRORS - len(self.errors)
+        self.errors.extend(ImportRowError(row=row, detail=detail) for row, detail in errors[:room])
+        self.truncated = self.truncated or len(errors) > room
+
+
+async def import_batch(report: ImportReport, adapter: TypeAdapter, model: Type[BaseModel], create: Create, rejected: str, records) -> None:
+    valid, errors = validate_records(adapter, model, records)
+    if valid:
+        try:
+            results = await create([item for _, item in valid])
+        except CapacityNotSupportedError:
+            report.fail(sorted(errors + [(row, SHARDED_CAPACITY_DETAIL) for row, _ in valid]))
+            return
+        errors.extend((row, rejected) for (row, _), result in zip(valid, results) if result is None)
+        waitlisted = sum(isinstance(result, WaitlistEntry) for result in results)
+        report.created += sum(result is not None for result in results) - waitlisted
+        report.waitlisted += waitlisted
+    report.fail(sorted(errors))
+
+
+@router.post("/import", response_model=ImportSummary)
+async def import_records(
+    request: Request,
+    entity: str = Query(..., pattern=ENTITY_PATTERN),
+    format: str = Query(NDJSON, pattern=FORMAT_PATTERN),
+    services: Services = Depends()
+):
+    model, create, rejected = services.importer(entity)
+    adapter = TypeAdapter(List[model])
+    reader = RecordReader(format)
+    report = ImportReport()
+    pending = []
+    async for chunk in request.stream():
+        pending.extend(reader.feed(chunk))
+        while len(pending) >= IMPORT_BATCH_SIZE:
+            batch, pending = pending[:IMPORT_BATCH_SIZE], pending[IMPORT_BATCH_SIZE:]
+            await import_batch(report, adapter, model, create, rejected, batch)
+    pending.extend(reader.close())
+    for offset in range(0, len(pending), IMPORT_BATCH_SIZE):
+        await import_batch(report, adapter, model, create, rejected, pending[offset:offset + IMPORT_BATCH_SIZE])
+    return ImportSummary(
+        entity=entity, format=format, rows=reader.rows, created=report.created, waitlisted=report.waitlisted, failed=report.failed,
+        errors=report.errors, errors_truncated=report.truncated
+    )
+
+
+async def export_chunks(writer: RecordWriter, fetch: Fetch) -> AsyncIterator[bytes]:
+    cursor = None
+    while True:
+        items, cursor = await fetch(EXPORT_CHUNK_SIZE, cursor)
+        chunk = writer.write(items)
+        if chunk:
+            yield chunk
+        if cursor is None:
+            return
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_records(
+    entity: str = Query(..., pattern=ENTITY_PATTERN),
+    format: str = Query(NDJSON, pattern=FORMAT_PATTERN),
+    services: Services = Depends()
+):
+    model, fetch = services.exporter(entity)
+    headers: Dict[str, str] = {"Content-Disposition": f'attachment; filename="{entity}.{format}"'}
+    media_type = CSV_MEDIA_TYPE if format == CSV else NDJSON_MEDIA_TYPE
+    return StreamingResponse(export_chunks(RecordWriter(format, model), fetch), media_type=media_type, headers=headers)
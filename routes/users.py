@@ -1,41 +1,87 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request
+from pydantic import TypeAdapter
 from typing import List
-from schemas.models import User, UserCreate, UserUpdate
-from services.business_logic import UserService
+from schemas.models import User, UserCreate, UserUpdate, BatchItemResult
+from services.async_services import AsyncUserService
+from services.business_logic import DuplicateEmailError
 from services.dependencies import get_user_service
+from services.serialization import adapter_json
+from routes.pagination import ListParams, list_params, list_response, search_params
+from routes.batch import batch_response, check_batch_size
+from routes.responses import entity_response, json_bytes_response
+from routes.conditional import conditional_response, entity_body
+from routes.timing import TimedRoute
 
-router = APIRouter(prefix="/users", tags=["users"])
+router = APIRouter(prefix="/users", tags=["users"], route_class=TimedRoute)
+
+USER_LIST = TypeAdapter(List[User])
+
+DUPLICATE_EMAIL_DETAIL = "A user with this email already exists"
 
 @router.post("/", response_model=User, status_code=status.HTTP_201_CREATED)
-def create_user(user: UserCreate, user_service: UserService = Depends(get_user_service)):
-    return user_service.create_user(user)
+async def create_user(user: UserCreate, user_service: AsyncUserService = Depends(get_user_service)):
+    try:
+        return entity_response(await user_service.create_user(user), status.HTTP_201_CREATED)
+    except DuplicateEmailError:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=DUPLICATE_EMAIL_DETAIL)
+
+@router.post("/batch", response_model=List[BatchItemResult])
+async def create_users(users: List[UserCreate], user_service: AsyncUserService = Depends(get_user_service)):
+    check_batch_size(users)
+    return batch_response([
+        BatchItemResult(index=index, status=status.HTTP_201_CREATED, id=user.id) if user is not None
+        else BatchItemResult(index=index, status=status.HTTP_409_CONFLICT, detail=DUPLICATE_EMAIL_DETAIL)
+        for index, user in enumerate(await user_service.create_users(users))
+    ])
+
+@router.post("/lookup", tags=["lookup"], response_model=List[User])
+async def lookup_users(user_ids: List[str], user_service: AsyncUserService = Depends(get_user_service)):
+    check_batch_size(user_ids)
+    return json_bytes_response(adapter_json(USER_LIST, await user_service.get_many(list(dict.fromkeys(user_ids)))))
 
 @router.get("/", response_model=List[User])
-def get_all_users(user_service: UserService = Depends(get_user_service)):
-    return user_service.get_all_users()
+async def get_all_users(request: Request, params: ListParams = Depends(list_params), user_service: AsyncUserService = Depends(get_user_service)):
+    return await list_response(
+        request, params, user_service.list_users, user_service.get_all_users, USER_LIST, (await user_service.version(),)
+    )
+
+@router.get("/search", response_model=List[User])
+async def search_users(
+    request: Request,
+    q: str = Query(..., min_length=1, description="Words or word prefixes to match against name and email"),
+    params: ListParams = Depends(search_params),
+    user_service: AsyncUserService = Depends(get_user_service)
+):
+    async def fetch(limit, cursor):
+        return await user_service.search_users(q, limit, cursor)
+
+    return await list_response(request, params, fetch, None, USER_LIST, (await user_service.version(),))
 
 @router.get("/{user_id}", response_model=User)
-def get_user(user_id: str, user_service: UserService = Depends(get_user_service)):
-    user = user_service.get_user(user_id)
+async def get_user(user_id: str, request: Request, user_service: AsyncUserService = Depends(get_user_service)):
+    user = await user_service.get_user(user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    return user
+    return await conditional_response(request, (await user_service.version(user_id),), entity_body(user))
 
 @router.put("/{user_id}", response_model=User)
-def update_user(user_id: str, user_data: UserUpdate, user_service: UserService = Depends(get_user_service)):
-    user = user_service.update_user(user_id, user_data)
+async def update_user(user_id: str, user_data: UserUpdate, user_service: AsyncUserService = Depends(get_user_service)):
+    try:
+        user = await user_service.update_user(user_id, user_data)
+    except DuplicateEmailError:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=DUPLICATE_EMAIL_DETAIL)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    return user
+    return entity_response(user)
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_user(user_id: str, user_service: UserService = Depends(get_user_service)):
-    if not user_service.delete_user(user_id):
+async def delete_user(user_id: str, user_service: AsyncUserService = Depends(get_user_service)):
+    if not await user_service.delete_user(user_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
 @router.patch("/{user_id}/deactivate", response_model=User)
-def deactivate_user(user_id: str, user_service: UserService = Depends(get_user_service)):
-    user = user_service.deactivate_user(user_id)
+async def deactivate_user(user_id: str, user_service: AsyncUserService = Depends(get_user_service)):
+    user = await user_service.deactivate_user(user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    return user
+    return entity_response(user)
@@ -1,8 +1,13 @@
-from pydantic import BaseModel
-from typing import Optional
-from datetime import datetime
+from pydantic import BaseModel, PositiveInt, field_validator
+from typing import List, Optional
+from datetime import date, datetime
 import uuid
 
+def not_null(value):
+    if value is None:
+        raise ValueError("may be omitted but not null")
+    return value
+
 class User(BaseModel):
     id: str = None
     name: str
@@ -18,20 +23,27 @@ class UserUpdate(BaseModel):
     email: Optional[str] = None
     is_active: Optional[bool] = None
 
+    _not_null = field_validator("name", "email", "is_active")(not_null)
+
 class Course(BaseModel):
     id: str = None
     title: str
     description: str
     is_open: bool = True
+    capacity: Optional[int] = None
 
 class CourseCreate(BaseModel):
     title: str
     description: str
+    capacity: Optional[PositiveInt] = None
 
 class CourseUpdate(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
     is_open: Optional[bool] = None
+    capacity: Optional[PositiveInt] = None
+
+    _not_null = field_validator("title", "description", "is_open")(not_null)
 
 class Enrollment(BaseModel):
     id: str = None
@@ -40,9 +52,98 @@ class Enrollment(BaseModel):
     enrolled_date: datetime = None
     completed: bool = False
 
+class ExpandedEnrollment(Enrollment):
+    course: Optional[Course] = None
+
 class EnrollmentCreate(BaseModel):
     user_id: str
     course_id: str
 
 class EnrollmentUpdate(BaseModel):
     completed: Optional[bool] = None
+
+class WaitlistEntry(BaseModel):
+    user_id: str
+    course_id: str
+    position: int
+
+class WaitlistSlot(BaseModel):
+    id: str
+    course_id: str
+    user_id: str
+
+class BatchItemResult(BaseModel):
+    index: int
+    status: int
+    id: Optional[str] = None
+    detail: Optional[str] = None
+
+class CourseReport(BaseModel):
+    course_id: str
+    total: int
+    completed: int
+    completion_rate: float
+
+class DailyReport(BaseModel):
+    day: date
+    total: int
+    completed: int
+
+class CompactionJob(BaseModel):
+    kind: str
+    entity_id: str
+    state: str
+    attempt: int = 1
+    total: Optional[int] = None
+    removed: int = 0
+    error: Optional[str] = None
+
+class CompactionStatus(BaseModel):
+    pending: int
+    tombstones: int
+    jobs_completed: int
+    jobs_failed: int = 0
+    rows_removed: int
+    batches: int
+    busy_seconds: float
+    jobs: List[CompactionJob]
+
+class TieringStatus(BaseModel):
+    enabled: bool
+    live_rows: int
+    archived_rows: int = 0
+    archive_bytes: int = 0
+    segments: int = 0
+    migrated: int = 0
+    batches: int = 0
+    sweeps: int = 0
+    busy_seconds: float = 0.0
+    archive_hits: int = 0
+    archive_misses: int = 0
+    block_cache_hits: int = 0
+    block_reads: int = 0
+    error: Optional[str] = None
+
+class ImportRowError(BaseModel):
+    row: int
+    detail: str
+
+class ImportSummary(BaseModel):
+    entity: str
+    format: str
+    rows: int
+    created: int
+    waitlisted: int = 0
+    failed: int
+    errors: List[ImportRowError]
+    errors_truncated: bool = False
+
+class Readiness(BaseModel):
+    ready: bool
+    phase: str
+    snapshot_segment: Optional[int] = None
+    rows_loaded: int = 0
+    journal_records: int = 0
+    elapsed_seconds: float = 0.0
+    error: Optional[str] = None
+    snapshot_error: Optional[str] = None
@@ -0,0 +1,138 @@
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+from services.metrics import Counter, Labels, gauge
+
+READ, WRITE, SCAN = "read", "write", "scan"
+
+
+class RateLimiter:
+    def __init__(self, rate: float, burst: float, max_clients: int = 100_000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._lock = threading.Lock()
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    def take(self, client: str, now: Optional[float] = None) -> float:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = self._buckets[client] = [self.burst, now]
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(client)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            return (1 - bucket[0]) / self.rate
+
+
+class ClassLimiter:
+    SMOOTHING = 0.1
+
+    def __init__(self, name: str, limit: int, budget: float, initial_service_time: float = 0.005):
+        self.name = name
+        self.limit = limit
+        self.budget = budget
+        self.active = 0
+        self.service_time = initial_service_time
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def estimated_wait(self) -> float:
+        if self.active < self.limit and not self._waiters:
+            return 0.0
+        return (len(self._waiters) + 1) / self.limit * self.service_time
+
+    async def acquire(self, timeout: float) -> bool:
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return True
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await asyncio.wait_for(future, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(0.0)
+            raise
+        finally:
+            if not future.done() or future.cancelled():
+                future.cancel()
+                try:
+                    self._waiters.remove(future)
+                except ValueError:
+                    pass
+
+    def release(self, elapsed: float) -> None:
+        if elapsed:
+            self.service_time += (elapsed - self.service_time) * self.SMOOTHING
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+
+class Rejection:
+    def __init__(self, status_code: int, retry_after: float, detail: str):
+        self.status_code = status_code
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.detail = detail
+
+
+class AdmissionController:
+    def __init__(self, limiters: Dict[str, ClassLimiter], rate_limiter: Optional[RateLimiter] = None):
+        self.limiters = limiters
+        self.rate_limiter = rate_limiter
+        self.rejected = Counter("edutrack_admission_rejected_total", "Requests rejected by admission control.")
+
+    def _reject(self, route_class: str, reason: str, rejection: Rejection) -> Rejection:
+        self.rejected.inc((("class", route_class), ("reason", reason)))
+        return rejection
+
+    def check_rate(self, client: str, route_class: str) -> Optional[Rejection]:
+        if self.rate_limiter is None:
+            return None
+        wait = self.rate_limiter.take(client)
+        if wait:
+            return self._reject(route_class, "rate_limit", Rejection(429, wait, "Rate limit exceeded"))
+        return None
+
+    async def admit(self, route_class: str) -> Tuple[Optional[ClassLimiter], Optional[Rejection]]:
+        limiter = self.limiters.get(route_class)
+        if limiter is None:
+            return None, None
+        wait = limiter.estimated_wait()
+        if wait > limiter.budget:
+            return None, self._reject(route_class, "queue_budget", Rejection(503, wait, "Server is overloaded, retry later"))
+        if not await limiter.acquire(limiter.budget):
+            return None, self._reject(route_class, "queue_timeout", Rejection(503, limiter.budget, "Server is overloaded, retry later"))
+        return limiter, None
+
+    def render(self) -> List[str]:
+        def by_class(attribute: str) -> Dict[Labels, float]:
+            return {(("class", name),): getattr(limiter, attribute) for name, limiter in self.limiters.items()}
+
+        return (
+            gauge("edutrack_admission_in_flight", "Admitted requests per route class.", by_class("active"))
+            + gauge("edutrack_admission_queued", "Requests waiting for a slot per route class.", by_class("queued"))
+            + gauge("edutrack_admission_limit", "Concurrency cap per route class.", by_class("limit"))
+            + gauge("edutrack_admission_service_seconds", "Smoothed time an admitted request holds its slot.", by_class("service_time"))
+            + self.rejected.render()
+        )
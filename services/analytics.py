@@ -0,0 +1,235 @@
+import threading
+from array import array
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from schemas.models import Enrollment
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+NO_DATE = -(1 << 63)
+DAY_MICROS = 86_400_000_000
+
+Counts = Tuple[int, int]
+
+
+def encode_date(value: Optional[datetime]) -> Tuple[int, bool]:
+    if value is None:
+        return NO_DATE, False
+    if value.tzinfo is not None:
+        return (value.astimezone(timezone.utc).replace(tzinfo=None) - EPOCH) // MICROSECOND, True
+    return (value - EPOCH) // MICROSECOND, False
+
+
+def decode_date(micros: int, aware: bool) -> Optional[datetime]:
+    if micros == NO_DATE:
+        return None
+    value = EPOCH + micros * MICROSECOND
+    return value.replace(tzinfo=timezone.utc) if aware else value
+
+
+class EnrollmentColumns:
+    def __init__(self, courses: List[str], course: array, enrolled: array, completed: bytes, alive: bytes):
+        self.courses = courses
+        self.course = course
+        self.enrolled = enrolled
+        self.completed = completed
+        self.alive = alive
+
+    @classmethod
+    def from_enrollments(cls, enrollments: Iterable[Enrollment]) -> "EnrollmentColumns":
+        codes: Dict[str, int] = {}
+        course, enrolled = array("I"), array("q")
+        completed = bytearray()
+        for row, enrollment in enumerate(enrollments):
+            code = codes.setdefault(enrollment.course_id, len(codes))
+            course.append(code)
+            enrolled.append(encode_date(enrollment.enrolled_date)[0])
+            if row & 7 == 0:
+                completed.append(0)
+            if enrollment.completed:
+                completed[row >> 3] |= 1 << (row & 7)
+        alive = bytearray(b"\xff" * (len(course) >> 3))
+        if len(course) & 7:
+            alive.append((1 << (len(course) & 7)) - 1)
+        return cls(list(codes), course, enrolled, bytes(completed), bytes(alive))
+
+    def __len__(self) -> int:
+        return len(self.course)
+
+
+def _bounds(since: Optional[datetime], until: Optional[datetime]) -> Tuple[Optional[int], Optional[int]]:
+    return (
+        encode_date(since)[0] if since is not None else None,
+        encode_date(until)[0] if until is not None else None,
+    )
+
+
+def _completion_numpy(columns: EnrollmentColumns, since: Optional[int], until: Optional[int]) -> Dict[str, Counts]:
+    rows = len(columns)
+    course = numpy.frombuffer(columns.course, dtype=numpy.uint32)
+    mask = numpy.unpackbits(numpy.frombuffer(columns.alive, dtype=numpy.uint8), count=rows, bitorder="little").view(bool)
+    if since is not None or until is not None:
+        enrolled = numpy.frombuffer(columns.enrolled, dtype=numpy.int64)
+        mask = mask & (enrolled != NO_DATE)
+        if since is not None:
+            mask &= enrolled >= since
+        if until is not None:
+            mask &= enrolled < until
+    completed = numpy.unpackbits(numpy.frombuffer(columns.completed, dtype=numpy.uint8), count=rows, bitorder="little").view(bool)
+    totals = numpy.bincount(course[mask], minlength=len(columns.courses))
+    done = numpy.bincount(course[mask & completed], minlength=len(columns.courses))
+    return {columns.courses[code]: (int(totals[code]), int(done[code])) for code in numpy.flatnonzero(totals)}
+
+
+def _completion_python(columns: EnrollmentColumns, since: Optional[int], until: Optional[int]) -> Dict[str, Counts]:
+    bounded = since is not None or until is not None
+    totals = [0] * len(columns.courses)
+    done = [0] * len(columns.courses)
+    alive, completed, enrolled = columns.alive, columns.completed, columns.enrolled
+    for row, code in enumerate(columns.course):
+        bit = 1 << (row & 7)
+        if not alive[row >> 3] & bit:
+            continue
+        if bounded:
+            micros = enrolled[row]
+            if micros == NO_DATE or (since is not None and micros < since) or (until is not None and micros >= until):
+                continue
+        totals[code] += 1
+        if completed[row >> 3] & bit:
+            done[code] += 1
+    return {columns.courses[code]: (total, done[code]) for code, total in enumerate(totals) if total}
+
+
+def _day(micros: int) -> Optional[date]:
+    return None if micros == NO_DATE else (EPOCH + micros * MICROSECOND).date()
+
+
+def _daily_numpy(columns: EnrollmentColumns) -> Dict[Tuple[str, Optional[date]], Counts]:
+    rows = len(columns)
+    if not rows:
+        return {}
+    course = numpy.frombuffer(columns.course, dtype=numpy.uint32).astype(numpy.int64)
+    alive = numpy.unpackbits(numpy.frombuffer(columns.alive, dtype=numpy.uint8), count=rows, bitorder="little").view(bool)
+    completed = numpy.unpackbits(numpy.frombuffer(columns.completed, dtype=numpy.uint8), count=rows, bitorder="little")
+    enrolled = numpy.frombuffer(columns.enrolled, dtype=numpy.int64)
+    undated = enrolled == NO_DATE
+    days = numpy.where(undated, 0, enrolled // DAY_MICROS)
+    first = int(days[alive & ~undated].min()) if (alive & ~undated).any() else 0
+    span = int(days.max()) - first + 2
+    keys = course * span + numpy.where(undated, 0, days - first + 1)
+    unique, inverse = numpy.unique(keys[alive], return_inverse=True)
+    totals = numpy.bincount(inverse)
+    done = numpy.bincount(inverse, weights=completed[alive])
+    counts: Dict[Tuple[str, Optional[date]], Counts] = {}
+    for key, total, completed_count in zip(unique.tolist(), totals.tolist(), done.tolist()):
+        code, offset = divmod(key, span)
+        day = None if offset == 0 else _day((first + offset - 1) * DAY_MICROS)
+        counts[(columns.courses[code], day)] = (total, int(completed_count))
+    return counts
+
+
+def _daily_python(columns: EnrollmentColumns) -> Dict[Tuple[str, Optional[date]], Counts]:
+    counts: Dict[Tuple[str, Optional[date]], List[int]] = {}
+    days: Dict[int, Optional[date]] = {}
+    alive, completed, enrolled = columns.alive, columns.completed, columns.enrolled
+    for row, code in enumerate(columns.course):
+        bit = 1 << (row & 7)
+        if not alive[row >> 3] & bit:
+            continue
+        micros = enrolled[row]
+        day_index = NO_DATE if micros == NO_DATE else micros // DAY_MICROS
+        if day_index not in days:
+            days[day_index] = _day(micros)
+        bucket = counts.setdefault((columns.courses[code], days[day_index]), [0, 0])
+        bucket[0] += 1
+        if completed[row >> 3] & bit:
+            bucket[1] += 1
+    return {key: (total, done) for key, (total, done) in counts.items()}
+
+
+def completion_by_course(
+    columns: EnrollmentColumns, since: Optional[datetime] = None, until: Optional[datetime] = None
+) -> Dict[str, Counts]:
+    aggregate = _completion_numpy if numpy is not None else _completion_python
+    return aggregate(columns, *_bounds(since, until))
+
+
+class EnrollmentStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._courses: Dict[str, List[int]] = {}
+        self._days: Dict[date, List[int]] = {}
+        self._course_days: Dict[str, Dict[date, List[int]]] = {}
+
+    @staticmethod
+    def _bump(counters: Dict, key, total: int, completed: int) -> None:
+        bucket = counters.setdefault(key, [0, 0])
+        bucket[0] += total
+        bucket[1] += completed
+        if bucket[0] == 0:
+            del counters[key]
+
+    def _count(self, enrollment: Enrollment, total: int, completed: int) -> None:
+        self._bump(self._courses, enrollment.course_id, total, completed)
+        if enrollment.enrolled_date is None:
+            return
+        day = enrollment.enrolled_date.date()
+        self._bump(self._days, day, total, completed)
+        course_days = self._course_days.setdefault(enrollment.course_id, {})
+        self._bump(course_days, day, total, completed)
+        if not course_days:
+            del self._course_days[enrollment.course_id]
+
+    def added(self, enrollments: Iterable[Enrollment]) -> None:
+        with self._lock:
+            for enrollment in enrollments:
+                self._count(enrollment, 1, int(enrollment.completed))
+
+    def removed(self, enrollment: Enrollment) -> None:
+        with self._lock:
+            self._count(enrollment, -1, -int(enrollment.completed))
+
+    def completion_changed(self, enrollment: Enrollment) -> None:
+        with self._lock:
+            self._count(enrollment, 0, 1 if enrollment.completed else -1)
+
+    def rebuild(self, enrollments: Iterable[Enrollment]) -> None:
+        with self._lock:
+            self._courses.clear()
+            self._days.clear()
+            self._course_days.clear()
+            for enrollment in enrollments:
+                self._count(enrollment, 1, int(enrollment.completed))
+
+    def rebuild_columns(self, *sources: EnrollmentColumns) -> None:
+        daily = _daily_numpy if numpy is not None else _daily_python
+        counts = [count for columns in sources for count in daily(columns).items()]
+        with self._lock:
+            self._courses.clear()
+            self._days.clear()
+            self._course_days.clear()
+            for (course_id, day), (total, completed) in counts:
+                self._bump(self._courses, course_id, total, completed)
+                if day is None:
+                    continue
+                self._bump(self._days, day, total, completed)
+                self._bump(self._course_days.setdefault(course_id, {}), day, total, completed)
+
+    def course(self, course_id: str) -> Counts:
+        with self._lock:
+            total, completed = self._courses.get(course_id, (0, 0))
+            return total, completed
+
+    def courses(self) -> Dict[str, Counts]:
+        with self._lock:
+            return {course_id: (total, completed) for course_id, (total, completed) in self._courses.items()}
+
+    def daily(self, course_id: Optional[str] = None) -> List[Tuple[date, int, int]]:
+        with self._lock:
+            days = self._days if course_id is None else self._course_days.get(course_id, {})
+            return sorted((day, total, completed) for day, (total, completed) in days.items())
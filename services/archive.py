@@ -0,0 +1,321 @@
+import os
+import threading
+import zlib
+from array import array
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+from schemas.models import Enrollment
+from services.analytics import EnrollmentColumns, decode_date, encode_date
+from services.cache import LRUCache
+from services.columnar import Bitset, Interner
+from services.journal import RECORD_HEADER, fsync_directory, frame, read_records
+from services.serialization import decode, encode
+
+ARCHIVE_PREFIX = "archive-"
+ARCHIVE_SUFFIX = ".seg"
+ROWS, TOMBSTONES = b"R", b"T"
+EMPTY = -1
+
+Block = Dict[str, list]
+
+
+def archive_path(directory: str, segment: int) -> str:
+    return os.path.join(directory, f"{ARCHIVE_PREFIX}{segment:08d}{ARCHIVE_SUFFIX}")
+
+
+def list_archive_segments(directory: str) -> List[int]:
+    return sorted(
+        int(name[len(ARCHIVE_PREFIX):-len(ARCHIVE_SUFFIX)])
+        for name in os.listdir(directory)
+        if name.startswith(ARCHIVE_PREFIX) and name.endswith(ARCHIVE_SUFFIX)
+    )
+
+
+def fingerprint(key: str) -> int:
+    return zlib.crc32(key.encode())
+
+
+class EnrollmentArchive:
+    SEGMENT_BYTES = 64 * 1024 * 1024
+    CACHE_BLOCKS = 64
+    COMPRESSION_LEVEL = 6
+
+    def __init__(self, directory: str, segment_bytes: int = SEGMENT_BYTES, cache_blocks: int = CACHE_BLOCKS):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes = 0
+        self._lock = threading.RLock()
+        self._cache: LRUCache[Block] = LRUCache(cache_blocks)
+        self._block_segment = array("I")
+        self._block_offset = array("Q")
+        self._block_length = array("I")
+        self._block_row = array("I")
+        self._fingerprint = array("I")
+        self._user = array("I")
+        self._course = array("I")
+        self._enrolled = array("q")
+        self._completed = Bitset()
+        self._alive = Bitset()
+        self._live = 0
+        self._users = Interner()
+        self._courses = Interner()
+        self._by_user: Dict[int, array] = {}
+        self._by_course: Dict[int, array] = {}
+        self._slots = array("i", [EMPTY]) * 1024
+        segments = list_archive_segments(directory)
+        for segment in segments:
+            self._load(segment)
+        self._segment = segments[-1] if segments else 1
+        self._file = open(archive_path(directory, self._segment), "ab")
+
+    def __len__(self) -> int:
+        return self._live
+
+    @property
+    def segments(self) -> int:
+        return len(list_archive_segments(self.directory))
+
+    @property
+    def cache_hits(self) -> int:
+        return self._cache.hits
+
+    @property
+    def block_reads(self) -> int:
+        return self._cache.misses
+
+    def _load(self, segment: int) -> None:
+        path = archive_path(self.directory, segment)
+        records, end = read_records(path)
+        offset = 0
+        for record in records:
+            start = offset + RECORD_HEADER.size
+            if record[:1] == ROWS:
+                self._index(segment, start, len(record), self._decode(record))
+            else:
+                self._kill(decode(record[1:]))
+            offset = start + len(record)
+        if end < os.path.getsize(path):
+            os.truncate(path, end)
+        self.bytes += end
+
+    @staticmethod
+    def _columns(enrollments: List[Enrollment]) -> Block:
+        dates = [encode_date(enrollment.enrolled_date) for enrollment in enrollments]
+        return {
+            "id": [enrollment.id for enrollment in enrollments],
+            "user_id": [enrollment.user_id for enrollment in enrollments],
+            "course_id": [enrollment.course_id for enrollment in enrollments],
+            "enrolled": [micros for micros, _ in dates],
+            "aware": [aware for _, aware in dates],
+            "completed": [enrollment.completed for enrollment in enrollments],
+        }
+
+    @staticmethod
+    def _decode(payload: bytes) -> Block:
+        return decode(zlib.decompress(payload[1:]))
+
+    def _index(self, segment: int, offset: int, length: int, block: Block) -> None:
+        self._block_segment.append(segment)
+        self._block_offset.append(offset)
+        self._block_length.append(length)
+        self._block_row.append(len(self._fingerprint))
+        for key, user_id, course_id, micros, completed in zip(
+            block["id"], block["user_id"], block["course_id"], block["enrolled"], block["completed"]
+        ):
+            row = len(self._fingerprint)
+            user, course = self._users.code(user_id), self._courses.code(course_id)
+            self._fingerprint.append(fingerprint(key))
+            self._user.append(user)
+            self._course.append(course)
+            self._enrolled.append(micros)
+            self._completed.append(row, completed)
+            self._alive.append(row, True)
+            self._by_user.setdefault(user, array("I")).append(row)
+            self._by_course.setdefault(course, array("I")).append(row)
+            self._live += 1
+            self._slots[self._free_slot(self._fingerprint[row])] = row
+            if len(self._fingerprint) * 2 > len(self._slots):
+                self._grow_slots()
+
+    def _free_slot(self, value: int) -> int:
+        mask = len(self._slots) - 1
+        slot = value & mask
+        while self._slots[slot] != EMPTY:
+            slot = (slot + 1) & mask
+        return slot
+
+    def _grow_slots(self) -> None:
+        self._slots = array("i", [EMPTY]) * (len(self._slots) * 2)
+        for row in range(len(self._fingerprint)):
+            if self._alive.get(row):
+                self._slots[self._free_slot(self._fingerprint[row])] = row
+
+    def _candidates(self, key: str) -> List[int]:
+        value = fingerprint(key)
+        mask = len(self._slots) - 1
+        slot = value & mask
+        rows = []
+        while self._slots[slot] != EMPTY:
+            row = self._slots[slot]
+            if self._fingerprint[row] == value and self._alive.get(row):
+                rows.append(row)
+            slot = (slot + 1) & mask
+        return rows
+
+    def _block(self, block: int) -> Block:
+        cached = self._cache.get(block)
+        if cached is None:
+            with open(archive_path(self.directory, self._block_segment[block]), "rb") as file:
+                file.seek(self._block_offset[block])
+                cached = self._decode(file.read(self._block_length[block]))
+            self._cache.put(block, cached)
+        return cached
+
+    def _materialize(self, row: int) -> Enrollment:
+        block = bisect_right(self._block_row, row) - 1
+        columns, position = self._block(block), row - self._block_row[block]
+        return Enrollment.model_construct(
+            id=columns["id"][position],
+            user_id=columns["user_id"][position],
+            course_id=columns["course_id"][position],
+            enrolled_date=decode_date(columns["enrolled"][position], columns["aware"][position]),
+            completed=columns["completed"][position],
+        )
+
+    def _find(self, key: str) -> Optional[int]:
+        for row in self._candidates(key):
+            if self._materialize(row).id == key:
+                return row
+        return None
+
+    def _record(self, found: bool) -> None:
+        if found:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def contains(self, key: str) -> bool:
+        with self._lock:
+            return self._find(key) is not None
+
+    def get(self, key: str) -> Optional[Enrollment]:
+        with self._lock:
+            row = self._find(key)
+            self._record(row is not None)
+            return self._materialize(row) if row is not None else None
+
+    def _user_rows(self, user_id: str) -> Iterable[int]:
+        user = self._users.find(user_id)
+        return self._by_user.get(user, ()) if user is not None else ()
+
+    def by_user(self, user_id: str) -> List[Enrollment]:
+        with self._lock:
+            enrollments = [self._materialize(row) for row in self._user_rows(user_id)]
+            self._record(bool(enrollments))
+            return enrollments
+
+    def by_course(self, course_id: str) -> List[Enrollment]:
+        with self._lock:
+            course = self._courses.find(course_id)
+            enrollments = [self._materialize(row) for row in self._by_course.get(course, ())] if course is not None else []
+            self._record(bool(enrollments))
+            return enrollments
+
+    def scan(self, after: int, limit: int) -> List[Tuple[int, Enrollment]]:
+        with self._lock:
+            entries, row = [], after
+            while row < len(self._fingerprint) and len(entries) < limit:
+                if self._alive.get(row):
+                    entries.append((row + 1, self._materialize(row)))
+                row += 1
+            return entries
+
+    def values(self) -> List[Enrollment]:
+        with self._lock:
+            return [self._materialize(row) for row in range(len(self._fingerprint)) if self._alive.get(row)]
+
+    def by_pair(self, user_id: str, course_id: str) -> Optional[Enrollment]:
+        with self._lock:
+            course = self._courses.find(course_id)
+            for row in self._user_rows(user_id) if course is not None else ():
+                if self._course[row] == course:
+                    self._record(True)
+                    return self._materialize(row)
+            self._record(False)
+            return None
+
+    def has_user(self, user_id: str) -> bool:
+        with self._lock:
+            return bool(self._user_rows(user_id))
+
+    def user_ids(self) -> List[str]:
+        with self._lock:
+            return [self._users.value(user) for user in self._by_user]
+
+    def append(self, enrollments: List[Enrollment]) -> None:
+        if not enrollments:
+            return
+        block = self._columns(enrollments)
+        payload = ROWS + zlib.compress(encode(block), self.COMPRESSION_LEVEL)
+        with self._lock:
+            segment, offset = self._segment, self._file.tell() + RECORD_HEADER.size
+            self._write(frame(payload))
+            self._index(segment, offset, len(payload), block)
+            self._cache.put(len(self._block_row) - 1, block)
+
+    def _write(self, record: bytes) -> None:
+        self._file.write(record)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.bytes += len(record)
+        if self._file.tell() >= self.segment_bytes:
+            self._file.close()
+            self._segment += 1
+            self._file = open(archive_path(self.directory, self._segment), "ab")
+            fsync_directory(self.directory)
+
+    def _kill(self, rows: Iterable[int]) -> None:
+        for row in rows:
+            if not self._alive.get(row):
+                continue
+            self._alive.set(row, False)
+            self._live -= 1
+            for index, code in ((self._by_user, self._user[row]), (self._by_course, self._course[row])):
+                rows = index[code]
+                rows.remove(row)
+                if not rows:
+                    del index[code]
+
+    def _delete_rows(self, rows: List[int]) -> List[Enrollment]:
+        deleted = [self._materialize(row) for row in rows]
+        if rows:
+            self._write(frame(TOMBSTONES + encode(rows)))
+            self._kill(rows)
+        return deleted
+
+    def delete(self, key: str) -> Optional[Enrollment]:
+        with self._lock:
+            row = self._find(key)
+            return self._delete_rows([row])[0] if row is not None else None
+
+    def delete_user(self, user_id: str) -> List[Enrollment]:
+        with self._lock:
+            return self._delete_rows(list(self._user_rows(user_id)))
+
+    def delete_course(self, course_id: str) -> List[Enrollment]:
+        with self._lock:
+            course = self._courses.find(course_id)
+            return self._delete_rows(list(self._by_course.get(course, ())) if course is not None else [])
+
+    def snapshot_columns(self) -> EnrollmentColumns:
+        with self._lock:
+            return EnrollmentColumns(
+                self._courses.values(), self._course[:], self._enrolled[:], self._completed.to_bytes(), self._alive.to_bytes()
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
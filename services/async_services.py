@@ -0,0 +1,277 @@
+import asyncio
+import functools
+import threading
+import weakref
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple, TypeVar
+import anyio
+import anyio.to_thread
+from schemas.models import (
+    User, UserCreate, UserUpdate, Course, CourseCreate, CourseUpdate, Enrollment, EnrollmentCreate,
+    CourseReport, DailyReport, CompactionStatus, TieringStatus, WaitlistEntry
+)
+from services.business_logic import EnrollResult, UserService, CourseService, EnrollmentService
+from services.events import Event, EventLog
+from services.metrics import timed_service
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    def __init__(self):
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def run(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        key = (asyncio.get_running_loop(), key)
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = asyncio.ensure_future(call())
+            flight.add_done_callback(functools.partial(self._landed, key))
+            self.leaders += 1
+        else:
+            self.followers += 1
+        return await asyncio.shield(flight)
+
+    def _landed(self, key: Hashable, flight: asyncio.Future) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.cancelled():
+            flight.exception()
+
+
+class AsyncService:
+    def __init__(self, service, blocking: bool, coalesce: bool = True):
+        self.service = service
+        self.blocking = blocking
+        self.flights = SingleFlight() if coalesce else None
+
+    async def _run(self, method: Callable[..., T], *args: Any) -> T:
+        if self.blocking:
+            return await self._offload(method, *args)
+        return timed_service(method, *args)
+
+    async def _offload(self, method: Callable[..., T], *args: Any) -> T:
+        return await anyio.to_thread.run_sync(functools.partial(timed_service, method, *args))
+
+    async def _coalesced(self, version_key: Optional[str], method: Callable[..., T], *args: Any, offload: bool = False) -> T:
+        run = self._offload if offload else self._run
+        if self.flights is None or not (self.blocking or offload):
+            return await run(method, *args)
+        version = await self._run(self.service.version, version_key)
+        return await self.flights.run((method.__name__, args, version), functools.partial(run, method, *args))
+
+    async def version(self, key: Optional[str] = None) -> int:
+        return await self._run(self.service.version, key)
+
+    async def count(self) -> int:
+        return await self._run(self.service.count)
+
+
+class AsyncUserService(AsyncService):
+    service: UserService
+
+    async def create_user(self, user_data: UserCreate) -> User:
+        return await self._offload(self.service.create_user, user_data)
+
+    async def create_users(self, users_data: List[UserCreate]) -> List[Optional[User]]:
+        return await self._offload(self.service.create_users, users_data)
+
+    async def get_user(self, user_id: str) -> Optional[User]:
+        return await self._run(self.service.get_user, user_id)
+
+    async def get_many(self, user_ids: List[str]) -> List[User]:
+        return await self._run(self.service.get_many, user_ids)
+
+    async def get_all_users(self) -> List[User]:
+        return await self._offload(self.service.get_all_users)
+
+    async def list_users(self, limit: int, cursor: Optional[str] = None) -> Tuple[List[User], Optional[str]]:
+        return await self._run(self.service.list_users, limit, cursor)
+
+    async def search_users(self, query: str, limit: int, cursor: Optional[str] = None) -> Tuple[List[User], Optional[str]]:
+        return await self._offload(self.service.search_users, query, limit, cursor)
+
+    async def update_user(self, user_id: str, user_data: UserUpdate) -> Optional[User]:
+        return await self._offload(self.service.update_user, user_id, user_data)
+
+    async def delete_user(self, user_id: str) -> bool:
+        return await self._offload(self.service.delete_user, user_id)
+
+    async def deactivate_user(self, user_id: str) -> Optional[User]:
+        return await self._offload(self.service.deactivate_user, user_id)
+
+
+class AsyncCourseService(AsyncService):
+    service: CourseService
+
+    async def create_course(self, course_data: CourseCreate) -> Course:
+        return await self._offload(self.service.create_course, course_data)
+
+    async def create_courses(self, courses_data: List[CourseCreate]) -> List[Course]:
+        return await self._offload(self.service.create_courses, courses_data)
+
+    async def get_course(self, course_id: str) -> Optional[Course]:
+        return await self._coalesced(course_id, self.service.get_course, course_id)
+
+    async def get_many(self, course_ids: List[str]) -> List[Course]:
+        return await self._run(self.service.get_many, course_ids)
+
+    async def get_all_courses(self) -> List[Course]:
+        return await self._offload(self.service.get_all_courses)
+
+    async def list_courses(self, limit: int, cursor: Optional[str] = None) -> Tuple[List[Course], Optional[str]]:
+        return await self._run(self.service.list_courses, limit, cursor)
+
+    async def search_courses(self, query: str, limit: int, cursor: Optional[str] = None) -> Tuple[List[Course], Optional[str]]:
+        return await self._offload(self.service.search_courses, query, limit, cursor)
+
+    async def update_course(self, course_id: str, course_data: CourseUpdate) -> Optional[Course]:
+        return await self._offload(self.service.update_course, course_id, course_data)
+
+    async def delete_course(self, course_id: str) -> bool:
+        return await self._offload(self.service.delete_course, course_id)
+
+    async def close_enrollment(self, course_id: str) -> Optional[Course]:
+        return await self._offload(self.service.close_enrollment, course_id)
+
+
+class AsyncEnrollmentService(AsyncService):
+    service: EnrollmentService
+
+    async def enroll_user(self, enrollment_data: EnrollmentCreate) -> EnrollResult:
+        return await self._offload(self.service.enroll_user, enrollment_data)
+
+    async def enroll_users(self, enrollments_data: List[EnrollmentCreate]) -> List[EnrollResult]:
+        return await self._offload(self.service.enroll_users, enrollments_data)
+
+    async def get_waitlist(self, course_id: str) -> List[WaitlistEntry]:
+        return await self._offload(self.service.get_waitlist, course_id)
+
+    async def leave_waitlist(self, course_id: str, user_id: str) -> bool:
+        return await self._offload(self.service.leave_waitlist, course_id, user_id)
+
+    async def get_enrollment(self, enrollment_id: str) -> Optional[Enrollment]:
+        return await self._run(self.service.get_enrollment, enrollment_id)
+
+    async def get_all_enrollments(self) -> List[Enrollment]:
+        return await self._offload(self.service.get_all_enrollments)
+
+    async def list_enrollments(self, limit: int, cursor: Optional[str] = None) -> Tuple[List[Enrollment], Optional[str]]:
+        return await self._run(self.service.list_enrollments, limit, cursor)
+
+    async def list_enrollments_between(
+        self, since: Optional[datetime], until: Optional[datetime], limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[Enrollment], Optional[str]]:
+        return await self._run(self.service.list_enrollments_between, since, until, limit, cursor)
+
+    async def get_user_enrollments(self, user_id: str) -> List[Enrollment]:
+        return await self._coalesced(f"user:{user_id}", self.service.get_user_enrollments, user_id)
+
+    async def get_course_enrollments(self, course_id: str) -> List[Enrollment]:
+        return await self._offload(self.service.get_course_enrollments, course_id)
+
+    async def get_user_course_enrollment(self, user_id: str, course_id: str) -> Optional[Enrollment]:
+        return await self._run(self.service.get_user_course_enrollment, user_id, course_id)
+
+    async def get_course_users(self, course_id: str) -> List[User]:
+        return await self._coalesced(f"course:{course_id}", self.service.get_course_users, course_id, offload=True)
+
+    async def list_course_users(self, course_id: str, limit: int, cursor: Optional[str] = None) -> Tuple[List[User], Optional[str]]:
+        return await self._coalesced(f"course:{course_id}", self.service.list_course_users, course_id, limit, cursor, offload=True)
+
+    async def delete_enrollment(self, enrollment_id: str) -> bool:
+        return await self._offload(self.service.delete_enrollment, enrollment_id)
+
+    async def mark_completion(self, enrollment_id: str) -> Optional[Enrollment]:
+        return await self._offload(self.service.mark_completion, enrollment_id)
+
+    async def course_report(self, course_id: str) -> CourseReport:
+        return await self._coalesced(f"course:{course_id}", self.service.course_report, course_id)
+
+    async def course_reports(self, since: Optional[datetime] = None, until: Optional[datetime] = None) -> List[CourseReport]:
+        return await self._coalesced(None, self.service.course_reports, since, until, offload=True)
+
+    async def daily_report(self, course_id: Optional[str] = None) -> List[DailyReport]:
+        return await self._coalesced(None, self.service.daily_report, course_id, offload=True)
+
+    async def compaction_status(self) -> CompactionStatus:
+        return await self._run(self.service.compaction_status)
+
+    async def tiering_status(self) -> TieringStatus:
+        return await self._run(self.service.tiering_status)
+
+
+class _Broadcast:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.changed = asyncio.Event()
+        self.scheduled = False
+
+    def wake(self) -> None:
+        if not self.scheduled:
+            self.scheduled = True
+            try:
+                self.loop.call_soon_threadsafe(self.signal)
+            except RuntimeError:
+                pass
+
+    def signal(self) -> None:
+        self.scheduled = False
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+
+class AsyncEventFeed(AsyncService):
+    service: EventLog
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, service: EventLog, blocking: bool, remote: bool = False):
+        super().__init__(service, blocking)
+        self.remote = remote
+        self._broadcasts: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _Broadcast]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        if not remote:
+            service.add_waker(self._wake)
+
+    def _wake(self) -> None:
+        with self._lock:
+            broadcasts = list(self._broadcasts.values())
+        for broadcast in broadcasts:
+            broadcast.wake()
+
+    def _broadcast(self) -> _Broadcast:
+        loop = asyncio.get_running_loop()
+        broadcast = self._broadcasts.get(loop)
+        if broadcast is None:
+            with self._lock:
+                broadcast = self._broadcasts[loop] = _Broadcast(loop)
+            if self.remote:
+                loop.create_task(self._poll(broadcast))
+        return broadcast
+
+    async def _poll(self, broadcast: _Broadcast) -> None:
+        seen = await self.last_seq()
+        while True:
+            await asyncio.sleep(self.POLL_INTERVAL)
+            latest = await self.last_seq()
+            if latest != seen:
+                seen = latest
+                broadcast.signal()
+
+    async def last_seq(self) -> int:
+        return await self._run(self.service.last_seq)
+
+    async def read(self, after: int, limit: int) -> Tuple[int, List[Event]]:
+        return await self._run(self.service.read, after, limit)
+
+    async def wait(self, after: int, timeout: float) -> bool:
+        changed = self._broadcast().changed
+        latest = await self.last_seq() if self.remote else self.service.last_seq()
+        if latest > after:
+            return True
+        with anyio.move_on_after(timeout):
+            await changed.wait()
+            return True
+        return False
@@ -1,140 +1,819 @@
-from typing import List, Optional, Dict
-from datetime import datetime
+from typing import Callable, List, Optional, Dict, Set, Tuple, Union
+from datetime import datetime, timedelta
+import os
+import threading
+import time
 import uuid
-from schemas.models import User, UserCreate, UserUpdate, Course, CourseCreate, CourseUpdate, Enrollment, EnrollmentCreate
-
-class UserService:
-    def __init__(self):
-        self.users: Dict[str, User] = {}
+from pydantic import BaseModel
+from schemas.models import (
+    User, UserCreate, UserUpdate, Course, CourseCreate, CourseUpdate, Enrollment, EnrollmentCreate, CourseReport, DailyReport,
+    CompactionJob, CompactionStatus, TieringStatus, WaitlistEntry, WaitlistSlot
+)
+from services.analytics import EnrollmentColumns, EnrollmentStats, completion_by_course
+from services.archive import EnrollmentArchive
+from services.cache import LRUCache
+from services.compaction import CompactionWorker, PurgeJob
+from services.concurrency import StripedLock
+from services.pagination import decode_cursor, encode_cursor, paginate
+from services.search import SearchIndex
+from services.tiering import TieringWorker
+from services.versioning import VersionTracker
+from services.storage import Collection, EnrollmentCollection, MemoryCollection, MemoryEnrollmentCollection, date_bounds
+
+Listener = Callable[[str, object], None]
+EnrollResult = Optional[Union[Enrollment, WaitlistEntry]]
+
+class DuplicateEmailError(ValueError):
+    pass
+
+class CapacityNotSupportedError(ValueError):
+    pass
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+def waitlist_key(course_id: str, user_id: str) -> str:
+    return f"{course_id}:{user_id}"
+
+def new_id() -> str:
+    return str(uuid.uuid4())
+
+_time_id_lock = threading.Lock()
+_time_id_last = 0
+
+def time_ordered_id() -> str:
+    global _time_id_last
+    with _time_id_lock:
+        stamp = _time_id_last = max(time.time_ns() // 1_000_000 << 12, _time_id_last + 1)
+    tail = int.from_bytes(os.urandom(8), "big") & ((1 << 62) - 1)
+    return str(uuid.UUID(int=(stamp >> 12) << 80 | 0x7 << 76 | (stamp & 0xFFF) << 64 | 0b10 << 62 | tail))
+
+ID_SCHEMES: Dict[str, Callable[[], str]] = {"uuid4": new_id, "uuid7": time_ordered_id}
+
+class ObservableService:
+    def __init__(self, locks: Optional[StripedLock] = None, ids: Optional[Callable[[], str]] = None):
+        self._listeners: List[Listener] = []
+        self.versions = VersionTracker()
+        self.locks = locks if locks is not None else StripedLock()
+        self.ids = ids if ids is not None else new_id
+
+    def subscribe(self, listener: Listener) -> None:
+        self._listeners.append(listener)
+
+    def version(self, key: Optional[str] = None) -> int:
+        return self.versions.collection if key is None else self.versions.entity(key)
+
+    def _version_keys(self, entity) -> Tuple[str, ...]:
+        return (entity.id,)
+
+    def _notify(self, action: str, entity) -> None:
+        self.versions.bump(*self._version_keys(entity))
+        if action == "deleted":
+            self.versions.forget(entity.id)
+        for listener in self._listeners:
+            listener(action, entity)
+
+class UserService(ObservableService):
+    def __init__(
+        self, store: Optional[Collection[User]] = None, locks: Optional[StripedLock] = None, ids: Optional[Callable[[], str]] = None
+    ):
+        super().__init__(locks, ids)
+        self.users: Collection[User] = store if store is not None else MemoryCollection()
+        self._emails: Dict[str, str] = {}
+        self._search = SearchIndex()
+        if len(self.users):
+            self.rebuild()
+
+    def rebuild(self) -> None:
+        self._emails.clear()
+        self._search = SearchIndex()
+        for user in self.users.values():
+            self._index(None, user)
+
+    def _index(self, previous: Optional[User], user: Optional[User]) -> None:
+        if previous is not None and (user is None or previous.email != user.email):
+            email = normalize_email(previous.email)
+            if self._emails.get(email) == previous.id:
+                del self._emails[email]
+        if user is None:
+            self._search.remove(previous.id)
+            return
+        self._emails[normalize_email(user.email)] = user.id
+        self._search.put(user.id, ((user.name, 2), (user.email, 1)))
 
     def create_user(self, user_data: UserCreate) -> User:
-        user_id = str(uuid.uuid4())
-        user = User(id=user_id, **user_data.model_dump())
-        self.users[user_id] = user
-        return user
+        email = normalize_email(user_data.email)
+        with self.locks.hold(("email", email)):
+            if email in self._emails:
+                raise DuplicateEmailError(user_data.email)
+            user_id = self.ids()
+            user = User(id=user_id, **user_data.model_dump())
+            self.users.put(user)
+            self._index(None, user)
+            self._notify("created", user)
+            return user
+
+    def create_users(self, users_data: List[UserCreate]) -> List[Optional[User]]:
+        emails = [normalize_email(user_data.email) for user_data in users_data]
+        with self.locks.hold(*(("email", email) for email in set(emails))):
+            seen: Set[str] = set()
+            users: List[Optional[User]] = []
+            for user_data, email in zip(users_data, emails):
+                if email in self._emails or email in seen:
+                    users.append(None)
+                    continue
+                seen.add(email)
+                users.append(
+                    User.model_construct(id=self.ids(), name=user_data.name, email=user_data.email, is_active=True)
+                )
+            created = [user for user in users if user is not None]
+            self.users.put_many(created)
+            for user in created:
+                self._index(None, user)
+                self._notify("created", user)
+            return users
 
     def get_user(self, user_id: str) -> Optional[User]:
         return self.users.get(user_id)
 
+    def get_many(self, user_ids: List[str]) -> List[User]:
+        return self.users.get_many(user_ids)
+
+    def count(self) -> int:
+        return len(self.users)
+
     def get_all_users(self) -> List[User]:
-        return list(self.users.values())
+        return self.users.values()
 
-    def update_user(self, user_id: str, user_data: UserUpdate) -> Optional[User]:
-        if user_id not in self.users:
-            return None
+    def list_users(self, limit: int, cursor: Optional[str] = None) -> Tuple[List[User], Optional[str]]:
+        return paginate(self.users.scan, limit, cursor)
 
-        user = self.users[user_id]
-        update_data = user_data.model_dump(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(user, field, value)
+    def search_users(self, query: str, limit: int, cursor: Optional[str] = None) -> Tuple[List[User], Optional[str]]:
+        offset = decode_cursor(cursor)
+        user_ids, more = self._search.search(query, limit, offset)
+        return self.users.get_many(user_ids), encode_cursor(offset + limit) if more else None
 
-        return user
+    def rank_users(self, query: str, count: int) -> List[Tuple[int, User]]:
+        ranked = self._search.ranked(query, count)
+        users = {user.id: user for user in self.users.get_many([key for key, _ in ranked])}
+        return [(score, users[key]) for key, score in ranked if key in users]
+
+    def update_user(self, user_id: str, user_data: UserUpdate) -> Optional[User]:
+        return self._apply(user_id, user_data.model_dump(exclude_unset=True))
 
     def delete_user(self, user_id: str) -> bool:
-        if user_id in self.users:
-            del self.users[user_id]
+        with self.locks.hold(("user", user_id)):
+            user = self.users.delete(user_id)
+            if user is None:
+                return False
+            self._index(user, None)
+            self._notify("deleted", user)
             return True
-        return False
 
     def deactivate_user(self, user_id: str) -> Optional[User]:
-        if user_id not in self.users:
-            return None
-
-        self.users[user_id].is_active = False
-        return self.users[user_id]
-
-class CourseService:
-    def __init__(self):
-        self.courses: Dict[str, Course] = {}
+        return self._apply(user_id, {"is_active": False})
+
+    def reserve_email(self, email: str, user_id: str) -> None:
+        email = normalize_email(email)
+        with self.locks.hold(("email", email)):
+            if self._emails.setdefault(email, user_id) != user_id:
+                raise DuplicateEmailError(email)
+
+    def release_email(self, email: str, user_id: str) -> None:
+        email = normalize_email(email)
+        with self.locks.hold(("email", email)):
+            if self._emails.get(email) == user_id:
+                del self._emails[email]
+
+    def _apply(self, user_id: str, changes: Dict[str, object]) -> Optional[User]:
+        keys = [("user", user_id)]
+        email = changes.get("email")
+        if email is not None:
+            keys.append(("email", normalize_email(email)))
+        with self.locks.hold(*keys):
+            previous = self.users.get(user_id)
+            if previous is None:
+                return None
+            if email is not None and self._emails.get(normalize_email(email), user_id) != user_id:
+                raise DuplicateEmailError(email)
+
+            user = previous.model_copy(update=changes)
+            self.users.put(user)
+            self._index(previous, user)
+            self._notify("updated", user)
+            return user
+
+class CourseService(ObservableService):
+    def __init__(
+        self, store: Optional[Collection[Course]] = None, locks: Optional[StripedLock] = None, ids: Optional[Callable[[], str]] = None
+    ):
+        super().__init__(locks, ids)
+        self.courses: Collection[Course] = store if store is not None else MemoryCollection()
+        self._search = SearchIndex()
+        if len(self.courses):
+            self.rebuild()
+
+    def rebuild(self) -> None:
+        self._search = SearchIndex()
+        for course in self.courses.values():
+            self._index(course)
+
+    def _index(self, course: Course) -> None:
+        self._search.put(course.id, ((course.title, 2), (course.description, 1)))
 
     def create_course(self, course_data: CourseCreate) -> Course:
-        course_id = str(uuid.uuid4())
+        course_id = self.ids()
         course = Course(id=course_id, **course_data.model_dump())
-        self.courses[course_id] = course
+        self.courses.put(course)
+        self._index(course)
+        self._notify("created", course)
         return course
 
+    def create_courses(self, courses_data: List[CourseCreate]) -> List[Course]:
+        courses = [
+            Course.model_construct(
+                id=self.ids(), title=course_data.title, description=course_data.description, is_open=True,
+                capacity=course_data.capacity
+            )
+            for course_data in courses_data
+        ]
+        self.courses.put_many(courses)
+        for course in courses:
+            self._index(course)
+            self._notify("created", course)
+        return courses
+
     def get_course(self, course_id: str) -> Optional[Course]:
         return self.courses.get(course_id)
 
+    def get_many(self, course_ids: List[str]) -> List[Course]:
+        return self.courses.get_many(course_ids)
+
+    def count(self) -> int:
+        return len(self.courses)
+
     def get_all_courses(self) -> List[Course]:
-        return list(self.courses.values())
+        return self.courses.values()
 
-    def update_course(self, course_id: str, course_data: CourseUpdate) -> Optional[Course]:
-        if course_id not in self.courses:
-            return None
+    def list_courses(self, limit: int, cursor: Optional[str] = None) -> Tuple[List[Course], Optional[str]]:
+        return paginate(self.courses.scan, limit, cursor)
 
-        course = self.courses[course_id]
-        update_data = course_data.model_dump(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(course, field, value)
+    def search_courses(self, query: str, limit: int, cursor: Optional[str] = None) -> Tuple[List[Course], Optional[str]]:
+        offset = decode_cursor(cursor)
+        course_ids, more = self._search.search(query, limit, offset)
+        return self.courses.get_many(course_ids), encode_cursor(offset + limit) if more else None
 
-        return course
+    def update_course(self, course_id: str, course_data: CourseUpdate) -> Optional[Course]:
+        return self._apply(course_id, course_data.model_dump(exclude_unset=True))
 
     def delete_course(self, course_id: str) -> bool:
-        if course_id in self.courses:
-            del self.courses[course_id]
+        with self.locks.hold(("course", course_id)):
+            course = self.courses.delete(course_id)
+            if course is None:
+                return False
+            self._search.remove(course_id)
+            self._notify("deleted", course)
             return True
-        return False
 
     def close_enrollment(self, course_id: str) -> Optional[Course]:
-        if course_id not in self.courses:
-            return None
-
-        self.courses[course_id].is_open = False
-        return self.courses[course_id]
-
-class EnrollmentService:
-    def __init__(self, user_service: UserService, course_service: CourseService):
-        self.enrollments: Dict[str, Enrollment] = {}
+        return self._apply(course_id, {"is_open": False})
+
+    def replicate(self, courses: List[Course]) -> None:
+        for course in courses:
+            with self.locks.hold(("course", course.id)):
+                previous = self.courses.get(course.id)
+                self.courses.put(course)
+                self._index(course)
+                self._notify("created" if previous is None else "updated", course)
+
+    def _apply(self, course_id: str, changes: Dict[str, object]) -> Optional[Course]:
+        with self.locks.hold(("course", course_id)):
+            course = self.courses.get(course_id)
+            if course is None:
+                return None
+
+            course = course.model_copy(update=changes)
+            self.courses.put(course)
+            if "title" in changes or "description" in changes:
+                self._index(course)
+            self._notify("updated", course)
+            return course
+
+class EnrollmentService(ObservableService):
+    ROSTER_CACHE_SIZE = 1024
+    BATCH_LOCK_CHUNK = 256
+    COMPACTION_BATCH_SIZE = 500
+    ENTITY_VERSIONS = 65_536
+    ARCHIVE_CURSOR = 1 << 62
+
+    def __init__(
+        self,
+        user_service: UserService,
+        course_service: CourseService,
+        store: Optional[EnrollmentCollection] = None,
+        locks: Optional[StripedLock] = None,
+        ids: Optional[Callable[[], str]] = None,
+        archive: Optional[EnrollmentArchive] = None,
+        waitlist: Optional[Collection[WaitlistSlot]] = None
+    ):
+        super().__init__(locks if locks is not None else user_service.locks, ids if ids is not None else user_service.ids)
+        self.versions = VersionTracker(self.ENTITY_VERSIONS)
+        self.enrollments: EnrollmentCollection = store if store is not None else MemoryEnrollmentCollection()
+        self.waitlist: Collection[WaitlistSlot] = waitlist if waitlist is not None else MemoryCollection()
+        self.archive = archive
+        self.tiering: Optional[TieringWorker] = None
+        self._tiering_after = 0
         self.user_service = user_service
         self.course_service = course_service
+        self._rosters: LRUCache[Tuple[int, List[User]]] = LRUCache(self.ROSTER_CACHE_SIZE)
+        self._waitlists: Dict[str, Dict[str, None]] = {}
+        for slot in self.waitlist.values():
+            self._waitlists.setdefault(slot.course_id, {})[slot.user_id] = None
+        self._columns: Optional[Tuple[int, EnrollmentColumns]] = None
+        self._archive_columns: Optional[Tuple[int, EnrollmentColumns]] = None
+        self.stats = EnrollmentStats()
+        if len(self.enrollments) or (archive is not None and len(archive)):
+            self.rebuild()
+        self._deleted_users: Set[str] = set()
+        self._deleted_courses: Set[str] = set()
+        self._tombstoned_at = 0
+        self.compactor = CompactionWorker(self._collect, self._purge, self._purged, self.COMPACTION_BATCH_SIZE)
+        user_service.subscribe(self._on_user_changed)
+        course_service.subscribe(self._on_course_changed)
+
+    def rebuild(self) -> None:
+        self._rosters.clear()
+        self._columns = self._archive_columns = None
+        if self.archive is not None:
+            self.stats.rebuild_columns(self.enrollments.snapshot_columns(), self.archive.snapshot_columns())
+        else:
+            self.stats.rebuild_columns(self.enrollments.snapshot_columns())
+
+    def _version_keys(self, enrollment: Enrollment) -> Tuple[str, ...]:
+        return (enrollment.id, f"user:{enrollment.user_id}", f"course:{enrollment.course_id}")
+
+    def version(self, key: Optional[str] = None) -> int:
+        return max(super().version(key), self._tombstoned_at)
+
+    def _on_user_changed(self, action: str, user: User) -> None:
+        if action == "created":
+            return
+        enrollments = self.enrollments.by_user(user.id)
+        if self.archive is not None:
+            enrollments = self._merge_archived(enrollments, self.archive.by_user(user.id))
+        course_ids = {enrollment.course_id for enrollment in enrollments}
+        for course_id in course_ids:
+            self._rosters.pop(course_id)
+        if course_ids:
+            self.versions.bump(*(f"course:{course_id}" for course_id in course_ids))
+        if action == "deleted" and course_ids:
+            self._tombstone(self._deleted_users, "user", user.id)
+
+    def _on_course_changed(self, action: str, course: Course) -> None:
+        if action == "updated":
+            self._promote(course.id)
+        if action == "deleted":
+            self._rosters.pop(course.id)
+            waitlist = self._waitlists.pop(course.id, None)
+            if waitlist:
+                self.waitlist.delete_many([waitlist_key(course.id, user_id) for user_id in waitlist])
+            self.versions.bump(f"course:{course.id}")
+            self._tombstone(self._deleted_courses, "course", course.id)
+
+    def _tombstone(self, tombstones: Set[str], kind: str, entity_id: str) -> None:
+        tombstones.add(entity_id)
+        self._tombstoned_at = self.versions.bump()
+        self.compactor.submit(PurgeJob(kind, entity_id))
+
+    def reap_orphans(self) -> int:
+        user_ids = set(self.enrollments.user_ids())
+        if self.archive is not None:
+            user_ids.update(self.archive.user_ids())
+        course_ids = set(self.enrollments.course_ids())
+        course_ids.update(course_id for course_id, (total, _) in self.stats.courses().items() if total)
+        missing_users = user_ids.difference(user.id for user in self.user_service.users.get_many(list(user_ids)))
+        missing_courses = course_ids.difference(course.id for course in self.course_service.courses.get_many(list(course_ids)))
+        for user_id in missing_users:
+            self._tombstone(self._deleted_users, "user", user_id)
+        for course_id in missing_courses:
+            self._tombstone(self._deleted_courses, "course", course_id)
+        return len(missing_users) + len(missing_courses)
+
+    def _visible(self, enrollment: Enrollment) -> bool:
+        return enrollment.user_id not in self._deleted_users and enrollment.course_id not in self._deleted_courses
+
+    def _collect(self, job: PurgeJob) -> List[str]:
+        enrollments = self.enrollments.by_user(job.entity_id) if job.kind == "user" else self.enrollments.by_course(job.entity_id)
+        return [enrollment.id for enrollment in enrollments]
+
+    def _purge(self, enrollment_ids: List[str]) -> int:
+        with self.locks.hold(*(("enrollment", enrollment_id) for enrollment_id in enrollment_ids)):
+            deleted = self.enrollments.delete_many(enrollment_ids)
+            self._removed(deleted)
+        self._promote_all(deleted)
+        return len(deleted)
+
+    def _purged(self, job: PurgeJob) -> None:
+        if self._collect(job):
+            self.compactor.submit(PurgeJob(job.kind, job.entity_id))
+            return
+        if self.archive is not None:
+            archived = self.archive.delete_user(job.entity_id) if job.kind == "user" else self.archive.delete_course(job.entity_id)
+            self._removed(archived)
+            self._promote_all(archived)
+            job.removed += len(archived)
+        (self._deleted_users if job.kind == "user" else self._deleted_courses).discard(job.entity_id)
+
+    def _removed(self, enrollments: List[Enrollment]) -> None:
+        for enrollment in enrollments:
+            self._rosters.pop(enrollment.course_id)
+            self.stats.removed(enrollment)
+            self._notify("deleted", enrollment)
+
+    def _promote_all(self, enrollments: List[Enrollment]) -> None:
+        for course_id in {enrollment.course_id for enrollment in enrollments}:
+            self._promote(course_id)
+
+    def compaction_status(self) -> CompactionStatus:
+        compactor = self.compactor
+        return CompactionStatus(
+            pending=compactor.pending(),
+            tombstones=len(self._deleted_users) + len(self._deleted_courses),
+            jobs_completed=compactor.jobs_completed,
+            jobs_failed=compactor.jobs_failed,
+            rows_removed=compactor.rows_removed,
+            batches=compactor.batches,
+            busy_seconds=compactor.busy_seconds,
+            jobs=[
+                CompactionJob(
+                    kind=job.kind, entity_id=job.entity_id, state=job.state, attempt=job.attempt, total=job.total, removed=job.removed,
+                    error=job.error
+                )
+                for job in compactor.jobs()
+            ]
+        )
 
-    def enroll_user(self, enrollment_data: EnrollmentCreate) -> Optional[Enrollment]:
-        user = self.user_service.get_user(enrollment_data.user_id)
-        if not user or not user.is_active:
-            return None
+    def archive_completed(self, older_than: datetime, limit: int) -> Tuple[int, bool]:
+        low, high = date_bounds(None, older_than)
+        scanned = self.enrollments.between(max(low, self._tiering_after + 1), high, limit)
+        done = len(scanned) < limit
+        self._tiering_after = 0 if done else scanned[-1][0]
+        candidates = [enrollment.id for _, enrollment in scanned if enrollment.completed and self._visible(enrollment)]
+        archived = 0
+        for offset in range(0, len(candidates), self.BATCH_LOCK_CHUNK):
+            chunk = candidates[offset:offset + self.BATCH_LOCK_CHUNK]
+            with self.locks.hold(*(("enrollment", enrollment_id) for enrollment_id in chunk)):
+                moving = [enrollment for enrollment in self.enrollments.get_many(chunk) if enrollment.completed and self._visible(enrollment)]
+                self.archive.append([enrollment for enrollment in moving if not self.archive.contains(enrollment.id)])
+                self.enrollments.delete_many([enrollment.id for enrollment in moving])
+            if moving:
+                user_ids = {enrollment.user_id for enrollment in moving}
+                course_ids = {enrollment.course_id for enrollment in moving}
+                for course_id in course_ids:
+                    self._rosters.pop(course_id)
+                self.versions.bump(*(f"user:{user_id}" for user_id in user_ids), *(f"course:{course_id}" for course_id in course_ids))
+            archived += len(moving)
+        return archived, done
+
+    def start_tiering(self, age: timedelta, batch_size: int, interval: float) -> None:
+        self.tiering = TieringWorker(self.archive_completed, age, batch_size, interval)
+        self.tiering.start()
+
+    def stop_tiering(self) -> None:
+        if self.tiering is not None:
+            self.tiering.stop()
+        if self.archive is not None:
+            self.archive.close()
+
+    def tiering_status(self) -> TieringStatus:
+        archive, worker = self.archive, self.tiering
+        status = TieringStatus(enabled=worker is not None, live_rows=len(self.enrollments))
+        if archive is not None:
+            status.archived_rows = len(archive)
+            status.archive_bytes = archive.bytes
+            status.segments = archive.segments
+            status.archive_hits = archive.hits
+            status.archive_misses = archive.misses
+            status.block_cache_hits = archive.cache_hits
+            status.block_reads = archive.block_reads
+        if worker is not None:
+            status.migrated = worker.migrated
+            status.batches = worker.batches
+            status.sweeps = worker.sweeps
+            status.busy_seconds = worker.busy_seconds
+            status.error = worker.error
+        return status
+
+    def enroll_user(self, enrollment_data: EnrollmentCreate) -> EnrollResult:
+        user_id, course_id = enrollment_data.user_id, enrollment_data.course_id
+        with self.locks.hold(("user", user_id), ("course", course_id), ("pair", user_id, course_id)):
+            user = self.user_service.get_user(user_id)
+            if not user or not user.is_active:
+                return None
+
+            course = self.course_service.get_course(course_id)
+            if not course or not course.is_open:
+                return None
+
+            existing_enrollment = self.get_user_course_enrollment(user_id, course_id)
+            if existing_enrollment:
+                return None
+
+            if self._full(course):
+                return self._wait(user_id, course_id)
+
+            enrollment = self._new_enrollment(user_id, course_id, datetime.now())
+            self.enrollments.put(enrollment)
+            self._created([enrollment])
+            return enrollment
+
+    def enroll_users(self, enrollments_data: List[EnrollmentCreate]) -> List[EnrollResult]:
+        users: Dict[str, Optional[User]] = {}
+        courses: Dict[str, Optional[Course]] = {}
+        enrolled_date = datetime.now()
+        results: List[EnrollResult] = []
+        for offset in range(0, len(enrollments_data), self.BATCH_LOCK_CHUNK):
+            chunk = enrollments_data[offset:offset + self.BATCH_LOCK_CHUNK]
+            keys = [
+                key for data in chunk
+                for key in (("user", data.user_id), ("course", data.course_id), ("pair", data.user_id, data.course_id))
+            ]
+            with self.locks.hold(*keys):
+                results.extend(self._enroll_chunk(chunk, users, courses, enrolled_date))
+        return results
+
+    def _enroll_chunk(
+        self,
+        chunk: List[EnrollmentCreate],
+        users: Dict[str, Optional[User]],
+        courses: Dict[str, Optional[Course]],
+        enrolled_date: datetime
+    ) -> List[EnrollResult]:
+        self._resolve(users, [data.user_id for data in chunk], self.user_service.get_many)
+        self._resolve(courses, [data.course_id for data in chunk], self.course_service.get_many)
+        seen: Set[Tuple[str, str]] = set()
+        seats: Dict[str, int] = {}
+        results: List[EnrollResult] = []
+        for enrollment_data in chunk:
+            user_id, course_id = enrollment_data.user_id, enrollment_data.course_id
+            user, course = users[user_id], courses[course_id]
+            if (
+                not user or not user.is_active or not course or not course.is_open
+                or (user_id, course_id) in seen or self.get_user_course_enrollment(user_id, course_id)
+            ):
+                results.append(None)
+                continue
+            seen.add((user_id, course_id))
+            if self._full(course, seats.get(course_id, 0)):
+                results.append(self._wait(user_id, course_id))
+                continue
+            seats[course_id] = seats.get(course_id, 0) + 1
+            results.append(self._new_enrollment(user_id, course_id, enrolled_date))
+
+        created = [enrollment for enrollment in results if isinstance(enrollment, Enrollment)]
+        self.enrollments.put_many(created)
+        self._created(created)
+        return results
+
+    @staticmethod
+    def _resolve(found: Dict[str, Optional[BaseModel]], keys: List[str], get_many: Callable[[List[str]], List[BaseModel]]) -> None:
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        if not missing:
+            return
+        found.update(dict.fromkeys(missing))
+        found.update((item.id, item) for item in get_many(missing))
+
+    def _full(self, course: Course, pending: int = 0) -> bool:
+        if self._waitlists.get(course.id):
+            return True
+        return course.capacity is not None and self.stats.course(course.id)[0] + pending >= course.capacity
 
-        course = self.course_service.get_course(enrollment_data.course_id)
-        if not course or not course.is_open:
+    def _wait(self, user_id: str, course_id: str) -> Optional[WaitlistEntry]:
+        waitlist = self._waitlists.setdefault(course_id, {})
+        if user_id in waitlist:
             return None
+        waitlist[user_id] = None
+        self.waitlist.put(WaitlistSlot(id=waitlist_key(course_id, user_id), course_id=course_id, user_id=user_id))
+        return WaitlistEntry(user_id=user_id, course_id=course_id, position=len(waitlist))
+
+    def _promote(self, course_id: str) -> None:
+        if not self._waitlists.get(course_id):
+            return
+        with self.locks.hold(("course", course_id)):
+            waitlist = self._waitlists.get(course_id)
+            course = self.course_service.get_course(course_id)
+            if not waitlist or course is None or not course.is_open:
+                return
+            free = None if course.capacity is None else course.capacity - self.stats.course(course_id)[0]
+            promoted: List[Enrollment] = []
+            dequeued: List[str] = []
+            while waitlist and (free is None or len(promoted) < free):
+                user_id = next(iter(waitlist))
+                del waitlist[user_id]
+                dequeued.append(waitlist_key(course_id, user_id))
+                user = self.user_service.get_user(user_id)
+                if user and user.is_active and not self.get_user_course_enrollment(user_id, course_id):
+                    promoted.append(self._new_enrollment(user_id, course_id, datetime.now()))
+            if not waitlist:
+                del self._waitlists[course_id]
+            self.enrollments.put_many(promoted)
+            self.waitlist.delete_many(dequeued)
+            self._created(promoted)
+
+    def get_waitlist(self, course_id: str) -> List[WaitlistEntry]:
+        with self.locks.hold(("course", course_id)):
+            user_ids = list(self._waitlists.get(course_id, ()))
+        return [WaitlistEntry(user_id=user_id, course_id=course_id, position=position) for position, user_id in enumerate(user_ids, 1)]
+
+    def leave_waitlist(self, course_id: str, user_id: str) -> bool:
+        with self.locks.hold(("course", course_id)):
+            waitlist = self._waitlists.get(course_id)
+            if not waitlist or user_id not in waitlist:
+                return False
+            del waitlist[user_id]
+            if not waitlist:
+                del self._waitlists[course_id]
+            self.waitlist.delete(waitlist_key(course_id, user_id))
+            return True
 
-        existing_enrollment = self.get_user_course_enrollment(
-            enrollment_data.user_id, enrollment_data.course_id
+    def _created(self, enrollments: List[Enrollment]) -> None:
+        self.stats.added(enrollments)
+        for enrollment in enrollments:
+            self._rosters.pop(enrollment.course_id)
+            self._notify("created", enrollment)
+
+    def _new_enrollment(self, user_id: str, course_id: str, enrolled_date: datetime) -> Enrollment:
+        return Enrollment(
+            id=self.ids(),
+            user_id=user_id,
+            course_id=course_id,
+            enrolled_date=enrolled_date
         )
-        if existing_enrollment:
-            return None
 
-        enrollment_id = str(uuid.uuid4())
-        enrollment = Enrollment(
-            id=enrollment_id,
-            user_id=enrollment_data.user_id,
-            course_id=enrollment_data.course_id,
-            enrolled_date=datetime.now()
-        )
-        self.enrollments[enrollment_id] = enrollment
+    def _live(self, enrollments: List[Enrollment]) -> List[Enrollment]:
+        if not self._deleted_users and not self._deleted_courses:
+            return enrollments
+        return [enrollment for enrollment in enrollments if self._visible(enrollment)]
+
+    def _scan(self, after: int, limit: int) -> List[Tuple[int, Enrollment]]:
+        entries = self._visible_scan(self.enrollments.scan, after, limit) if after < self.ARCHIVE_CURSOR else []
+        if self.archive is None or len(entries) >= limit:
+            return entries
+        return entries + self._visible_scan(self._archive_scan, max(after, self.ARCHIVE_CURSOR), limit - len(entries))
+
+    def _archive_scan(self, after: int, limit: int) -> List[Tuple[int, Enrollment]]:
+        return [(self.ARCHIVE_CURSOR + key, enrollment) for key, enrollment in self.archive.scan(after - self.ARCHIVE_CURSOR, limit)]
+
+    def _visible_scan(self, scan: Callable[[int, int], List[Tuple[int, Enrollment]]], after: int, limit: int) -> List[Tuple[int, Enrollment]]:
+        if not self._deleted_users and not self._deleted_courses:
+            return scan(after, limit)
+        entries: List[Tuple[int, Enrollment]] = []
+        while len(entries) < limit:
+            batch = scan(after, limit - len(entries))
+            if not batch:
+                break
+            entries.extend(entry for entry in batch if self._visible(entry[1]))
+            after = batch[-1][0]
+        return entries
+
+    def _find(self, enrollment_id: str) -> Optional[Enrollment]:
+        enrollment = self.enrollments.get(enrollment_id)
+        if enrollment is None and self.archive is not None:
+            enrollment = self.archive.get(enrollment_id)
         return enrollment
 
     def get_enrollment(self, enrollment_id: str) -> Optional[Enrollment]:
-        return self.enrollments.get(enrollment_id)
+        enrollment = self._find(enrollment_id)
+        return enrollment if enrollment is not None and self._visible(enrollment) else None
+
+    def count(self) -> int:
+        return len(self.enrollments)
 
     def get_all_enrollments(self) -> List[Enrollment]:
-        return list(self.enrollments.values())
+        enrollments = self.enrollments.values()
+        if self.archive is not None:
+            enrollments = self._merge_archived(enrollments, self.archive.values())
+        return self._live(enrollments)
+
+    @staticmethod
+    def _merge_archived(enrollments: List[Enrollment], archived: List[Enrollment]) -> List[Enrollment]:
+        live_ids = {enrollment.id for enrollment in enrollments}
+        return [enrollment for enrollment in archived if enrollment.id not in live_ids] + enrollments
+
+    def list_enrollments(self, limit: int, cursor: Optional[str] = None) -> Tuple[List[Enrollment], Optional[str]]:
+        return paginate(self._scan, limit, cursor)
+
+    def scan_between(self, since: Optional[datetime], until: Optional[datetime], after: int, limit: int) -> List[Tuple[int, Enrollment]]:
+        low, high = date_bounds(since, until)
+        return self._visible_scan(lambda key, count: self.enrollments.between(max(low, key + 1), high, count), after, limit)
+
+    def list_enrollments_between(
+        self, since: Optional[datetime], until: Optional[datetime], limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[Enrollment], Optional[str]]:
+        return paginate(lambda after, count: self.scan_between(since, until, after, count), limit, cursor)
 
     def get_user_enrollments(self, user_id: str) -> List[Enrollment]:
-        return [e for e in self.enrollments.values() if e.user_id == user_id]
+        enrollments = self.enrollments.by_user(user_id)
+        if self.archive is not None:
+            enrollments = self._merge_archived(enrollments, self.archive.by_user(user_id))
+        return self._live(enrollments)
+
+    def _course_enrollments(self, course_id: str) -> List[Enrollment]:
+        enrollments = self.enrollments.by_course(course_id)
+        if self.archive is not None:
+            enrollments = self._merge_archived(enrollments, self.archive.by_course(course_id))
+        return enrollments
 
     def get_course_enrollments(self, course_id: str) -> List[Enrollment]:
-        return [e for e in self.enrollments.values() if e.course_id == course_id]
+        return self._live(self._course_enrollments(course_id))
 
     def get_user_course_enrollment(self, user_id: str, course_id: str) -> Optional[Enrollment]:
-        for enrollment in self.enrollments.values():
-            if enrollment.user_id == user_id and enrollment.course_id == course_id:
-                return enrollment
-        return None
+        enrollment = self.enrollments.by_pair(user_id, course_id)
+        if enrollment is None and self.archive is not None:
+            enrollment = self.archive.by_pair(user_id, course_id)
+        return enrollment
 
-    def mark_completion(self, enrollment_id: str) -> Optional[Enrollment]:
-        if enrollment_id not in self.enrollments:
-            return None
+    def get_course_users(self, course_id: str) -> List[User]:
+        version = self.versions.entity(f"course:{course_id}")
+        cached = self._rosters.get(course_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        user_ids = [enrollment.user_id for enrollment in self._course_enrollments(course_id)]
+        roster = self.user_service.get_many(user_ids)
+        self._rosters.put(course_id, (version, roster))
+        return roster
+
+    def list_course_users(self, course_id: str, limit: int, cursor: Optional[str] = None) -> Tuple[List[User], Optional[str]]:
+        roster = self.get_course_users(course_id)
+        offset = decode_cursor(cursor)
+        end = offset + limit
+        return roster[offset:end], encode_cursor(end) if end < len(roster) else None
+
+    def delete_enrollment(self, enrollment_id: str) -> bool:
+        with self.locks.hold(("enrollment", enrollment_id)):
+            enrollment = self.enrollments.delete(enrollment_id)
+            if enrollment is None and self.archive is not None:
+                enrollment = self.archive.delete(enrollment_id)
+            if enrollment is None:
+                return False
+            self._rosters.pop(enrollment.course_id)
+            self.stats.removed(enrollment)
+            self._notify("deleted", enrollment)
+        self._promote(enrollment.course_id)
+        return True
 
-        self.enrollments[enrollment_id].completed = True
-        return self.enrollments[enrollment_id]
+    def mark_completion(self, enrollment_id: str) -> Optional[Enrollment]:
+        with self.locks.hold(("enrollment", enrollment_id)):
+            previous = self.enrollments.get(enrollment_id)
+            if previous is None and self.archive is not None:
+                archived = self.archive.get(enrollment_id)
+                return archived if archived is not None and self._visible(archived) else None
+            if previous is None or not self._visible(previous):
+                return None
+
+            enrollment = previous.model_copy(update={"completed": True})
+            self.enrollments.put(enrollment)
+            if not previous.completed:
+                self.stats.completion_changed(enrollment)
+            self._notify("updated" if previous.completed else "completed", enrollment)
+            return enrollment
+
+    def course_report(self, course_id: str) -> CourseReport:
+        return self._course_report(course_id, *self.stats.course(course_id))
+
+    def course_reports(self, since: Optional[datetime] = None, until: Optional[datetime] = None) -> List[CourseReport]:
+        if since is None and until is None:
+            counts = self.stats.courses()
+        else:
+            counts = completion_by_course(self._snapshot(), since, until)
+            if self.archive is not None:
+                for course_id, (total, completed) in completion_by_course(self._archive_snapshot(), since, until).items():
+                    live_total, live_completed = counts.get(course_id, (0, 0))
+                    counts[course_id] = (live_total + total, live_completed + completed)
+        return [self._course_report(course_id, total, completed) for course_id, (total, completed) in counts.items()]
+
+    def daily_report(self, course_id: Optional[str] = None) -> List[DailyReport]:
+        return [DailyReport(day=day, total=total, completed=completed) for day, total, completed in self.stats.daily(course_id)]
+
+    @staticmethod
+    def _course_report(course_id: str, total: int, completed: int) -> CourseReport:
+        return CourseReport(course_id=course_id, total=total, completed=completed, completion_rate=completed / total if total else 0.0)
+
+    def _snapshot(self) -> EnrollmentColumns:
+        version = self.versions.collection
+        cached = self._columns
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        columns = self.enrollments.snapshot_columns()
+        self._columns = (version, columns)
+        return columns
+
+    def _archive_snapshot(self) -> EnrollmentColumns:
+        version = self.versions.collection
+        cached = self._archive_columns
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        columns = self.archive.snapshot_columns()
+        self._archive_columns = (version, columns)
+        return columns
@@ -0,0 +1,358 @@
+import threading
+import uuid
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import timezone
+from typing import Dict, List, Optional, Tuple
+from schemas.models import Enrollment
+from services.analytics import EPOCH, MICROSECOND, NO_DATE, EnrollmentColumns, encode_date
+from services.storage import EnrollmentCollection, date_key
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+EMPTY = -1
+MASK64 = (1 << 64) - 1
+ARRAY_COLUMNS = ("seq", "id_hi", "id_lo", "user", "course", "enrolled")
+BIT_COLUMNS = ("completed", "aware", "alive")
+
+
+class Interner:
+    def __init__(self):
+        self._codes: Dict[str, int] = {}
+        self._values: List[str] = []
+
+    def code(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self._values)
+            self._codes[value] = code
+            self._values.append(value)
+        return code
+
+    def find(self, value: str) -> Optional[int]:
+        return self._codes.get(value)
+
+    def value(self, code: int) -> str:
+        return self._values[code]
+
+    def values(self) -> List[str]:
+        return list(self._values)
+
+    @classmethod
+    def from_values(cls, values: List[str]) -> "Interner":
+        interner = cls()
+        interner._values = list(values)
+        interner._codes = {value: code for code, value in enumerate(interner._values)}
+        return interner
+
+
+class Bitset:
+    def __init__(self):
+        self._bytes = bytearray()
+
+    def append(self, size: int, value: bool) -> None:
+        if size >> 3 >= len(self._bytes):
+            self._bytes.append(0)
+        self.set(size, value)
+
+    def get(self, index: int) -> bool:
+        return bool(self._bytes[index >> 3] & (1 << (index & 7)))
+
+    def set(self, index: int, value: bool) -> None:
+        if value:
+            self._bytes[index >> 3] |= 1 << (index & 7)
+        else:
+            self._bytes[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+
+    def to_bytes(self) -> bytes:
+        return bytes(self._bytes)
+
+    @classmethod
+    def from_bytes(cls, data) -> "Bitset":
+        bitset = cls()
+        bitset._bytes = bytearray(data)
+        return bitset
+
+
+class CompactEnrollmentCollection(EnrollmentCollection):
+    def __init__(self):
+        self._init_columns()
+        self._users = Interner()
+        self._courses = Interner()
+        self._next_seq = 1
+        self._lock = threading.RLock()
+
+    def _init_columns(self) -> None:
+        self._seq = array("Q")
+        self._id_hi = array("Q")
+        self._id_lo = array("Q")
+        self._user = array("I")
+        self._course = array("I")
+        self._enrolled = array("q")
+        self._completed = Bitset()
+        self._aware = Bitset()
+        self._alive = Bitset()
+        self._slots = array("q", [EMPTY]) * 1024
+        self._by_user: Dict[int, array] = {}
+        self._by_course: Dict[int, array] = {}
+        self._by_date = array("I")
+        self._dates_sorted = True
+        self._live = 0
+
+    def _rows(self) -> int:
+        return len(self._seq)
+
+    def _find_slot(self, hi: int, lo: int) -> int:
+        mask = len(self._slots) - 1
+        slot = (lo ^ hi) & mask
+        while True:
+            row = self._slots[slot]
+            if row == EMPTY or (self._id_lo[row] == lo and self._id_hi[row] == hi):
+                return slot
+            slot = (slot + 1) & mask
+
+    def _grow_slots(self) -> None:
+        self._slots = array("q", [EMPTY]) * (len(self._slots) * 2)
+        for row in range(self._rows()):
+            if self._alive.get(row):
+                self._slots[self._find_slot(self._id_hi[row], self._id_lo[row])] = row
+
+    def _row_of(self, key: str) -> Optional[int]:
+        try:
+            value = uuid.UUID(key).int
+        except (ValueError, AttributeError, TypeError):
+            return None
+        row = self._slots[self._find_slot(value >> 64, value & MASK64)]
+        return row if row != EMPTY and self._alive.get(row) else None
+
+    def _materialize(self, row: int) -> Enrollment:
+        micros = self._enrolled[row]
+        enrolled_date = None
+        if micros != NO_DATE:
+            enrolled_date = EPOCH + micros * MICROSECOND
+            if self._aware.get(row):
+                enrolled_date = enrolled_date.replace(tzinfo=timezone.utc)
+        return Enrollment.model_construct(
+            id=str(uuid.UUID(int=(self._id_hi[row] << 64) | self._id_lo[row])),
+            user_id=self._users.value(self._user[row]),
+            course_id=self._courses.value(self._course[row]),
+            enrolled_date=enrolled_date,
+            completed=self._completed.get(row),
+        )
+
+    def get(self, key: str) -> Optional[Enrollment]:
+        with self._lock:
+            row = self._row_of(key)
+            return self._materialize(row) if row is not None else None
+
+    def get_many(self, keys: List[str]) -> List[Enrollment]:
+        with self._lock:
+            rows = (self._row_of(key) for key in keys)
+            return [self._materialize(row) for row in rows if row is not None]
+
+    def put(self, item: Enrollment) -> None:
+        with self._lock:
+            value = uuid.UUID(item.id).int
+            hi, lo = value >> 64, value & MASK64
+            user, course = self._users.code(item.user_id), self._courses.code(item.course_id)
+            enrolled, aware = encode_date(item.enrolled_date)
+
+            slot = self._find_slot(hi, lo)
+            row = self._slots[slot]
+            if row != EMPTY and self._alive.get(row) and self._user[row] == user and self._course[row] == course:
+                if self._enrolled[row] != enrolled:
+                    self._dates_sorted = False
+                self._enrolled[row] = enrolled
+                self._aware.set(row, aware)
+                self._completed.set(row, item.completed)
+                return
+            if row != EMPTY and self._alive.get(row):
+                self._kill(row)
+
+            row = self._rows()
+            self._seq.append(self._next_seq)
+            self._next_seq += 1
+            self._id_hi.append(hi)
+            self._id_lo.append(lo)
+            self._user.append(user)
+            self._course.append(course)
+            self._enrolled.append(enrolled)
+            self._aware.append(row, aware)
+            self._completed.append(row, item.completed)
+            self._alive.append(row, True)
+            self._by_user.setdefault(user, array("I")).append(row)
+            self._by_course.setdefault(course, array("I")).append(row)
+            if self._by_date and self._enrolled[self._by_date[-1]] > enrolled:
+                self._dates_sorted = False
+            self._by_date.append(row)
+            self._slots[slot] = row
+            self._live += 1
+            if self._rows() * 2 > len(self._slots):
+                self._grow_slots()
+
+    def put_many(self, items: List[Enrollment]) -> None:
+        with self._lock:
+            for item in items:
+                self.put(item)
+
+    def _kill(self, row: int) -> None:
+        self._alive.set(row, False)
+        self._by_user[self._user[row]].remove(row)
+        self._by_course[self._course[row]].remove(row)
+        self._live -= 1
+
+    def delete(self, key: str) -> Optional[Enrollment]:
+        with self._lock:
+            row = self._row_of(key)
+            if row is None:
+                return None
+            enrollment = self._materialize(row)
+            self._kill(row)
+            if self._rows() > 1024 and self._live * 2 < self._rows():
+                self.compact()
+            return enrollment
+
+    def compact(self) -> None:
+        with self._lock:
+            live = [self._materialize(row) for row in range(self._rows()) if self._alive.get(row)]
+            seqs = [self._seq[row] for row in range(self._rows()) if self._alive.get(row)]
+            next_seq = self._next_seq
+            self._init_columns()
+            for seq, enrollment in zip(seqs, live):
+                self._next_seq = seq
+                self.put(enrollment)
+            self._next_seq = next_seq
+
+    def values(self) -> List[Enrollment]:
+        with self._lock:
+            return [self._materialize(row) for row in range(self._rows()) if self._alive.get(row)]
+
+    def scan(self, after: int, limit: int) -> List[Tuple[int, Enrollment]]:
+        with self._lock:
+            result = []
+            row = bisect_right(self._seq, after)
+            while row < self._rows() and len(result) < limit:
+                if self._alive.get(row):
+                    result.append((self._seq[row], self._materialize(row)))
+                row += 1
+            return result
+
+    def snapshot_columns(self) -> EnrollmentColumns:
+        with self._lock:
+            return EnrollmentColumns(
+                self._courses.values(), self._course[:], self._enrolled[:], self._completed.to_bytes(), self._alive.to_bytes()
+            )
+
+    def dump_columns(self) -> Tuple[Dict[str, object], Dict[str, object]]:
+        with self._lock:
+            meta = {"next_seq": self._next_seq, "live": self._live, "users": self._users.values(), "courses": self._courses.values()}
+            columns = {name: getattr(self, "_" + name)[:] for name in ARRAY_COLUMNS}
+            columns.update((name, getattr(self, "_" + name).to_bytes()) for name in BIT_COLUMNS)
+            columns["slots"] = self._slots[:]
+            return meta, columns
+
+    def load_columns(self, meta: Dict[str, object], columns: Dict[str, object]) -> None:
+        with self._lock:
+            self._init_columns()
+            for name in ARRAY_COLUMNS + ("slots",):
+                column = array(getattr(self, "_" + name).typecode)
+                column.frombytes(columns[name])
+                setattr(self, "_" + name, column)
+            for name in BIT_COLUMNS:
+                setattr(self, "_" + name, Bitset.from_bytes(columns[name]))
+            self._users = Interner.from_values(meta["users"])
+            self._courses = Interner.from_values(meta["courses"])
+            self._next_seq = meta["next_seq"]
+            self._live = meta["live"]
+            self._by_user = self._group_rows(self._user)
+            self._by_course = self._group_rows(self._course)
+            self._dates_sorted = False
+
+    def _group_rows(self, codes: array) -> Dict[int, array]:
+        rows = self._rows()
+        if numpy is None:
+            groups: Dict[int, array] = {}
+            alive = self._alive
+            for row in range(rows):
+                if alive.get(row):
+                    groups.setdefault(codes[row], array("I")).append(row)
+            return groups
+        alive = numpy.unpackbits(numpy.frombuffer(self._alive.to_bytes(), dtype=numpy.uint8), count=rows, bitorder="little")
+        live_rows = numpy.flatnonzero(alive).astype(numpy.uint32)
+        values = numpy.frombuffer(codes, dtype=numpy.uint32)[live_rows]
+        order = numpy.argsort(values, kind="stable")
+        ordered_rows, ordered_codes = live_rows[order], values[order]
+        starts = numpy.flatnonzero(numpy.diff(ordered_codes)) + 1
+        keys = ordered_codes[numpy.concatenate(([0], starts))] if len(ordered_codes) else ()
+        return {
+            int(code): array("I", chunk.tobytes())
+            for code, chunk in zip(keys, numpy.split(ordered_rows, starts))
+        }
+
+    def _sort_dates(self) -> None:
+        if numpy is None:
+            self._by_date = array("I", sorted((row for row in range(self._rows()) if self._alive.get(row)), key=self._enrolled.__getitem__))
+        else:
+            alive = numpy.unpackbits(numpy.frombuffer(self._alive.to_bytes(), dtype=numpy.uint8), count=self._rows(), bitorder="little")
+            live_rows = numpy.flatnonzero(alive).astype(numpy.uint32)
+            order = numpy.argsort(numpy.frombuffer(self._enrolled, dtype=numpy.int64)[live_rows], kind="stable")
+            self._by_date = array("I", live_rows[order].tobytes())
+        self._dates_sorted = True
+
+    def _date_key(self, row: int) -> int:
+        return date_key(self._enrolled[row], self._seq[row])
+
+    def between(self, low: int, high: int, limit: int) -> List[Tuple[int, Enrollment]]:
+        with self._lock:
+            if not self._dates_sorted:
+                self._sort_dates()
+            result = []
+            rows = self._by_date
+            position = bisect_left(rows, low, key=self._date_key)
+            while position < len(rows) and len(result) < limit:
+                row = rows[position]
+                key = self._date_key(row)
+                if key >= high:
+                    break
+                if self._alive.get(row):
+                    result.append((key, self._materialize(row)))
+                position += 1
+            return result
+
+    def by_user(self, user_id: str) -> List[Enrollment]:
+        with self._lock:
+            code = self._users.find(user_id)
+            return [self._materialize(row) for row in self._by_user.get(code, ())] if code is not None else []
+
+    def by_course(self, course_id: str) -> List[Enrollment]:
+        with self._lock:
+            code = self._courses.find(course_id)
+            return [self._materialize(row) for row in self._by_course.get(code, ())] if code is not None else []
+
+    def by_pair(self, user_id: str, course_id: str) -> Optional[Enrollment]:
+        with self._lock:
+            user, course = self._users.find(user_id), self._courses.find(course_id)
+            if user is None or course is None:
+                return None
+            for row in self._by_user.get(user, ()):
+                if self._course[row] == course:
+                    return self._materialize(row)
+            return None
+
+    def user_ids(self) -> List[str]:
+        with self._lock:
+            return [self._users.value(code) for code, rows in self._by_user.items() if rows]
+
+    def course_ids(self) -> List[str]:
+        with self._lock:
+            return [self._courses.value(code) for code, rows in self._by_course.items() if rows]
+
+    def __len__(self) -> int:
+        return self._live
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return self._row_of(key) is not None
@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, List, Optional
+
+
+class PurgeJob:
+    def __init__(self, kind: str, entity_id: str, attempt: int = 1):
+        self.kind = kind
+        self.entity_id = entity_id
+        self.attempt = attempt
+        self.state = "pending"
+        self.total: Optional[int] = None
+        self.removed = 0
+        self.error: Optional[str] = None
+
+
+class CompactionWorker:
+    HISTORY = 100
+    MAX_RETRY_DELAY = 60.0
+
+    def __init__(
+        self,
+        collect: Callable[[PurgeJob], List[str]],
+        purge: Callable[[List[str]], int],
+        finish: Callable[[PurgeJob], None],
+        batch_size: int = 500,
+        retry_delay: float = 1.0
+    ):
+        self.collect = collect
+        self.purge = purge
+        self.finish = finish
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self.jobs_completed = 0
+        self.jobs_failed = 0
+        self.rows_removed = 0
+        self.batches = 0
+        self.busy_seconds = 0.0
+        self._queue: Deque[PurgeJob] = deque()
+        self._history: Deque[PurgeJob] = deque(maxlen=self.HISTORY)
+        self._active: Optional[PurgeJob] = None
+        self._retrying = 0
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, job: PurgeJob) -> None:
+        with self._condition:
+            self._enqueue(job)
+
+    def _enqueue(self, job: PurgeJob) -> None:
+        self._queue.append(job)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="enrollment-compaction", daemon=True)
+            self._thread.start()
+        self._condition.notify_all()
+
+    def _retry(self, job: PurgeJob) -> None:
+        delay = min(self.MAX_RETRY_DELAY, self.retry_delay * 2 ** (job.attempt - 1))
+        timer = threading.Timer(delay, self._resubmit, (PurgeJob(job.kind, job.entity_id, job.attempt + 1),))
+        timer.daemon = True
+        self._retrying += 1
+        timer.start()
+
+    def _resubmit(self, job: PurgeJob) -> None:
+        with self._condition:
+            self._retrying -= 1
+            self._enqueue(job)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._queue:
+                    self._condition.wait()
+                job = self._active = self._queue.popleft()
+            started = time.perf_counter()
+            try:
+                self._process(job)
+            except Exception as exc:
+                job.state, job.error = "failed", repr(exc)
+            with self._condition:
+                self.busy_seconds += time.perf_counter() - started
+                self.jobs_completed += 1
+                if job.state == "failed":
+                    self.jobs_failed += 1
+                    self._retry(job)
+                self._history.append(job)
+                self._active = None
+                self._condition.notify_all()
+
+    def _process(self, job: PurgeJob) -> None:
+        job.state = "running"
+        keys = self.collect(job)
+        job.total = len(keys)
+        for offset in range(0, len(keys), self.batch_size):
+            removed = self.purge(keys[offset:offset + self.batch_size])
+            job.removed += removed
+            with self._condition:
+                self.rows_removed += removed
+                self.batches += 1
+            time.sleep(0)
+        job.state = "done"
+        self.finish(job)
+
+    def pending(self) -> int:
+        with self._condition:
+            return len(self._queue) + (self._active is not None) + self._retrying
+
+    def jobs(self) -> List[PurgeJob]:
+        with self._condition:
+            active = [self._active] if self._active is not None else []
+            return list(self._history) + active + list(self._queue)
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._queue and self._active is None and not self._retrying, timeout)
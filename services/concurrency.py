@@ -0,0 +1,22 @@
+import threading
+from contextlib import contextmanager
+from typing import Hashable, Iterator
+
+
+class StripedLock:
+    def __init__(self, stripes: int = 64):
+        self._locks = [threading.RLock() for _ in range(stripes)]
+
+    def _stripe(self, key: Hashable) -> int:
+        return hash(key) % len(self._locks)
+
+    @contextmanager
+    def hold(self, *keys: Hashable) -> Iterator[None]:
+        stripes = sorted({self._stripe(key) for key in keys})
+        for stripe in stripes:
+            self._locks[stripe].acquire()
+        try:
+            yield
+        finally:
+            for stripe in reversed(stripes):
+                self._locks[stripe].release()
@@ -1,14 +1,206 @@
-from services.business_logic import UserService, CourseService, EnrollmentService
+import os
+import threading
+from datetime import timedelta
+from typing import Callable, Optional, Tuple
+from fastapi import HTTPException, status
+from services.business_logic import ID_SCHEMES, UserService, CourseService, EnrollmentService
+from services.async_services import AsyncUserService, AsyncCourseService, AsyncEnrollmentService, AsyncEventFeed
+from services.admission import READ, SCAN, WRITE, AdmissionController, ClassLimiter, RateLimiter
+from services.archive import EnrollmentArchive
+from services.concurrency import StripedLock
+from services.durability import DurableBackend, RecoveryProgress
+from services.events import EventLog, publish_events
+from services.storage import create_backend
 
-user_service = UserService()
-course_service = CourseService()
-enrollment_service = EnrollmentService(user_service, course_service)
+STORAGE_BACKEND = os.getenv("EDUTRACK_STORAGE", "memory")
+SQLITE_PATH = os.getenv("EDUTRACK_SQLITE_PATH", "edutrack.db")
+SQLITE_POOL_SIZE = int(os.getenv("EDUTRACK_SQLITE_POOL_SIZE", "8"))
+COMPACT_ENROLLMENTS = os.getenv("EDUTRACK_COMPACT_ENROLLMENTS", "0") == "1"
+LOCK_STRIPES = int(os.getenv("EDUTRACK_LOCK_STRIPES", "64"))
+ID_SCHEME = os.getenv("EDUTRACK_ID_SCHEME", "uuid4")
+COALESCE_READS = os.getenv("EDUTRACK_COALESCE_READS", "1") == "1"
+STORE_ADDRESS = os.getenv("EDUTRACK_STORE_ADDRESS")
+STORE_SHARDS = [address for address in os.getenv("EDUTRACK_STORE_SHARDS", "").split(",") if address]
+REMOTE_STORE = bool(STORE_ADDRESS or STORE_SHARDS)
+STORE_AUTHKEY = os.getenv("EDUTRACK_STORE_AUTHKEY", "").encode() or None
+PROFILING_ENABLED = os.getenv("EDUTRACK_PROFILING", "0") == "1"
+PROFILING_TOKEN = os.getenv("EDUTRACK_PROFILING_TOKEN")
+PROFILE_INTERVAL = float(os.getenv("EDUTRACK_PROFILE_INTERVAL_MS", "1")) / 1000
+PROFILE_DIR = os.getenv("EDUTRACK_PROFILE_DIR")
+EVENT_LOG_SIZE = int(os.getenv("EDUTRACK_EVENT_LOG_SIZE", "65536"))
+ADMISSION_ENABLED = os.getenv("EDUTRACK_ADMISSION", "1") == "1"
+RATE_LIMIT = float(os.getenv("EDUTRACK_RATE_LIMIT", "0"))
+RATE_BURST = float(os.getenv("EDUTRACK_RATE_BURST", str(RATE_LIMIT * 2)))
+RATE_LIMIT_KEY_HEADER = os.getenv("EDUTRACK_RATE_LIMIT_KEY_HEADER") or None
+READ_CONCURRENCY = int(os.getenv("EDUTRACK_READ_CONCURRENCY", "256"))
+WRITE_CONCURRENCY = int(os.getenv("EDUTRACK_WRITE_CONCURRENCY", "64"))
+SCAN_CONCURRENCY = int(os.getenv("EDUTRACK_SCAN_CONCURRENCY", "8"))
+READ_BUDGET = float(os.getenv("EDUTRACK_READ_BUDGET_MS", "100")) / 1000
+WRITE_BUDGET = float(os.getenv("EDUTRACK_WRITE_BUDGET_MS", "250")) / 1000
+SCAN_BUDGET = float(os.getenv("EDUTRACK_SCAN_BUDGET_MS", "50")) / 1000
+DATA_DIR = os.getenv("EDUTRACK_DATA_DIR")
+JOURNAL_COMMIT_DELAY = float(os.getenv("EDUTRACK_JOURNAL_COMMIT_MS", "1")) / 1000
+JOURNAL_WAIT = os.getenv("EDUTRACK_JOURNAL_WAIT", "1") == "1"
+SNAPSHOT_INTERVAL = float(os.getenv("EDUTRACK_SNAPSHOT_INTERVAL_S", "300"))
+SNAPSHOT_JOURNAL_BYTES = int(float(os.getenv("EDUTRACK_SNAPSHOT_JOURNAL_MB", "256")) * 1024 * 1024)
+ARCHIVE_AFTER_DAYS = float(os.getenv("EDUTRACK_ARCHIVE_AFTER_DAYS", "0"))
+ARCHIVE_DIR = os.getenv("EDUTRACK_ARCHIVE_DIR") or (os.path.join(DATA_DIR, "archive") if DATA_DIR else None)
+ARCHIVE_INTERVAL = float(os.getenv("EDUTRACK_ARCHIVE_INTERVAL_S", "60"))
+ARCHIVE_BATCH = int(os.getenv("EDUTRACK_ARCHIVE_BATCH", "500"))
+TIERING_ENABLED = ARCHIVE_AFTER_DAYS > 0 and ARCHIVE_DIR is not None and (DATA_DIR is not None or STORAGE_BACKEND == "sqlite")
+RECOVERY_RETRY_AFTER = 1
 
-def get_user_service():
-    return user_service
+Services = Tuple[UserService, CourseService, EnrollmentService]
+AsyncServices = Tuple[AsyncUserService, AsyncCourseService, AsyncEnrollmentService]
 
-def get_course_service():
-    return course_service
+_services: Optional[Services] = None
+_async_services: Optional[AsyncServices] = None
+_event_log: Optional[EventLog] = None
+_event_feed: Optional[AsyncEventFeed] = None
+_services_lock = threading.Lock()
+_durable: Optional[DurableBackend] = None
+_recovery: Optional[RecoveryProgress] = RecoveryProgress() if DATA_DIR and STORAGE_BACKEND == "memory" and not REMOTE_STORE else None
+_recovery_thread: Optional[threading.Thread] = None
+_recovery_lock = threading.Lock()
 
-def get_enrollment_service():
-    return enrollment_service
+def id_factory() -> Callable[[], str]:
+    if ID_SCHEME not in ID_SCHEMES:
+        raise ValueError(f"Unknown id scheme: {ID_SCHEME}")
+    return ID_SCHEMES[ID_SCHEME]
+
+def build_services(ids: Optional[Callable[[], str]] = None) -> Services:
+    global _durable
+    ids = ids if ids is not None else id_factory()
+    backend = create_backend(
+        STORAGE_BACKEND,
+        sqlite_path=SQLITE_PATH,
+        sqlite_pool_size=SQLITE_POOL_SIZE,
+        compact_enrollments=COMPACT_ENROLLMENTS
+    )
+    if DATA_DIR and STORAGE_BACKEND == "memory":
+        backend = _durable = DurableBackend(
+            backend,
+            DATA_DIR,
+            commit_delay=JOURNAL_COMMIT_DELAY,
+            wait=JOURNAL_WAIT,
+            snapshot_interval=SNAPSHOT_INTERVAL,
+            snapshot_bytes=SNAPSHOT_JOURNAL_BYTES,
+            progress=_recovery or RecoveryProgress()
+        )
+        _durable.progress.enter("indexes")
+    locks = StripedLock(LOCK_STRIPES)
+    user_service = UserService(backend.users, locks, ids)
+    course_service = CourseService(backend.courses, locks, ids)
+    archive = EnrollmentArchive(ARCHIVE_DIR) if TIERING_ENABLED else None
+    enrollment_service = EnrollmentService(user_service, course_service, backend.enrollments, locks, ids, archive, backend.waitlist)
+    enrollment_service.reap_orphans()
+    if _durable is not None:
+        _durable.start()
+        _durable.progress.finish()
+    if archive is not None:
+        enrollment_service.start_tiering(timedelta(days=ARCHIVE_AFTER_DAYS), ARCHIVE_BATCH, ARCHIVE_INTERVAL)
+    return user_service, course_service, enrollment_service
+
+def build_admission_controller() -> AdmissionController:
+    return AdmissionController(
+        {
+            READ: ClassLimiter(READ, READ_CONCURRENCY, READ_BUDGET),
+            WRITE: ClassLimiter(WRITE, WRITE_CONCURRENCY, WRITE_BUDGET),
+            SCAN: ClassLimiter(SCAN, SCAN_CONCURRENCY, SCAN_BUDGET),
+        },
+        RateLimiter(RATE_LIMIT, max(1.0, RATE_BURST)) if RATE_LIMIT > 0 else None
+    )
+
+def build_event_log(services: Services) -> EventLog:
+    return publish_events(EventLog(EVENT_LOG_SIZE), *services)
+
+def get_services() -> Services:
+    global _services, _event_log
+    if _services is None:
+        with _services_lock:
+            if _services is None:
+                if STORE_SHARDS:
+                    from services.sharding import connect_shards
+                    _services = connect_shards(STORE_SHARDS, STORE_AUTHKEY)
+                elif STORE_ADDRESS:
+                    from services.shared import connect_event_log, connect_services
+                    _event_log = connect_event_log(STORE_ADDRESS, STORE_AUTHKEY)
+                    _services = connect_services(STORE_ADDRESS, STORE_AUTHKEY)
+                else:
+                    services = build_services()
+                    _event_log = build_event_log(services)
+                    _services = services
+    return _services
+
+def get_event_log() -> EventLog:
+    get_services()
+    return _event_log
+
+def get_recovery() -> Optional[RecoveryProgress]:
+    return _recovery
+
+def get_durable() -> Optional[DurableBackend]:
+    return _durable
+
+def _recover() -> None:
+    try:
+        get_services()
+    except Exception as error:
+        _recovery.fail(repr(error))
+
+def start_recovery() -> None:
+    global _recovery_thread
+    if _recovery is None or _recovery_thread is not None:
+        return
+    with _recovery_lock:
+        if _recovery_thread is None:
+            _recovery_thread = threading.Thread(target=_recover, name="recovery", daemon=True)
+            _recovery_thread.start()
+
+def require_ready() -> None:
+    if _recovery is None or _recovery.ready:
+        return
+    start_recovery()
+    raise HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=f"Recovering store ({_recovery.phase})",
+        headers={"Retry-After": str(RECOVERY_RETRY_AFTER)}
+    )
+
+def shutdown_services() -> None:
+    if TIERING_ENABLED and not REMOTE_STORE and _services is not None:
+        _services[2].stop_tiering()
+    if _durable is not None:
+        _durable.close()
+
+def get_async_services() -> AsyncServices:
+    global _async_services
+    require_ready()
+    if _async_services is None:
+        user_service, course_service, enrollment_service = get_services()
+        blocking = REMOTE_STORE or user_service.users.blocking
+        _async_services = (
+            AsyncUserService(user_service, blocking, COALESCE_READS),
+            AsyncCourseService(course_service, blocking, COALESCE_READS),
+            AsyncEnrollmentService(enrollment_service, blocking or TIERING_ENABLED, COALESCE_READS)
+        )
+    return _async_services
+
+async def get_user_service() -> AsyncUserService:
+    return get_async_services()[0]
+
+async def get_course_service() -> AsyncCourseService:
+    return get_async_services()[1]
+
+async def get_enrollment_service() -> AsyncEnrollmentService:
+    return get_async_services()[2]
+
+async def get_event_feed() -> AsyncEventFeed:
+    global _event_feed
+    require_ready()
+    if STORE_SHARDS:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail="The change feed is not available across shards")
+    if _event_feed is None:
+        remote = STORE_ADDRESS is not None
+        _event_feed = AsyncEventFeed(get_event_log(), remote or get_services()[0].users.blocking, remote)
+    return _event_feed
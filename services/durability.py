@@ -0,0 +1,265 @@
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+from schemas.models import User, Course, Enrollment, WaitlistSlot
+from services.journal import Journal, list_segments, read_records, segment_path
+from services.snapshot import Section, SnapshotReader, decode_models, encode_models, list_snapshots, snapshot_path, write_snapshot
+from services.storage import Collection, EnrollmentCollection, M, StorageBackend
+
+T = TypeVar("T")
+
+PUT, DELETE = b"P", b"D"
+MODELS = {"users": User, "courses": Course, "enrollments": Enrollment, "waitlist": WaitlistSlot}
+CODES = {b"u": "users", b"c": "courses", b"e": "enrollments", b"w": "waitlist"}
+
+
+class RecoveryProgress:
+    def __init__(self):
+        self.phase = "pending"
+        self.snapshot_segment: Optional[int] = None
+        self.rows_loaded = 0
+        self.journal_records = 0
+        self.error: Optional[str] = None
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.phase == "ready"
+
+    def enter(self, phase: str) -> None:
+        self.phase = phase
+
+    def finish(self) -> None:
+        self.finished = time.monotonic()
+        self.phase = "ready"
+
+    def fail(self, error: str) -> None:
+        self.finished = time.monotonic()
+        self.error = error
+        self.phase = "failed"
+
+    def elapsed(self) -> float:
+        return (self.finished if self.finished is not None else time.monotonic()) - self.started
+
+
+class JournaledCollection(Collection[M]):
+    def __init__(self, backend: "DurableBackend", code: bytes, inner: Collection[M]):
+        self.backend = backend
+        self.code = code
+        self.inner = inner
+        self.blocking = backend.wait or inner.blocking
+
+    def _put(self, item: M) -> bytes:
+        return PUT + self.code + item.__pydantic_serializer__.to_json(item)
+
+    def _delete(self, key: str) -> bytes:
+        return DELETE + self.code + key.encode()
+
+    def get(self, key: str) -> Optional[M]:
+        return self.inner.get(key)
+
+    def get_many(self, keys: List[str]) -> List[M]:
+        return self.inner.get_many(keys)
+
+    def put(self, item: M) -> None:
+        self.backend.apply(lambda: self.inner.put(item), lambda _: [self._put(item)])
+
+    def put_many(self, items: List[M]) -> None:
+        self.backend.apply(lambda: self.inner.put_many(items), lambda _: [self._put(item) for item in items])
+
+    def delete(self, key: str) -> Optional[M]:
+        return self.backend.apply(lambda: self.inner.delete(key), lambda item: [self._delete(key)] if item is not None else [])
+
+    def delete_many(self, keys: List[str]) -> List[M]:
+        return self.backend.apply(lambda: self.inner.delete_many(keys), lambda items: [self._delete(item.id) for item in items])
+
+    def values(self) -> List[M]:
+        return self.inner.values()
+
+    def scan(self, after: int, limit: int) -> List[Tuple[int, M]]:
+        return self.inner.scan(after, limit)
+
+    def __len__(self) -> int:
+        return len(self.inner)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.inner
+
+
+class JournaledEnrollmentCollection(JournaledCollection[Enrollment], EnrollmentCollection):
+    inner: EnrollmentCollection
+
+    def by_user(self, user_id: str) -> List[Enrollment]:
+        return self.inner.by_user(user_id)
+
+    def by_course(self, course_id: str) -> List[Enrollment]:
+        return self.inner.by_course(course_id)
+
+    def by_pair(self, user_id: str, course_id: str) -> Optional[Enrollment]:
+        return self.inner.by_pair(user_id, course_id)
+
+    def user_ids(self) -> List[str]:
+        return self.inner.user_ids()
+
+    def course_ids(self) -> List[str]:
+        return self.inner.course_ids()
+
+    def between(self, low: int, high: int, limit: int) -> List[Tuple[int, Enrollment]]:
+        return self.inner.between(low, high, limit)
+
+    def snapshot_columns(self):
+        return self.inner.snapshot_columns()
+
+
+class DurableBackend(StorageBackend):
+    CHECK_INTERVAL = 1.0
+
+    def __init__(
+        self,
+        inner: StorageBackend,
+        directory: str,
+        commit_delay: float = 0.001,
+        wait: bool = True,
+        snapshot_interval: float = 300.0,
+        snapshot_bytes: int = 256 * 1024 * 1024,
+        progress: Optional[RecoveryProgress] = None
+    ):
+        os.makedirs(directory, exist_ok=True)
+        self.inner = inner
+        self.directory = directory
+        self.wait = wait
+        self.snapshot_interval = snapshot_interval
+        self.snapshot_bytes = snapshot_bytes
+        self.progress = progress if progress is not None else RecoveryProgress()
+        self.snapshots = 0
+        self.snapshot_failures = 0
+        self.snapshot_error: Optional[str] = None
+        self.lock = threading.RLock()
+        self._snapshot_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._snapshotter: Optional[threading.Thread] = None
+        self.journal = Journal(directory, self._recover(), commit_delay)
+        self._snapshot_at = (time.monotonic(), 0)
+        super().__init__(
+            JournaledCollection(self, b"u", inner.users),
+            JournaledCollection(self, b"c", inner.courses),
+            JournaledEnrollmentCollection(self, b"e", inner.enrollments),
+            JournaledCollection(self, b"w", inner.waitlist),
+        )
+
+    def _collections(self) -> Dict[str, Collection]:
+        return {
+            "users": self.inner.users, "courses": self.inner.courses, "enrollments": self.inner.enrollments, "waitlist": self.inner.waitlist
+        }
+
+    def _recover(self) -> int:
+        collections = self._collections()
+        segment = 1
+        for candidate in reversed(list_snapshots(self.directory)):
+            try:
+                reader = SnapshotReader(snapshot_path(self.directory, candidate))
+            except ValueError:
+                continue
+            self.progress.enter("snapshot")
+            self.progress.snapshot_segment = reader.segment
+            try:
+                for name, section in reader.sections.items():
+                    self._restore(collections[name], MODELS[name], section)
+                    self.progress.rows_loaded += section.count
+            finally:
+                reader.close()
+            segment = reader.segment
+            break
+
+        self.progress.enter("journal")
+        segments = [number for number in list_segments(self.directory) if number >= segment]
+        for number in segments:
+            path = segment_path(self.directory, number)
+            records, end = read_records(path)
+            for record in records:
+                self._replay(collections, record)
+            self.progress.journal_records += len(records)
+            if end < os.path.getsize(path):
+                os.truncate(path, end)
+        return segments[-1] + 1 if segments else segment
+
+    @staticmethod
+    def _restore(collection: Collection, model, section: Section) -> None:
+        if section.kind == "columns":
+            collection.load_columns(section.meta, section.blobs)
+        else:
+            collection.put_many(decode_models(model, section))
+
+    @staticmethod
+    def _replay(collections: Dict[str, Collection], record: bytes) -> None:
+        name = CODES[record[1:2]]
+        if record[:1] == PUT:
+            collections[name].put(MODELS[name].model_validate_json(record[2:]))
+        else:
+            collections[name].delete(record[2:].decode())
+
+    def apply(self, mutate: Callable[[], T], encode: Callable[[T], List[bytes]]) -> T:
+        ticket = 0
+        with self.lock:
+            result = mutate()
+            for record in encode(result):
+                ticket = self.journal.append(record)
+        if self.wait and ticket:
+            self.journal.wait_for(ticket)
+        return result
+
+    def snapshot(self) -> str:
+        with self._snapshot_lock:
+            with self.lock:
+                segment = self.journal.rotate()
+                captured = {name: self._capture(collection) for name, collection in self._collections().items()}
+                taken_at = (time.monotonic(), self.journal.bytes)
+            sections = {name: self._encode(name, value) for name, value in captured.items()}
+            path = write_snapshot(self.directory, segment, sections)
+            self._snapshot_at = taken_at
+            self.snapshots += 1
+            for older in list_snapshots(self.directory):
+                if older < segment:
+                    os.remove(snapshot_path(self.directory, older))
+            for older in list_segments(self.directory):
+                if older < segment:
+                    os.remove(segment_path(self.directory, older))
+            return path
+
+    @staticmethod
+    def _capture(collection: Collection):
+        if hasattr(collection, "dump_columns"):
+            return collection.dump_columns()
+        return collection.values()
+
+    @staticmethod
+    def _encode(name: str, captured) -> Section:
+        if isinstance(captured, tuple):
+            meta, columns = captured
+            return Section("columns", meta["live"], meta, columns)
+        return encode_models(MODELS[name], captured)
+
+    def start(self) -> None:
+        self._snapshotter = threading.Thread(target=self._run, name="snapshotter", daemon=True)
+        self._snapshotter.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.CHECK_INTERVAL):
+            taken_at, journal_bytes = self._snapshot_at
+            written = self.journal.bytes - journal_bytes
+            if written >= self.snapshot_bytes or (written and time.monotonic() - taken_at >= self.snapshot_interval):
+                try:
+                    self.snapshot()
+                    self.snapshot_error = None
+                except Exception as exc:
+                    self.snapshot_failures += 1
+                    self.snapshot_error = repr(exc)
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._snapshotter is not None:
+            self._snapshotter.join()
+        self.journal.close()
+        self.inner.close()
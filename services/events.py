@@ -0,0 +1,67 @@
+import threading
+from typing import Callable, List, Optional, Tuple
+from services.serialization import model_json
+
+Event = Tuple[int, str, bytes]
+Waker = Callable[[], None]
+
+
+class EventLog:
+    def __init__(self, capacity: int = 65536):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._entries: List[Optional[Tuple[str, object]]] = [None] * capacity
+        self._events: List[Optional[Event]] = [None] * capacity
+        self._next = 1
+        self._encoded = 0
+        self._wakers: List[Waker] = []
+
+    def listener(self, entity_type: str) -> Callable[[str, object], None]:
+        def publish(action: str, entity) -> None:
+            self.publish(f"{entity_type}.{action}", entity)
+        return publish
+
+    def publish(self, event_type: str, entity) -> int:
+        with self._lock:
+            seq = self._next
+            self._entries[seq % self.capacity] = (event_type, entity)
+            self._next = seq + 1
+        for wake in self._wakers:
+            wake()
+        return seq
+
+    def add_waker(self, wake: Waker) -> None:
+        self._wakers.append(wake)
+
+    def last_seq(self) -> int:
+        return self._next - 1
+
+    def oldest_seq(self) -> int:
+        return max(1, self._next - self.capacity)
+
+    def read(self, after: int, limit: int) -> Tuple[int, List[Event]]:
+        with self._lock:
+            oldest = max(1, self._next - self.capacity)
+            start = max(after + 1, oldest)
+            end = min(self._next, start + limit)
+            if start >= end:
+                return oldest, []
+            self._encode(max(self._encoded + 1, oldest), end)
+            first, last = start % self.capacity, end % self.capacity
+            if first < last:
+                return oldest, self._events[first:last]
+            return oldest, self._events[first:] + self._events[:last]
+
+    def _encode(self, start: int, end: int) -> None:
+        for seq in range(start, end):
+            event_type, entity = self._entries[seq % self.capacity]
+            payload = b'{"seq":%d,"type":"%s","data":%s}' % (seq, event_type.encode(), model_json(entity))
+            self._events[seq % self.capacity] = (seq, event_type, payload)
+        self._encoded = max(self._encoded, end - 1)
+
+
+def publish_events(log: EventLog, user_service, course_service, enrollment_service) -> EventLog:
+    user_service.subscribe(log.listener("user"))
+    course_service.subscribe(log.listener("course"))
+    enrollment_service.subscribe(log.listener("enrollment"))
+    return log
@@ -0,0 +1,156 @@
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import List, Optional, Tuple
+
+RECORD_HEADER = struct.Struct("<II")
+SEGMENT_PREFIX = "journal-"
+SEGMENT_SUFFIX = ".log"
+
+
+def segment_path(directory: str, segment: int) -> str:
+    return os.path.join(directory, f"{SEGMENT_PREFIX}{segment:08d}{SEGMENT_SUFFIX}")
+
+
+def list_segments(directory: str) -> List[int]:
+    return sorted(
+        int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+        for name in os.listdir(directory)
+        if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+    )
+
+
+def fsync_directory(directory: str) -> None:
+    descriptor = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+def frame(payload: bytes) -> bytes:
+    return RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def read_records(path: str) -> Tuple[List[bytes], int]:
+    with open(path, "rb") as file:
+        data = file.read()
+    records: List[bytes] = []
+    offset = 0
+    while offset + RECORD_HEADER.size <= len(data):
+        length, checksum = RECORD_HEADER.unpack_from(data, offset)
+        start = offset + RECORD_HEADER.size
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != checksum:
+            break
+        records.append(payload)
+        offset = start + length
+    return records, offset
+
+
+class Journal:
+    def __init__(self, directory: str, segment: int, commit_delay: float = 0.001):
+        self.directory = directory
+        self.segment = segment
+        self.commit_delay = commit_delay
+        self.records = 0
+        self.commits = 0
+        self.bytes = 0
+        self._cond = threading.Condition()
+        self._pending: List[Optional[bytes]] = []
+        self._appended = 0
+        self._committed = 0
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self._file = open(segment_path(directory, segment), "ab")
+        fsync_directory(directory)
+        self._writer = threading.Thread(target=self._run, name="journal-writer", daemon=True)
+        self._writer.start()
+
+    def append(self, payload: bytes) -> int:
+        record = frame(payload)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Journal is closed")
+            self._pending.append(record)
+            self._appended += 1
+            if len(self._pending) == 1:
+                self._cond.notify_all()
+            return self._appended
+
+    def rotate(self) -> int:
+        with self._cond:
+            self._pending.append(None)
+            self._cond.notify_all()
+            self.segment += 1
+            return self.segment
+
+    def wait_for(self, ticket: int) -> None:
+        with self._cond:
+            while self._committed < ticket and self._error is None:
+                self._cond.wait()
+            if self._error is not None:
+                raise RuntimeError("Journal write failed") from self._error
+
+    def sync(self) -> None:
+        with self._cond:
+            ticket = self._appended
+        self.wait_for(ticket)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending and self._closed:
+                    return
+            if self.commit_delay:
+                time.sleep(self.commit_delay)
+            with self._cond:
+                batch, self._pending = self._pending, []
+                ticket = self._appended
+            try:
+                self._write(batch)
+            except BaseException as error:
+                with self._cond:
+                    self._error = error
+                    self._cond.notify_all()
+                return
+            with self._cond:
+                self._committed = ticket
+                self.commits += 1
+                self._cond.notify_all()
+
+    def _write(self, batch: List[Optional[bytes]]) -> None:
+        records = [record for record in batch if record is not None]
+        start = 0
+        for index, record in enumerate(batch):
+            if record is None:
+                self._flush(batch[start:index])
+                self._file.close()
+                self._file = open(segment_path(self.directory, self._file_segment() + 1), "ab")
+                fsync_directory(self.directory)
+                start = index + 1
+        self._flush(batch[start:])
+        self.records += len(records)
+
+    def _file_segment(self) -> int:
+        name = os.path.basename(self._file.name)
+        return int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+
+    def _flush(self, records: List[Optional[bytes]]) -> None:
+        if records:
+            data = b"".join(records)
+            self._file.write(data)
+            self.bytes += len(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._writer.join()
+        self._file.close()
@@ -0,0 +1,177 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar, Token
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, TypeVar
+
+T = TypeVar("T")
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class RequestTimings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {"validation": 0.0, "service": 0.0, "serialization": 0.0}
+        self.threads: Set[int] = {threading.get_ident()}
+        self.parsing: Optional[float] = None
+
+    def add(self, phase: str, seconds: float) -> None:
+        self.phases[phase] += seconds
+
+    def parsed(self) -> None:
+        if self.parsing is not None:
+            self.add("validation", time.perf_counter() - self.parsing)
+            self.parsing = None
+
+    def breakdown(self, total: float) -> Dict[str, float]:
+        return {"other": max(0.0, total - sum(self.phases.values())), **self.phases}
+
+
+_timings: ContextVar[Optional[RequestTimings]] = ContextVar("edutrack_request_timings", default=None)
+
+
+def begin_request() -> Tuple[RequestTimings, Token]:
+    timings = RequestTimings()
+    return timings, _timings.set(timings)
+
+
+def end_request(token: Token) -> None:
+    _timings.reset(token)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _timings.get()
+
+
+def timed(phase: str, call: Callable[..., T], *args: Any) -> T:
+    timings = _timings.get()
+    if timings is None:
+        return call(*args)
+    start = time.perf_counter()
+    try:
+        return call(*args)
+    finally:
+        timings.add(phase, time.perf_counter() - start)
+
+
+def timed_service(call: Callable[..., T], *args: Any) -> T:
+    timings = _timings.get()
+    if timings is None:
+        return call(*args)
+    timings.threads.add(threading.get_ident())
+    start = time.perf_counter()
+    try:
+        return call(*args)
+    finally:
+        timings.add("service", time.perf_counter() - start)
+
+
+def _labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines.extend(f"{self.name}{_labels(labels)} {_number(value)}" for labels, value in sorted(self._values.items()))
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._values: Dict[Labels, List[float]] = {}
+
+    def observe(self, labels: Labels, value: float) -> None:
+        series = self._values.get(labels)
+        if series is None:
+            series = self._values[labels] = [0.0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._values.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(labels + (('le', str(bound)),))} {_number(cumulative)}")
+            lines.append(f"{self.name}_sum{_labels(labels)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(labels)} {_number(cumulative)}")
+        return lines
+
+
+def _series(kind: str, name: str, help: str, values: Dict[Labels, float]) -> List[str]:
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    lines.extend(f"{name}{_labels(labels)} {_number(value)}" for labels, value in sorted(values.items()))
+    return lines
+
+
+def gauge(name: str, help: str, values: Dict[Labels, float]) -> List[str]:
+    return _series("gauge", name, help, values)
+
+
+def counter(name: str, help: str, values: Dict[Labels, float]) -> List[str]:
+    return _series("counter", name, help, values)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_progress = 0
+        self.requests = Counter("edutrack_http_requests_total", "HTTP responses by method, route and status code.")
+        self.latency = Histogram("edutrack_http_request_duration_seconds", "HTTP request latency by method and route.")
+        self.phases = Counter(
+            "edutrack_http_request_phase_seconds_total",
+            "Request time split into validation (body parsing and parameter validation), service logic, serialization, and other (routing, middleware and response handling)."
+        )
+
+    def started(self) -> None:
+        with self._lock:
+            self.in_progress += 1
+
+    def finished(self, method: str, route: str, status: int, timings: RequestTimings) -> None:
+        elapsed = time.perf_counter() - timings.started
+        labels = (("method", method), ("route", route))
+        with self._lock:
+            self.in_progress -= 1
+            self.requests.inc(labels + (("status", str(status)),))
+            self.latency.observe(labels, elapsed)
+            for phase, seconds in timings.breakdown(elapsed).items():
+                self.phases.inc((("route", route), ("phase", phase)), seconds)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            return (
+                self.requests.render()
+                + self.latency.render()
+                + self.phases.render()
+                + gauge("edutrack_http_requests_in_progress", "Requests currently being handled.", {(): self.in_progress})
+            )
+
+
+def render(*sections: List[str]) -> bytes:
+    return ("\n".join(line for section in sections for line in section) + "\n").encode()
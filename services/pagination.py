@@ -0,0 +1,140 @@
+import base64
+from bisect import bisect_left, bisect_right
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+CURSOR_PREFIX = "seq:"
+
+
+def encode_cursor(seq: int) -> str:
+    return base64.urlsafe_b64encode(f"{CURSOR_PREFIX}{seq}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+    if not raw.startswith(CURSOR_PREFIX) or not raw[len(CURSOR_PREFIX):].isdigit():
+        raise ValueError("Invalid cursor")
+    return int(raw[len(CURSOR_PREFIX):])
+
+
+class SequencedIndex:
+    COMPACT_THRESHOLD = 1024
+
+    def __init__(self):
+        self._seqs: List[int] = []
+        self._keys: List[Optional[str]] = []
+        self._seq_by_key: Dict[str, int] = {}
+        self._next_seq = 1
+        self._dead = 0
+
+    def __len__(self) -> int:
+        return len(self._seq_by_key)
+
+    def add(self, key: str) -> int:
+        seq = self._next_seq
+        self._next_seq += 1
+        self._seqs.append(seq)
+        self._keys.append(key)
+        self._seq_by_key[key] = seq
+        return seq
+
+    def seq_of(self, key: str) -> Optional[int]:
+        return self._seq_by_key.get(key)
+
+    def remove(self, key: str) -> bool:
+        seq = self._seq_by_key.pop(key, None)
+        if seq is None:
+            return False
+        self._keys[bisect_left(self._seqs, seq)] = None
+        self._dead += 1
+        if self._dead > self.COMPACT_THRESHOLD and self._dead * 2 > len(self._keys):
+            self._compact()
+        return True
+
+    def scan(self, after: int, limit: int) -> List[Tuple[int, str]]:
+        result = []
+        position = bisect_right(self._seqs, after)
+        while position < len(self._keys) and len(result) < limit:
+            key = self._keys[position]
+            if key is not None:
+                result.append((self._seqs[position], key))
+            position += 1
+        return result
+
+    def _compact(self) -> None:
+        live = [(seq, key) for seq, key in zip(self._seqs, self._keys) if key is not None]
+        self._seqs = [seq for seq, _ in live]
+        self._keys = [key for _, key in live]
+        self._dead = 0
+
+
+class SortedIndex:
+    COMPACT_THRESHOLD = 1024
+
+    def __init__(self):
+        self._keys: List[int] = []
+        self._values: Dict[int, Optional[str]] = {}
+        self._live = 0
+        self._sorted = True
+
+    def __len__(self) -> int:
+        return self._live
+
+    def add(self, key: int, value: str) -> None:
+        if key not in self._values:
+            if self._keys and key < self._keys[-1]:
+                self._sorted = False
+            self._keys.append(key)
+        if self._values.get(key) is None:
+            self._live += 1
+        self._values[key] = value
+
+    def remove(self, key: int) -> bool:
+        if self._values.get(key) is None:
+            return False
+        self._values[key] = None
+        self._live -= 1
+        dead = len(self._keys) - self._live
+        if dead > self.COMPACT_THRESHOLD and dead * 2 > len(self._keys):
+            self._compact()
+        return True
+
+    def scan(self, low: int, high: int, limit: int) -> List[Tuple[int, str]]:
+        if not self._sorted:
+            self._keys.sort()
+            self._sorted = True
+        result = []
+        keys, values = self._keys, self._values
+        position = bisect_left(keys, low)
+        while position < len(keys) and keys[position] < high and len(result) < limit:
+            value = values[keys[position]]
+            if value is not None:
+                result.append((keys[position], value))
+            position += 1
+        return result
+
+    def _compact(self) -> None:
+        self._values = {key: value for key, value in self._values.items() if value is not None}
+        self._keys = sorted(self._values)
+        self._sorted = True
+
+
+def paginate(scan: Callable[[int, int], List[Tuple[int, T]]], limit: int, cursor: Optional[str]) -> Tuple[List[T], Optional[str]]:
+    entries = scan(decode_cursor(cursor), limit + 1)
+    items = [item for _, item in entries[:limit]]
+    next_cursor = encode_cursor(entries[limit - 1][0]) if len(entries) > limit else None
+    return items, next_cursor
+
+
+def iter_pages(fetch: Callable[[int, Optional[str]], Tuple[List[T], Optional[str]]], cursor: Optional[str] = None, chunk_size: int = 500) -> Iterator[T]:
+    while True:
+        items, cursor = fetch(chunk_size, cursor)
+        yield from items
+        if cursor is None:
+            return
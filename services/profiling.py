@@ -0,0 +1,142 @@
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from html import escape
+from typing import Dict, List, Optional, Set, Tuple
+
+FLAME_WIDTH = 1200
+FRAME_HEIGHT = 16
+MIN_FRAME_WIDTH = 0.5
+
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def fold(frame) -> str:
+    stack: List[str] = []
+    while frame is not None:
+        stack.append(frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+class Profile:
+    def __init__(self, profile_id: str, method: str, path: str, interval: float):
+        self.id = profile_id
+        self.method = method
+        self.path = path
+        self.interval = interval
+        self.duration = 0.0
+        self.samples = 0
+        self.stacks: Dict[str, int] = {}
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+    def svg(self) -> str:
+        root: Dict = {"count": 0, "children": {}}
+        for stack, count in self.stacks.items():
+            node = root
+            node["count"] += count
+            for label in stack.split(";"):
+                node = node["children"].setdefault(label, {"count": 0, "children": {}})
+                node["count"] += count
+
+        rects: List[Tuple[float, int, float, str, int]] = []
+        scale = FLAME_WIDTH / root["count"] if root["count"] else 0.0
+
+        def layout(node: Dict, x: float, depth: int) -> None:
+            for label, child in sorted(node["children"].items()):
+                width = child["count"] * scale
+                if width >= MIN_FRAME_WIDTH:
+                    rects.append((x, depth, width, label, child["count"]))
+                    layout(child, x, depth + 1)
+                x += width
+
+        layout(root, 0.0, 0)
+        depth = max((rect[1] for rect in rects), default=0) + 1
+        height = (depth + 2) * FRAME_HEIGHT
+        title = escape(f"{self.method} {self.path} - {self.samples} samples over {self.duration * 1000:.1f} ms")
+        lines = [
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{FLAME_WIDTH}" height="{height}" font-family="monospace" font-size="11">',
+            f'<text x="4" y="{FRAME_HEIGHT - 4}">{title}</text>',
+        ]
+        for x, level, width, label, count in rects:
+            y = height - (level + 1) * FRAME_HEIGHT
+            hue = 20 + hash(label) % 40
+            share = count / root["count"] * 100
+            text = escape(label[:int(width / 7)]) if width > 21 else ""
+            lines.append(
+                f'<g><title>{escape(label)} ({count} samples, {share:.1f}%)</title>'
+                f'<rect x="{x:.1f}" y="{y}" width="{width:.1f}" height="{FRAME_HEIGHT - 1}" fill="hsl({hue},90%,60%)"/>'
+                f'<text x="{x + 2:.1f}" y="{y + FRAME_HEIGHT - 4}">{text}</text></g>'
+            )
+        lines.append("</svg>")
+        return "\n".join(lines)
+
+
+class SamplingProfiler:
+    def __init__(self, profile: Profile, threads: Set[int]):
+        self.profile = profile
+        self.threads = threads
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name="edutrack-profiler", daemon=True)
+        self._started = 0.0
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        self._thread.start()
+
+    def _sample(self) -> None:
+        stacks = self.profile.stacks
+        while not self._stop.wait(self.profile.interval):
+            frames = sys._current_frames()
+            for ident in list(self.threads):
+                frame = frames.get(ident)
+                if frame is not None:
+                    stack = fold(frame)
+                    stacks[stack] = stacks.get(stack, 0) + 1
+                    self.profile.samples += 1
+
+    def stop(self) -> Profile:
+        self._stop.set()
+        self._thread.join()
+        self.profile.duration = time.perf_counter() - self._started
+        return self.profile
+
+
+class ProfileStore:
+    def __init__(self, capacity: int = 32, directory: Optional[str] = None):
+        self.capacity = capacity
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._profiles: "OrderedDict[str, Profile]" = OrderedDict()
+
+    @staticmethod
+    def new_id() -> str:
+        return uuid.uuid4().hex[:16]
+
+    def add(self, profile: Profile) -> None:
+        with self._lock:
+            self._profiles[profile.id] = profile
+            while len(self._profiles) > self.capacity:
+                self._profiles.popitem(last=False)
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, f"{profile.id}.folded"), "w") as handle:
+                handle.write(profile.folded())
+            with open(os.path.join(self.directory, f"{profile.id}.svg"), "w") as handle:
+                handle.write(profile.svg())
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def recent(self) -> List[Profile]:
+        with self._lock:
+            return list(reversed(self._profiles.values()))
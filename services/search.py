@@ -0,0 +1,142 @@
+import heapq
+import re
+import threading
+from bisect import bisect_left, insort
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+TOKEN = re.compile(r"[^\W_]+")
+
+Fields = Sequence[Tuple[str, int]]
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN.findall(text.lower())
+
+
+class SortedKeys:
+    LOAD = 512
+
+    def __init__(self):
+        self._blocks: List[List[str]] = []
+        self._maxes: List[str] = []
+
+    def add(self, key: str) -> None:
+        if not self._blocks:
+            self._blocks.append([key])
+            self._maxes.append(key)
+            return
+        index = min(bisect_left(self._maxes, key), len(self._blocks) - 1)
+        block = self._blocks[index]
+        insort(block, key)
+        self._maxes[index] = block[-1]
+        if len(block) > 2 * self.LOAD:
+            self._blocks[index:index + 1] = [block[:self.LOAD], block[self.LOAD:]]
+            self._maxes[index:index + 1] = [block[self.LOAD - 1], block[-1]]
+
+    def discard(self, key: str) -> None:
+        index = bisect_left(self._maxes, key)
+        if index == len(self._blocks):
+            return
+        block = self._blocks[index]
+        position = bisect_left(block, key)
+        if position == len(block) or block[position] != key:
+            return
+        del block[position]
+        if block:
+            self._maxes[index] = block[-1]
+        else:
+            del self._blocks[index]
+            del self._maxes[index]
+
+    def prefixed(self, prefix: str) -> Iterator[str]:
+        index = bisect_left(self._maxes, prefix)
+        if index == len(self._blocks):
+            return
+        position = bisect_left(self._blocks[index], prefix)
+        for block in self._blocks[index:]:
+            for key in block[position:]:
+                if not key.startswith(prefix):
+                    return
+                yield key
+            position = 0
+
+
+class SearchIndex:
+    MAX_EXPANSIONS = 64
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._terms = SortedKeys()
+        self._documents: Dict[str, Dict[str, int]] = {}
+
+    def put(self, key: str, fields: Fields) -> None:
+        terms: Dict[str, int] = {}
+        for text, weight in fields:
+            for term in tokenize(text):
+                if terms.get(term, 0) < weight:
+                    terms[term] = weight
+        with self._lock:
+            self._remove(key)
+            for term, weight in terms.items():
+                posting = self._postings.get(term)
+                if posting is None:
+                    posting = self._postings[term] = {}
+                    self._terms.add(term)
+                posting[key] = weight
+            self._documents[key] = terms
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        for term in self._documents.pop(key, ()):
+            posting = self._postings[term]
+            del posting[key]
+            if not posting:
+                del self._postings[term]
+                self._terms.discard(term)
+
+    def _sources(self, term: str) -> List[Tuple[Dict[str, int], int]]:
+        sources = []
+        exact = self._postings.get(term)
+        if exact is not None:
+            sources.append((exact, 2))
+        for expansions, candidate in enumerate(self._terms.prefixed(term)):
+            if expansions >= self.MAX_EXPANSIONS:
+                break
+            if candidate != term:
+                sources.append((self._postings[candidate], 1))
+        return sources
+
+    def _scores(self, terms: List[str]) -> Dict[str, int]:
+        by_size = sorted((self._sources(term) for term in terms), key=lambda sources: sum(len(p) for p, _ in sources))
+        scores: Dict[str, int] = {}
+        for posting, multiplier in by_size[0]:
+            for key, weight in posting.items():
+                if scores.get(key, 0) < weight * multiplier:
+                    scores[key] = weight * multiplier
+        for sources in by_size[1:]:
+            narrowed: Dict[str, int] = {}
+            for key, score in scores.items():
+                best = max(posting.get(key, 0) * multiplier for posting, multiplier in sources) if sources else 0
+                if best:
+                    narrowed[key] = score + best
+            scores = narrowed
+        return scores
+
+    def ranked(self, query: str, count: int) -> List[Tuple[str, int]]:
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        with self._lock:
+            scores = self._scores(terms)
+        return heapq.nsmallest(count, scores.items(), key=lambda item: (-item[1], item[0]))
+
+    def search(self, query: str, limit: int, offset: int = 0) -> Tuple[List[str], bool]:
+        ranked = self.ranked(query, offset + limit + 1)
+        return [key for key, _ in ranked[offset:offset + limit]], len(ranked) > offset + limit
+
+    def __len__(self) -> int:
+        return len(self._documents)
@@ -0,0 +1,24 @@
+import orjson
+from typing import Any
+from pydantic import BaseModel, TypeAdapter
+from services.metrics import timed
+
+
+def encode(value: Any) -> bytes:
+    return orjson.dumps(value)
+
+
+def decode(data: Any) -> Any:
+    return orjson.loads(data)
+
+
+def dumps(content: Any) -> bytes:
+    return timed("serialization", encode, content)
+
+
+def model_json(entity: BaseModel) -> bytes:
+    return timed("serialization", entity.__pydantic_serializer__.to_json, entity)
+
+
+def adapter_json(adapter: TypeAdapter, value: Any) -> bytes:
+    return timed("serialization", adapter.dump_json, value)
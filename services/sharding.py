@@ -0,0 +1,382 @@
+import heapq
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+from schemas.models import (
+    User, UserCreate, UserUpdate, Course, CourseCreate, CourseUpdate, Enrollment, EnrollmentCreate, CourseReport, DailyReport,
+    CompactionStatus, TieringStatus, WaitlistEntry
+)
+from services.business_logic import CapacityNotSupportedError, EnrollResult, EnrollmentService, normalize_email, new_id
+from services.pagination import decode_cursor, encode_cursor
+from services.shared import connect_services
+
+T = TypeVar("T")
+Page = Tuple[List[T], Optional[str]]
+
+
+def shard_of(key: str, shards: int) -> int:
+    return zlib.crc32(key.encode()) % shards
+
+
+def replica_of(key: str, shards: int) -> int:
+    return zlib.adler32(key.encode()) % shards
+
+
+class ShardIds:
+    def __init__(self, shard: int, shards: int, base: Callable[[], str] = new_id):
+        if not 0 <= shard < shards:
+            raise ValueError(f"Shard {shard} is outside 0..{shards - 1}")
+        self.shard = shard
+        self.shards = shards
+        self.base = base
+
+    def __call__(self) -> str:
+        while True:
+            key = self.base()
+            if shard_of(key, self.shards) == self.shard:
+                return key
+
+
+class ShardRouter:
+    def __init__(self, shards: Sequence[Tuple]):
+        self.shards = list(shards)
+        self.count = len(self.shards)
+        self.pool = ThreadPoolExecutor(max_workers=4 * self.count, thread_name_prefix="shard")
+
+    def owner(self, key: str) -> int:
+        return shard_of(key, self.count)
+
+    def replica(self, key: str) -> int:
+        return replica_of(key, self.count)
+
+    def gather(self, call: Callable[[int], T]) -> List[T]:
+        if self.count == 1:
+            return [call(0)]
+        return list(self.pool.map(call, range(self.count)))
+
+    def scatter(self, items: List, key: Callable[[object], str], call: Callable[[int, List], List[T]]) -> List[T]:
+        positions: Dict[int, List[int]] = {}
+        for position, item in enumerate(items):
+            positions.setdefault(self.owner(key(item)), []).append(position)
+        results: List[Optional[T]] = [None] * len(items)
+        owned = list(positions.items())
+        for (shard, indexes), found in zip(owned, self.pool.map(lambda entry: call(entry[0], [items[i] for i in entry[1]]), owned)):
+            for index, result in zip(indexes, found):
+                results[index] = result
+        return results
+
+    def get_many(
+        self, keys: List[str], call: Callable[[int, List[str]], List[T]], place: Optional[Callable[[str], int]] = None
+    ) -> List[T]:
+        place = place or self.owner
+        groups: Dict[int, List[str]] = {}
+        for key in dict.fromkeys(keys):
+            groups.setdefault(place(key), []).append(key)
+        found = {item.id: item for items in self.pool.map(lambda entry: call(*entry), groups.items()) for item in items}
+        return [found[key] for key in keys if key in found]
+
+    def walk(self, fetch: Callable[[int, int, Optional[str]], Page], limit: int, cursor: Optional[str]) -> Page:
+        position = decode_cursor(cursor)
+        shard, after = position % self.count, position // self.count
+        inner = encode_cursor(after) if after else None
+        items: List = []
+        while shard < self.count:
+            page, inner = fetch(shard, limit - len(items), inner)
+            items.extend(page)
+            if inner is not None:
+                return items, encode_cursor(decode_cursor(inner) * self.count + shard)
+            shard += 1
+            if len(items) >= limit:
+                return items, encode_cursor(shard) if shard < self.count else None
+        return items, None
+
+
+class ShardedUserService:
+    def __init__(self, router: ShardRouter):
+        self.router = router
+
+    def _owner(self, user_id: str):
+        return self.router.shards[self.router.owner(user_id)][0]
+
+    def _home(self, email: str) -> int:
+        return self.router.owner(normalize_email(email))
+
+    def _release(self, user: User) -> None:
+        home = self._home(user.email)
+        if home != self.router.owner(user.id):
+            self.router.shards[home][0].release_email(user.email, user.id)
+
+    def version(self, key: Optional[str] = None) -> int:
+        if key is None:
+            return sum(self.router.gather(lambda shard: self.router.shards[shard][0].version()))
+        return self._owner(key).version(key)
+
+    def create_user(self, user_data: UserCreate) -> User:
+        return self.router.shards[self._home(user_data.email)][0].create_user(user_data)
+
+    def create_users(self, users_data: List[UserCreate]) -> List[Optional[User]]:
+        return self.router.scatter(
+            users_data, lambda data: normalize_email(data.email), lambda shard, chunk: self.router.shards[shard][0].create_users(chunk)
+        )
+
+    def get_user(self, user_id: str) -> Optional[User]:
+        return self._owner(user_id).get_user(user_id)
+
+    def get_many(self, user_ids: List[str]) -> List[User]:
+        return self.router.get_many(user_ids, lambda shard, keys: self.router.shards[shard][0].get_many(keys))
+
+    def count(self) -> int:
+        return sum(self.router.gather(lambda shard: self.router.shards[shard][0].count()))
+
+    def get_all_users(self) -> List[User]:
+        return [user for users in self.router.gather(lambda shard: self.router.shards[shard][0].get_all_users()) for user in users]
+
+    def list_users(self, limit: int, cursor: Optional[str] = None) -> Page[User]:
+        return self.router.walk(lambda shard, size, inner: self.router.shards[shard][0].list_users(size, inner), limit, cursor)
+
+    def search_users(self, query: str, limit: int, cursor: Optional[str] = None) -> Page[User]:
+        offset = decode_cursor(cursor)
+        ranked = self.router.gather(lambda shard: self.router.shards[shard][0].rank_users(query, offset + limit + 1))
+        merged = list(heapq.merge(*ranked, key=lambda entry: (-entry[0], entry[1].id)))
+        return [user for _, user in merged[offset:offset + limit]], encode_cursor(offset + limit) if len(merged) > offset + limit else None
+
+    def update_user(self, user_id: str, user_data: UserUpdate) -> Optional[User]:
+        owner = self._owner(user_id)
+        if user_data.email is None or self.router.count == 1:
+            return owner.update_user(user_id, user_data)
+        previous = owner.get_user(user_id)
+        if previous is None:
+            return None
+        home = self._home(user_data.email)
+        reserved = home != self.router.owner(user_id)
+        if reserved:
+            self.router.shards[home][0].reserve_email(user_data.email, user_id)
+        user = None
+        try:
+            user = owner.update_user(user_id, user_data)
+        finally:
+            if reserved and user is None:
+                self.router.shards[home][0].release_email(user_data.email, user_id)
+        if user is not None and normalize_email(previous.email) != normalize_email(user.email):
+            self._release(previous)
+        return user
+
+    def delete_user(self, user_id: str) -> bool:
+        owner = self._owner(user_id)
+        user = owner.get_user(user_id) if self.router.count > 1 else None
+        deleted = owner.delete_user(user_id)
+        if deleted and user is not None:
+            self._release(user)
+        return deleted
+
+    def deactivate_user(self, user_id: str) -> Optional[User]:
+        return self._owner(user_id).deactivate_user(user_id)
+
+
+class ShardedCourseService:
+    def __init__(self, router: ShardRouter):
+        self.router = router
+        self.primary = router.shards[0][1]
+
+    def _replica(self, course_id: str):
+        return self.router.shards[self.router.replica(course_id)][1]
+
+    @staticmethod
+    def _check_capacity(courses_data) -> None:
+        if any(course_data.capacity is not None for course_data in courses_data):
+            raise CapacityNotSupportedError("Course capacity is not supported across shards")
+
+    def _replicate(self, courses: List[Course]) -> None:
+        if courses and self.router.count > 1:
+            list(self.router.pool.map(lambda shard: shard[1].replicate(courses), self.router.shards[1:]))
+
+    def version(self, key: Optional[str] = None) -> int:
+        if key is None:
+            return self.primary.version()
+        return self._replica(key).version(key)
+
+    def create_course(self, course_data: CourseCreate) -> Course:
+        self._check_capacity([course_data])
+        course = self.primary.create_course(course_data)
+        self._replicate([course])
+        return course
+
+    def create_courses(self, courses_data: List[CourseCreate]) -> List[Course]:
+        self._check_capacity(courses_data)
+        courses = self.primary.create_courses(courses_data)
+        self._replicate(courses)
+        return courses
+
+    def get_course(self, course_id: str) -> Optional[Course]:
+        return self._replica(course_id).get_course(course_id)
+
+    def get_many(self, course_ids: List[str]) -> List[Course]:
+        return self.router.get_many(course_ids, lambda shard, keys: self.router.shards[shard][1].get_many(keys), self.router.replica)
+
+    def count(self) -> int:
+        return self.primary.count()
+
+    def get_all_courses(self) -> List[Course]:
+        return self.primary.get_all_courses()
+
+    def list_courses(self, limit: int, cursor: Optional[str] = None) -> Page[Course]:
+        return self.primary.list_courses(limit, cursor)
+
+    def search_courses(self, query: str, limit: int, cursor: Optional[str] = None) -> Page[Course]:
+        return self.primary.search_courses(query, limit, cursor)
+
+    def update_course(self, course_id: str, course_data: CourseUpdate) -> Optional[Course]:
+        self._check_capacity([course_data])
+        course = self.primary.update_course(course_id, course_data)
+        self._replicate([course] if course is not None else [])
+        return course
+
+    def delete_course(self, course_id: str) -> bool:
+        return self.router.gather(lambda shard: self.router.shards[shard][1].delete_course(course_id))[0]
+
+    def close_enrollment(self, course_id: str) -> Optional[Course]:
+        course = self.primary.close_enrollment(course_id)
+        self._replicate([course] if course is not None else [])
+        return course
+
+
+class ShardedEnrollmentService:
+    def __init__(self, router: ShardRouter):
+        self.router = router
+
+    def _owner(self, key: str):
+        return self.router.shards[self.router.owner(key)][2]
+
+    def _all(self, call: Callable[[object], T]) -> List[T]:
+        return self.router.gather(lambda shard: call(self.router.shards[shard][2]))
+
+    def version(self, key: Optional[str] = None) -> int:
+        if key is None or key.startswith("course:"):
+            return sum(self._all(lambda enrollments: enrollments.version(key)))
+        return self._owner(key[len("user:"):] if key.startswith("user:") else key).version(key)
+
+    def count(self) -> int:
+        return sum(self._all(lambda enrollments: enrollments.count()))
+
+    def compaction_status(self) -> CompactionStatus:
+        statuses = self._all(lambda enrollments: enrollments.compaction_status())
+        return CompactionStatus(
+            pending=sum(status.pending for status in statuses),
+            tombstones=sum(status.tombstones for status in statuses),
+            jobs_completed=sum(status.jobs_completed for status in statuses),
+            jobs_failed=sum(status.jobs_failed for status in statuses),
+            rows_removed=sum(status.rows_removed for status in statuses),
+            batches=sum(status.batches for status in statuses),
+            busy_seconds=sum(status.busy_seconds for status in statuses),
+            jobs=[job for status in statuses for job in status.jobs]
+        )
+
+    def tiering_status(self) -> TieringStatus:
+        statuses = self._all(lambda enrollments: enrollments.tiering_status())
+        return TieringStatus(
+            enabled=any(status.enabled for status in statuses),
+            live_rows=sum(status.live_rows for status in statuses),
+            archived_rows=sum(status.archived_rows for status in statuses),
+            archive_bytes=sum(status.archive_bytes for status in statuses),
+            segments=sum(status.segments for status in statuses),
+            migrated=sum(status.migrated for status in statuses),
+            batches=sum(status.batches for status in statuses),
+            sweeps=sum(status.sweeps for status in statuses),
+            busy_seconds=sum(status.busy_seconds for status in statuses),
+            archive_hits=sum(status.archive_hits for status in statuses),
+            archive_misses=sum(status.archive_misses for status in statuses),
+            block_cache_hits=sum(status.block_cache_hits for status in statuses),
+            block_reads=sum(status.block_reads for status in statuses),
+            error=next((status.error for status in statuses if status.error), None)
+        )
+
+    def enroll_user(self, enrollment_data: EnrollmentCreate) -> EnrollResult:
+        return self._owner(enrollment_data.user_id).enroll_user(enrollment_data)
+
+    def enroll_users(self, enrollments_data: List[EnrollmentCreate]) -> List[EnrollResult]:
+        return self.router.scatter(
+            enrollments_data, lambda data: data.user_id, lambda shard, chunk: self.router.shards[shard][2].enroll_users(chunk)
+        )
+
+    def get_waitlist(self, course_id: str) -> List[WaitlistEntry]:
+        return [entry for entries in self._all(lambda enrollments: enrollments.get_waitlist(course_id)) for entry in entries]
+
+    def leave_waitlist(self, course_id: str, user_id: str) -> bool:
+        return self._owner(user_id).leave_waitlist(course_id, user_id)
+
+    def get_enrollment(self, enrollment_id: str) -> Optional[Enrollment]:
+        return self._owner(enrollment_id).get_enrollment(enrollment_id)
+
+    def get_all_enrollments(self) -> List[Enrollment]:
+        return [enrollment for enrollments in self._all(lambda enrollments: enrollments.get_all_enrollments()) for enrollment in enrollments]
+
+    def list_enrollments(self, limit: int, cursor: Optional[str] = None) -> Page[Enrollment]:
+        return self.router.walk(lambda shard, size, inner: self.router.shards[shard][2].list_enrollments(size, inner), limit, cursor)
+
+    def list_enrollments_between(
+        self, since: Optional[datetime], until: Optional[datetime], limit: int, cursor: Optional[str] = None
+    ) -> Page[Enrollment]:
+        count = self.router.count
+        position = decode_cursor(cursor)
+        after, last = divmod(position, count) if position else (0, count)
+        pages = self.router.gather(
+            lambda shard: self.router.shards[shard][2].scan_between(since, until, after if shard <= last else after - 1, limit + 1)
+        )
+        merged = list(heapq.merge(*([(key, shard, item) for key, item in page] for shard, page in enumerate(pages)), key=lambda entry: entry[:2]))
+        items = [item for _, _, item in merged[:limit]]
+        if len(merged) > limit:
+            key, shard, _ = merged[limit - 1]
+            return items, encode_cursor(key * count + shard)
+        return items, None
+
+    def get_user_enrollments(self, user_id: str) -> List[Enrollment]:
+        return self._owner(user_id).get_user_enrollments(user_id)
+
+    def get_course_enrollments(self, course_id: str) -> List[Enrollment]:
+        return [enrollment for enrollments in self._all(lambda enrollments: enrollments.get_course_enrollments(course_id)) for enrollment in enrollments]
+
+    def get_user_course_enrollment(self, user_id: str, course_id: str) -> Optional[Enrollment]:
+        return self._owner(user_id).get_user_course_enrollment(user_id, course_id)
+
+    def get_course_users(self, course_id: str) -> List[User]:
+        return [user for users in self._all(lambda enrollments: enrollments.get_course_users(course_id)) for user in users]
+
+    def list_course_users(self, course_id: str, limit: int, cursor: Optional[str] = None) -> Page[User]:
+        roster = self.get_course_users(course_id)
+        offset = decode_cursor(cursor)
+        end = offset + limit
+        return roster[offset:end], encode_cursor(end) if end < len(roster) else None
+
+    def delete_enrollment(self, enrollment_id: str) -> bool:
+        return self._owner(enrollment_id).delete_enrollment(enrollment_id)
+
+    def mark_completion(self, enrollment_id: str) -> Optional[Enrollment]:
+        return self._owner(enrollment_id).mark_completion(enrollment_id)
+
+    def course_report(self, course_id: str) -> CourseReport:
+        reports = self._all(lambda enrollments: enrollments.course_report(course_id))
+        return EnrollmentService._course_report(course_id, sum(report.total for report in reports), sum(report.completed for report in reports))
+
+    def course_reports(self, since: Optional[datetime] = None, until: Optional[datetime] = None) -> List[CourseReport]:
+        counts: Dict[str, List[int]] = {}
+        for reports in self._all(lambda enrollments: enrollments.course_reports(since, until)):
+            for report in reports:
+                total = counts.setdefault(report.course_id, [0, 0])
+                total[0] += report.total
+                total[1] += report.completed
+        return [EnrollmentService._course_report(course_id, total, completed) for course_id, (total, completed) in counts.items()]
+
+    def daily_report(self, course_id: Optional[str] = None) -> List[DailyReport]:
+        days: Dict[object, List[int]] = {}
+        for reports in self._all(lambda enrollments: enrollments.daily_report(course_id)):
+            for report in reports:
+                total = days.setdefault(report.day, [0, 0])
+                total[0] += report.total
+                total[1] += report.completed
+        return [DailyReport(day=day, total=total, completed=completed) for day, (total, completed) in sorted(days.items())]
+
+
+def connect_shards(addresses: List[str], authkey: Optional[bytes]) -> Tuple[ShardedUserService, ShardedCourseService, ShardedEnrollmentService]:
+    router = ShardRouter([connect_services(address, authkey) for address in addresses])
+    return ShardedUserService(router), ShardedCourseService(router), ShardedEnrollmentService(router)
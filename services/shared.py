@@ -0,0 +1,93 @@
+import argparse
+import os
+import stat
+from multiprocessing.managers import BaseManager
+from typing import Callable, Optional, Tuple
+
+SERVICE_NAMES = ("user_service", "course_service", "enrollment_service")
+EVENT_LOG_NAME = "event_log"
+MIN_AUTHKEY_BYTES = 16
+
+
+class StoreManager(BaseManager):
+    pass
+
+
+def check_authkey(authkey: Optional[bytes]) -> bytes:
+    if not authkey or len(authkey) < MIN_AUTHKEY_BYTES:
+        raise ValueError(f"EDUTRACK_STORE_AUTHKEY must be set to a secret of at least {MIN_AUTHKEY_BYTES} bytes")
+    return authkey
+
+
+def default_address() -> str:
+    return os.path.join("/tmp", f"edutrack-{os.getuid()}", "store.sock")
+
+
+def prepare_address(address: str) -> None:
+    directory = os.path.dirname(os.path.abspath(address))
+    if not os.path.isdir(directory):
+        os.makedirs(directory, mode=0o700)
+    if os.path.lexists(address):
+        if not stat.S_ISSOCK(os.lstat(address).st_mode):
+            raise ValueError(f"Refusing to replace {address}: it is not a socket")
+        os.unlink(address)
+
+
+def serve(address: str, authkey: bytes, build: Callable[[], tuple], build_events: Optional[Callable[[tuple], object]] = None) -> None:
+    check_authkey(authkey)
+    prepare_address(address)
+    built = build()
+    services = dict(zip(SERVICE_NAMES, built))
+    if build_events is not None:
+        services[EVENT_LOG_NAME] = build_events(built)
+    for name, service in services.items():
+        StoreManager.register(name, callable=lambda service=service: service)
+    manager = StoreManager(address=address, authkey=authkey)
+    umask = os.umask(0o177)
+    try:
+        server = manager.get_server()
+    finally:
+        os.umask(umask)
+    os.chmod(address, 0o600)
+    print(f"EduTrack store serving on {address}", flush=True)
+    server.serve_forever()
+
+
+def connect_services(address: str, authkey: Optional[bytes]) -> Tuple:
+    check_authkey(authkey)
+    for name in SERVICE_NAMES:
+        StoreManager.register(name)
+    manager = StoreManager(address=address, authkey=authkey)
+    manager.connect()
+    return tuple(getattr(manager, name)() for name in SERVICE_NAMES)
+
+
+def connect_event_log(address: str, authkey: Optional[bytes]):
+    check_authkey(authkey)
+    StoreManager.register(EVENT_LOG_NAME)
+    manager = StoreManager(address=address, authkey=authkey)
+    manager.connect()
+    return getattr(manager, EVENT_LOG_NAME)()
+
+
+def main() -> None:
+    from services.dependencies import STORE_AUTHKEY, build_event_log, build_services, id_factory
+    parser = argparse.ArgumentParser(description="Run the shared EduTrack store process")
+    parser.add_argument("--address", default=os.getenv("EDUTRACK_STORE_ADDRESS") or default_address())
+    parser.add_argument("--shard", type=int, default=0, help="Index of this node in EDUTRACK_STORE_SHARDS")
+    parser.add_argument("--shards", type=int, default=1, help="Number of shard nodes")
+    args = parser.parse_args()
+    try:
+        check_authkey(STORE_AUTHKEY)
+    except ValueError as error:
+        parser.error(str(error))
+    build = build_services
+    if args.shards > 1:
+        from services.sharding import ShardIds
+        ids = ShardIds(args.shard, args.shards, id_factory())
+        build = lambda: build_services(ids)
+    serve(args.address, STORE_AUTHKEY, build, build_event_log)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import mmap
+import os
+import struct
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Type, Union
+from pydantic import BaseModel
+from services.analytics import EPOCH, MICROSECOND, NO_DATE, encode_date
+from services.journal import fsync_directory
+from services.serialization import decode, encode
+
+MAGIC = b"EDUSNAP1"
+FOOTER = struct.Struct("<Q")
+SNAPSHOT_PREFIX = "snapshot-"
+SNAPSHOT_SUFFIX = ".snap"
+
+Blob = Union[bytes, bytearray, array, memoryview]
+
+
+def snapshot_path(directory: str, segment: int) -> str:
+    return os.path.join(directory, f"{SNAPSHOT_PREFIX}{segment:08d}{SNAPSHOT_SUFFIX}")
+
+
+def list_snapshots(directory: str) -> List[int]:
+    return sorted(
+        int(name[len(SNAPSHOT_PREFIX):-len(SNAPSHOT_SUFFIX)])
+        for name in os.listdir(directory)
+        if name.startswith(SNAPSHOT_PREFIX) and name.endswith(SNAPSHOT_SUFFIX)
+    )
+
+
+class Section:
+    def __init__(self, kind: str, count: int, meta: Optional[Dict[str, Any]] = None, blobs: Optional[Dict[str, Blob]] = None):
+        self.kind = kind
+        self.count = count
+        self.meta = meta or {}
+        self.blobs = blobs or {}
+
+
+def write_snapshot(directory: str, segment: int, sections: Dict[str, Section]) -> str:
+    path = snapshot_path(directory, segment)
+    temporary = path + ".tmp"
+    footer: Dict[str, Any] = {"segment": segment, "sections": {}}
+    with open(temporary, "wb") as file:
+        file.write(MAGIC)
+        offset = len(MAGIC)
+        for name, section in sections.items():
+            blobs = {}
+            for blob_name, blob in section.blobs.items():
+                view = memoryview(blob).cast("B")
+                file.write(view)
+                blobs[blob_name] = [offset, len(view)]
+                offset += len(view)
+            footer["sections"][name] = {"kind": section.kind, "count": section.count, "meta": section.meta, "blobs": blobs}
+        encoded = encode(footer)
+        file.write(encoded)
+        file.write(FOOTER.pack(offset))
+        file.write(MAGIC)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+    fsync_directory(directory)
+    return path
+
+
+class SnapshotReader:
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+        size = len(view)
+        self._view = view
+        if size < 2 * len(MAGIC) + FOOTER.size or view[:len(MAGIC)] != MAGIC or view[size - len(MAGIC):] != MAGIC:
+            self.close()
+            raise ValueError(f"Not a complete snapshot: {path}")
+        footer_offset, = FOOTER.unpack_from(view, size - len(MAGIC) - FOOTER.size)
+        footer = decode(view[footer_offset:size - len(MAGIC) - FOOTER.size])
+        self.segment: int = footer["segment"]
+        self.sections: Dict[str, Section] = {
+            name: Section(
+                entry["kind"], entry["count"], entry["meta"],
+                {blob: view[start:start + length] for blob, (start, length) in entry["blobs"].items()}
+            )
+            for name, entry in footer["sections"].items()
+        }
+
+    def close(self) -> None:
+        for section in getattr(self, "sections", {}).values():
+            for blob in section.blobs.values():
+                blob.release()
+        self.sections = {}
+        view = getattr(self, "_view", None)
+        if view is not None:
+            view.release()
+        self._map.close()
+        self._file.close()
+
+
+def _is_datetime(model: Type[BaseModel], name: str) -> bool:
+    return model.model_fields[name].annotation in (datetime, Optional[datetime])
+
+
+def encode_models(model: Type[BaseModel], items: List[BaseModel]) -> Section:
+    blobs: Dict[str, Blob] = {}
+    for name in model.model_fields:
+        values = [getattr(item, name) for item in items]
+        if _is_datetime(model, name):
+            encoded = [encode_date(value) for value in values]
+            blobs[name] = array("q", [micros for micros, _ in encoded])
+            blobs[name + ".aware"] = bytes(aware for _, aware in encoded)
+        else:
+            blobs[name] = encode(values)
+    return Section("models", len(items), blobs=blobs)
+
+
+def decode_models(model: Type[BaseModel], section: Section) -> List[BaseModel]:
+    names = list(model.model_fields)
+    columns = []
+    for name in names:
+        if _is_datetime(model, name):
+            micros = array("q")
+            micros.frombytes(section.blobs[name])
+            aware = bytes(section.blobs[name + ".aware"])
+            columns.append([
+                None if value == NO_DATE else
+                (EPOCH + value * MICROSECOND).replace(tzinfo=timezone.utc) if aware[row] else EPOCH + value * MICROSECOND
+                for row, value in enumerate(micros)
+            ])
+        else:
+            columns.append(decode(section.blobs[name]))
+    construct = model.model_construct
+    return [construct(**dict(zip(names, row))) for row in zip(*columns)]
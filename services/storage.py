@@ -0,0 +1,469 @@
+import queue
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Generic, Iterable, Iterator, List, Optional, Tuple, Type, TypeVar
+from pydantic import BaseModel
+from schemas.models import User, Course, Enrollment, WaitlistSlot
+from services.analytics import NO_DATE, EnrollmentColumns, encode_date
+from services.pagination import SequencedIndex, SortedIndex
+
+M = TypeVar("M", bound=BaseModel)
+
+SEQ_BITS = 40
+SEQ_MASK = (1 << SEQ_BITS) - 1
+LATEST_DATE = encode_date(datetime.max)[0] + 1
+
+
+def date_key(micros: int, seq: int = 0) -> int:
+    return (micros - NO_DATE) << SEQ_BITS | seq
+
+
+def split_date_key(key: int) -> Tuple[int, int]:
+    return (key >> SEQ_BITS) + NO_DATE, key & SEQ_MASK
+
+
+def date_bounds(since: Optional[datetime], until: Optional[datetime]) -> Tuple[int, int]:
+    low = encode_date(since)[0] if since is not None else NO_DATE + 1
+    high = encode_date(until)[0] if until is not None else LATEST_DATE
+    return date_key(low), date_key(high)
+
+
+class Collection(ABC, Generic[M]):
+    blocking = False
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[M]:
+        ...
+
+    @abstractmethod
+    def get_many(self, keys: List[str]) -> List[M]:
+        ...
+
+    @abstractmethod
+    def put(self, item: M) -> None:
+        ...
+
+    @abstractmethod
+    def put_many(self, items: List[M]) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> Optional[M]:
+        ...
+
+    def delete_many(self, keys: List[str]) -> List[M]:
+        deleted = []
+        for key in keys:
+            item = self.delete(key)
+            if item is not None:
+                deleted.append(item)
+        return deleted
+
+    @abstractmethod
+    def values(self) -> List[M]:
+        ...
+
+    @abstractmethod
+    def scan(self, after: int, limit: int) -> List[Tuple[int, M]]:
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+
+class EnrollmentCollection(Collection[Enrollment]):
+    @abstractmethod
+    def by_user(self, user_id: str) -> List[Enrollment]:
+        ...
+
+    @abstractmethod
+    def by_course(self, course_id: str) -> List[Enrollment]:
+        ...
+
+    @abstractmethod
+    def by_pair(self, user_id: str, course_id: str) -> Optional[Enrollment]:
+        ...
+
+    @abstractmethod
+    def between(self, low: int, high: int, limit: int) -> List[Tuple[int, Enrollment]]:
+        ...
+
+    def user_ids(self) -> List[str]:
+        return list({enrollment.user_id: None for enrollment in self.values()})
+
+    def course_ids(self) -> List[str]:
+        return list({enrollment.course_id: None for enrollment in self.values()})
+
+    def snapshot_columns(self) -> EnrollmentColumns:
+        return EnrollmentColumns.from_enrollments(self.values())
+
+
+class StorageBackend:
+    def __init__(
+        self,
+        users: Collection[User],
+        courses: Collection[Course],
+        enrollments: EnrollmentCollection,
+        waitlist: Optional[Collection[WaitlistSlot]] = None
+    ):
+        self.users = users
+        self.courses = courses
+        self.enrollments = enrollments
+        self.waitlist = waitlist if waitlist is not None else MemoryCollection()
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryCollection(Collection[M]):
+    def __init__(self):
+        self._items: Dict[str, M] = {}
+        self._order = SequencedIndex()
+        self._lock = threading.RLock()
+
+    def get(self, key: str) -> Optional[M]:
+        return self._items.get(key)
+
+    def get_many(self, keys: List[str]) -> List[M]:
+        items = self._items
+        return [items[key] for key in keys if key in items]
+
+    def put(self, item: M) -> None:
+        with self._lock:
+            if item.id not in self._items:
+                self._order.add(item.id)
+            self._items[item.id] = item
+
+    def put_many(self, items: List[M]) -> None:
+        with self._lock:
+            for item in items:
+                self.put(item)
+
+    def delete(self, key: str) -> Optional[M]:
+        with self._lock:
+            item = self._items.pop(key, None)
+            if item is not None:
+                self._order.remove(key)
+            return item
+
+    def values(self) -> List[M]:
+        with self._lock:
+            return list(self._items.values())
+
+    def scan(self, after: int, limit: int) -> List[Tuple[int, M]]:
+        with self._lock:
+            entries = [(seq, self._items.get(key)) for seq, key in self._order.scan(after, limit)]
+        return [(seq, item) for seq, item in entries if item is not None]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._items
+
+
+class MemoryEnrollmentCollection(MemoryCollection[Enrollment], EnrollmentCollection):
+    def __init__(self):
+        super().__init__()
+        self._by_user: Dict[str, Dict[str, None]] = {}
+        self._by_course: Dict[str, Dict[str, None]] = {}
+        self._by_pair: Dict[Tuple[str, str], str] = {}
+        self._by_date = SortedIndex()
+
+    def put(self, item: Enrollment) -> None:
+        with self._lock:
+            previous = self._items.get(item.id)
+            if previous is not None:
+                self._unindex(previous)
+            super().put(item)
+            self._index(item)
+
+    def delete(self, key: str) -> Optional[Enrollment]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._unindex(item)
+            return super().delete(key)
+
+    def by_user(self, user_id: str) -> List[Enrollment]:
+        return self._resolve(self._by_user.get(user_id, ()))
+
+    def by_course(self, course_id: str) -> List[Enrollment]:
+        return self._resolve(self._by_course.get(course_id, ()))
+
+    def by_pair(self, user_id: str, course_id: str) -> Optional[Enrollment]:
+        key = self._by_pair.get((user_id, course_id))
+        return self._items.get(key) if key is not None else None
+
+    def user_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._by_user)
+
+    def course_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._by_course)
+
+    def between(self, low: int, high: int, limit: int) -> List[Tuple[int, Enrollment]]:
+        with self._lock:
+            entries = [(key, self._items.get(item_id)) for key, item_id in self._by_date.scan(low, high, limit)]
+        return [(key, item) for key, item in entries if item is not None]
+
+    def _date_key(self, enrollment: Enrollment) -> Optional[int]:
+        if enrollment.enrolled_date is None:
+            return None
+        return date_key(encode_date(enrollment.enrolled_date)[0], self._order.seq_of(enrollment.id))
+
+    def _resolve(self, keys: Iterable[str]) -> List[Enrollment]:
+        with self._lock:
+            return [self._items[key] for key in keys if key in self._items]
+
+    def _index(self, enrollment: Enrollment) -> None:
+        self._by_user.setdefault(enrollment.user_id, {})[enrollment.id] = None
+        self._by_course.setdefault(enrollment.course_id, {})[enrollment.id] = None
+        self._by_pair[(enrollment.user_id, enrollment.course_id)] = enrollment.id
+        key = self._date_key(enrollment)
+        if key is not None:
+            self._by_date.add(key, enrollment.id)
+
+    def _unindex(self, enrollment: Enrollment) -> None:
+        key = self._date_key(enrollment)
+        if key is not None:
+            self._by_date.remove(key)
+        for index, key in ((self._by_user, enrollment.user_id), (self._by_course, enrollment.course_id)):
+            bucket = index.get(key)
+            if bucket is not None:
+                bucket.pop(enrollment.id, None)
+                if not bucket:
+                    del index[key]
+        if self._by_pair.get((enrollment.user_id, enrollment.course_id)) == enrollment.id:
+            del self._by_pair[(enrollment.user_id, enrollment.course_id)]
+
+
+class MemoryBackend(StorageBackend):
+    def __init__(self, compact_enrollments: bool = False):
+        if compact_enrollments:
+            from services.columnar import CompactEnrollmentCollection
+            enrollments: EnrollmentCollection = CompactEnrollmentCollection()
+        else:
+            enrollments = MemoryEnrollmentCollection()
+        super().__init__(MemoryCollection(), MemoryCollection(), enrollments)
+
+
+class ConnectionPool:
+    def __init__(self, path: str, size: int = 8, statement_cache_size: int = 256):
+        self.path = path
+        self._connections: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        for _ in range(size):
+            self._connections.put(self._connect(statement_cache_size))
+
+    def _connect(self, statement_cache_size: int) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None, cached_statements=statement_cache_size
+        )
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA busy_timeout=5000")
+        return connection
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        connection = self._connections.get()
+        try:
+            yield connection
+        finally:
+            self._connections.put(connection)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        with self.connection() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    def close(self) -> None:
+        while not self._connections.empty():
+            self._connections.get_nowait().close()
+
+
+class SQLiteCollection(Collection[M]):
+    columns: Tuple[str, ...] = ()
+    column_types: Dict[str, str] = {}
+    blocking = True
+    MAX_PARAMETERS = 500
+
+    def __init__(self, pool: ConnectionPool, table: str, model: Type[M]):
+        self.pool = pool
+        self.table = table
+        self.model = model
+        names = ("id",) + self.columns + ("data",)
+        updates = ", ".join(f"{name} = excluded.{name}" for name in names[1:])
+        self._select_sql = f"SELECT data FROM {table} WHERE id = ?"
+        self._values_sql = f"SELECT data FROM {table} ORDER BY seq"
+        self._scan_sql = f"SELECT seq, data FROM {table} WHERE seq > ? ORDER BY seq LIMIT ?"
+        self._count_sql = f"SELECT COUNT(*) FROM {table}"
+        self._delete_sql = f"DELETE FROM {table} WHERE id = ? RETURNING data"
+        self._upsert_sql = (
+            f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' for _ in names)}) "
+            f"ON CONFLICT(id) DO UPDATE SET {updates}"
+        )
+
+    def create_schema(self, connection: sqlite3.Connection) -> None:
+        extra = "".join(f", {name} {self.column_types.get(name, 'TEXT NOT NULL')}" for name in self.columns)
+        connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} "
+            f"(seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT NOT NULL UNIQUE{extra}, data TEXT NOT NULL)"
+        )
+
+    def _row(self, item: M) -> tuple:
+        return (item.id,) + tuple(self._column(item, name) for name in self.columns) + (item.model_dump_json(),)
+
+    def _column(self, item: M, name: str):
+        return getattr(item, name)
+
+    def _load(self, data: str) -> M:
+        return self.model.model_validate_json(data)
+
+    def _query(self, sql: str, parameters: tuple = ()) -> List[tuple]:
+        with self.pool.connection() as connection:
+            return connection.execute(sql, parameters).fetchall()
+
+    def get(self, key: str) -> Optional[M]:
+        rows = self._query(self._select_sql, (key,))
+        return self._load(rows[0][0]) if rows else None
+
+    def get_many(self, keys: List[str]) -> List[M]:
+        found: Dict[str, M] = {}
+        unique = list(dict.fromkeys(keys))
+        for offset in range(0, len(unique), self.MAX_PARAMETERS):
+            chunk = unique[offset:offset + self.MAX_PARAMETERS]
+            sql = f"SELECT id, data FROM {self.table} WHERE id IN ({', '.join('?' for _ in chunk)})"
+            for key, data in self._query(sql, tuple(chunk)):
+                found[key] = self._load(data)
+        return [found[key] for key in keys if key in found]
+
+    def put(self, item: M) -> None:
+        with self.pool.connection() as connection:
+            connection.execute(self._upsert_sql, self._row(item))
+
+    def put_many(self, items: List[M]) -> None:
+        with self.pool.transaction() as connection:
+            connection.executemany(self._upsert_sql, [self._row(item) for item in items])
+
+    def delete(self, key: str) -> Optional[M]:
+        rows = self._query(self._delete_sql, (key,))
+        return self._load(rows[0][0]) if rows else None
+
+    def delete_many(self, keys: List[str]) -> List[M]:
+        deleted = []
+        with self.pool.transaction() as connection:
+            for offset in range(0, len(keys), self.MAX_PARAMETERS):
+                chunk = keys[offset:offset + self.MAX_PARAMETERS]
+                sql = f"DELETE FROM {self.table} WHERE id IN ({', '.join('?' for _ in chunk)}) RETURNING data"
+                deleted.extend(self._load(data) for data, in connection.execute(sql, tuple(chunk)).fetchall())
+        return deleted
+
+    def values(self) -> List[M]:
+        return [self._load(data) for data, in self._query(self._values_sql)]
+
+    def scan(self, after: int, limit: int) -> List[Tuple[int, M]]:
+        return [(seq, self._load(data)) for seq, data in self._query(self._scan_sql, (after, limit))]
+
+    def __len__(self) -> int:
+        return self._query(self._count_sql)[0][0]
+
+
+class SQLiteEnrollmentCollection(SQLiteCollection[Enrollment], EnrollmentCollection):
+    columns = ("user_id", "course_id", "enrolled")
+    column_types = {"enrolled": "INTEGER"}
+
+    def __init__(self, pool: ConnectionPool, table: str = "enrollments"):
+        super().__init__(pool, table, Enrollment)
+        self._by_user_sql = f"SELECT data FROM {table} WHERE user_id = ? ORDER BY seq"
+        self._by_course_sql = f"SELECT data FROM {table} WHERE course_id = ? ORDER BY seq"
+        self._by_pair_sql = f"SELECT data FROM {table} WHERE user_id = ? AND course_id = ?"
+        self._user_ids_sql = f"SELECT DISTINCT user_id FROM {table}"
+        self._course_ids_sql = f"SELECT DISTINCT course_id FROM {table}"
+        self._between_sql = (
+            f"SELECT enrolled, seq, data FROM {table} WHERE (enrolled, seq) >= (?, ?) AND (enrolled, seq) < (?, ?) "
+            f"ORDER BY enrolled, seq LIMIT ?"
+        )
+
+    def _column(self, item: Enrollment, name: str):
+        if name == "enrolled":
+            return encode_date(item.enrolled_date)[0] if item.enrolled_date is not None else None
+        return getattr(item, name)
+
+    def create_schema(self, connection: sqlite3.Connection) -> None:
+        super().create_schema(connection)
+        existing = {row[1] for row in connection.execute(f"PRAGMA table_info({self.table})")}
+        if "enrolled" not in existing:
+            connection.execute(f"ALTER TABLE {self.table} ADD COLUMN enrolled INTEGER")
+            rows = connection.execute(f"SELECT seq, data FROM {self.table}").fetchall()
+            connection.executemany(
+                f"UPDATE {self.table} SET enrolled = ? WHERE seq = ?",
+                [(self._column(self._load(data), "enrolled"), seq) for seq, data in rows]
+            )
+        connection.execute(f"CREATE INDEX IF NOT EXISTS ix_{self.table}_enrolled ON {self.table} (enrolled)")
+        connection.execute(f"CREATE INDEX IF NOT EXISTS ix_{self.table}_user_id ON {self.table} (user_id)")
+        connection.execute(f"CREATE INDEX IF NOT EXISTS ix_{self.table}_course_id ON {self.table} (course_id)")
+        connection.execute(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS ix_{self.table}_user_course ON {self.table} (user_id, course_id)"
+        )
+
+    def by_user(self, user_id: str) -> List[Enrollment]:
+        return [self._load(data) for data, in self._query(self._by_user_sql, (user_id,))]
+
+    def by_course(self, course_id: str) -> List[Enrollment]:
+        return [self._load(data) for data, in self._query(self._by_course_sql, (course_id,))]
+
+    def by_pair(self, user_id: str, course_id: str) -> Optional[Enrollment]:
+        rows = self._query(self._by_pair_sql, (user_id, course_id))
+        return self._load(rows[0][0]) if rows else None
+
+    def user_ids(self) -> List[str]:
+        return [user_id for user_id, in self._query(self._user_ids_sql, ())]
+
+    def course_ids(self) -> List[str]:
+        return [course_id for course_id, in self._query(self._course_ids_sql, ())]
+
+    def between(self, low: int, high: int, limit: int) -> List[Tuple[int, Enrollment]]:
+        rows = self._query(self._between_sql, split_date_key(low) + split_date_key(high) + (limit,))
+        return [(date_key(enrolled, seq), self._load(data)) for enrolled, seq, data in rows]
+
+
+class SQLiteBackend(StorageBackend):
+    def __init__(self, path: str, pool_size: int = 8):
+        self.pool = ConnectionPool(path, pool_size)
+        super().__init__(
+            SQLiteCollection(self.pool, "users", User),
+            SQLiteCollection(self.pool, "courses", Course),
+            SQLiteEnrollmentCollection(self.pool),
+            SQLiteCollection(self.pool, "waitlist", WaitlistSlot),
+        )
+        with self.pool.transaction() as connection:
+            for collection in (self.users, self.courses, self.enrollments, self.waitlist):
+                collection.create_schema(connection)
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+def create_backend(
+    name: str, sqlite_path: str = "edutrack.db", sqlite_pool_size: int = 8, compact_enrollments: bool = False
+) -> StorageBackend:
+    if name == "memory":
+        return MemoryBackend(compact_enrollments)
+    if name == "sqlite":
+        return SQLiteBackend(sqlite_path, sqlite_pool_size)
+    raise ValueError(f"Unknown storage backend: {name}")
@@ -0,0 +1,60 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Optional, Tuple
+
+
+class TieringWorker:
+    def __init__(
+        self,
+        migrate: Callable[[datetime, int], Tuple[int, bool]],
+        age: timedelta,
+        batch_size: int = 500,
+        interval: float = 60.0
+    ):
+        self.migrate = migrate
+        self.age = age
+        self.batch_size = batch_size
+        self.interval = interval
+        self.migrated = 0
+        self.batches = 0
+        self.sweeps = 0
+        self.busy_seconds = 0.0
+        self.error: Optional[str] = None
+        self._stop = threading.Event()
+        self._sweeping = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="enrollment-tiering", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.sweep()
+            except Exception as exc:
+                self.error = repr(exc)
+            self._stop.wait(self.interval)
+
+    def sweep(self) -> int:
+        with self._sweeping:
+            cutoff = datetime.now() - self.age
+            moved = 0
+            while not self._stop.is_set():
+                started = time.perf_counter()
+                archived, done = self.migrate(cutoff, self.batch_size)
+                self.busy_seconds += time.perf_counter() - started
+                self.batches += 1
+                self.migrated += archived
+                moved += archived
+                if done:
+                    break
+                time.sleep(0)
+            self.sweeps += 1
+            return moved
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
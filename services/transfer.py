@@ -0,0 +1,155 @@
+import codecs
+import csv
+import io
+from typing import Any, Dict, List, Optional, Tuple, Type
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from services.serialization import decode, model_json
+
+CSV, NDJSON = "csv", "ndjson"
+MAX_RECORD_BYTES = 1 << 20
+
+Record = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+RowError = Tuple[int, str]
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return value
+
+
+def complete_records(text: str) -> int:
+    end = 0
+    quotes = 0
+    position = text.find("\n")
+    start = 0
+    while position != -1:
+        quotes += text.count('"', start, position)
+        if quotes % 2 == 0:
+            end = position + 1
+        start = position
+        position = text.find("\n", position + 1)
+    return end
+
+
+class RecordReader:
+    def __init__(self, format: str, max_record_bytes: int = MAX_RECORD_BYTES):
+        self.format = format
+        self.max_record_bytes = max_record_bytes
+        self.rows = 0
+        self._buffer = b""
+        self._text = ""
+        self._skipping = False
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._header: Optional[List[str]] = None
+
+    def feed(self, chunk: bytes) -> List[Record]:
+        if self.format == CSV:
+            self._text += self._decoder.decode(chunk)
+            if self._skipping:
+                start = self._text.find("\n") + 1
+                self._skipping = start == 0
+                self._text = self._text[start:] if start else ""
+            end = complete_records(self._text)
+            text, self._text = self._text[:end], self._text[end:]
+            records = self._csv_records(text)
+            if len(self._text) > self.max_record_bytes:
+                self._text = ""
+                records.append(self._too_long())
+            return records
+        self._buffer += chunk
+        if self._skipping:
+            start = self._buffer.find(b"\n") + 1
+            self._skipping = start == 0
+            self._buffer = self._buffer[start:] if start else b""
+        end = self._buffer.rfind(b"\n") + 1
+        lines, self._buffer = self._buffer[:end], self._buffer[end:]
+        records = self._ndjson_records(lines)
+        if len(self._buffer) > self.max_record_bytes:
+            self._buffer = b""
+            records.append(self._too_long())
+        return records
+
+    def close(self) -> List[Record]:
+        if self.format == CSV:
+            text, self._text = self._text + self._decoder.decode(b"", final=True), ""
+            return self._csv_records(text)
+        lines, self._buffer = self._buffer, b""
+        return self._ndjson_records(lines)
+
+    def _too_long(self) -> Record:
+        self._skipping = True
+        self.rows += 1
+        return self.rows, None, f"Record is longer than {self.max_record_bytes} bytes"
+
+    def _ndjson_records(self, lines: bytes) -> List[Record]:
+        records: List[Record] = []
+        for line in lines.split(b"\n"):
+            if not line.strip():
+                continue
+            self.rows += 1
+            try:
+                data = decode(line)
+            except ValueError as error:
+                records.append((self.rows, None, f"Invalid JSON: {error}"))
+                continue
+            if isinstance(data, dict):
+                records.append((self.rows, data, None))
+            else:
+                records.append((self.rows, None, "Expected a JSON object"))
+        return records
+
+    def _csv_records(self, text: str) -> List[Record]:
+        records: List[Record] = []
+        for row in csv.reader(io.StringIO(text)):
+            if not row:
+                continue
+            if self._header is None:
+                self._header = [name.strip() for name in row]
+                continue
+            self.rows += 1
+            if len(row) != len(self._header):
+                records.append((self.rows, None, f"Expected {len(self._header)} columns, got {len(row)}"))
+                continue
+            records.append((self.rows, {name: value for name, value in zip(self._header, row) if value != ""}, None))
+        return records
+
+
+def validate_records(adapter: TypeAdapter, model: Type[BaseModel], records: List[Record]) -> Tuple[List[Tuple[int, BaseModel]], List[RowError]]:
+    errors: List[RowError] = [(row, error) for row, data, error in records if error is not None]
+    parsed = [(row, data) for row, data, error in records if error is None]
+    try:
+        items = adapter.validate_python([data for _, data in parsed])
+        return [(row, item) for (row, _), item in zip(parsed, items)], errors
+    except ValidationError:
+        pass
+    valid: List[Tuple[int, BaseModel]] = []
+    for row, data in parsed:
+        try:
+            valid.append((row, model.model_validate(data)))
+        except ValidationError as error:
+            errors.append((row, "; ".join(f"{'.'.join(map(str, detail['loc']))}: {detail['msg']}" for detail in error.errors())))
+    return valid, errors
+
+
+class RecordWriter:
+    def __init__(self, format: str, model: Type[BaseModel]):
+        self.format = format
+        self.fields = list(model.model_fields)
+        self._header = format == CSV
+
+    def write(self, items: List[BaseModel]) -> bytes:
+        if self.format == NDJSON:
+            return b"".join(model_json(item) + b"\n" for item in items)
+        out = io.StringIO()
+        writer = csv.writer(out, lineterminator="\n")
+        if self._header:
+            writer.writerow(self.fields)
+            self._header = False
+        fields = self.fields
+        for item in items:
+            data = item.model_dump(mode="json")
+            writer.writerow([_csv_value(data[name]) for name in fields])
+        return out.getvalue().encode()
@@ -0,0 +1,32 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class VersionTracker:
+    def __init__(self, max_entities: Optional[int] = None):
+        self.collection = time.time_ns() // 1000
+        self.max_entities = max_entities
+        self._entities: Dict[str, int] = OrderedDict() if max_entities is not None else {}
+        self._lock = threading.Lock()
+
+    def bump(self, *keys: str) -> int:
+        with self._lock:
+            self.collection += 1
+            entities = self._entities
+            for key in keys:
+                entities[key] = self.collection
+            if self.max_entities is not None:
+                for key in keys:
+                    entities.move_to_end(key)
+                while len(entities) > self.max_entities:
+                    entities.popitem(last=False)
+            return self.collection
+
+    def entity(self, key: str) -> int:
+        return self._entities.get(key, self.collection)
+
+    def forget(self, key: str) -> None:
+        with self._lock:
+            self._entities.pop(key, None)
@@ -2,6 +2,7 @@ from fastapi.testclient import TestClient
 from main import app
 import pytest
 import json
+import uuid
 
 client = TestClient(app)
 
@@ -52,6 +53,16 @@ class TestUsers:
         assert data["name"] == "Updated Name"
         assert data["email"] == "update@example.com"
 
+    def test_update_rejects_null_fields(self):
+        user_id = client.post("/users/", json={"name": "Null Update", "email": "null-update@example.com"}).json()["id"]
+        for field in ("name", "email", "is_active"):
+            assert client.put(f"/users/{user_id}", json={field: None}).status_code == 422
+        assert client.get(f"/users/{user_id}").json()["email"] == "null-update@example.com"
+        assert client.post("/users/", json={"name": "Again", "email": "null-update@example.com"}).status_code == 409
+        course_id = client.post("/courses/", json={"title": "Null Update", "description": "Null"}).json()["id"]
+        assert client.put(f"/courses/{course_id}", json={"title": None}).status_code == 422
+        assert client.put(f"/courses/{course_id}", json={"capacity": None}).status_code == 200
+
     def test_deactivate_user(self):
         create_response = client.post("/users/", json={"name": "Deactivate Test", "email": "deactivate@example.com"})
         user_id = create_response.json()["id"]
@@ -167,7 +178,7 @@ class TestEnrollments:
     def setup_test_data(self):
         user_response = client.post("/users/", json={
             "name": "Enrollment User",
-            "email": "enrolluser@example.com"
+            "email": f"enrolluser-{uuid.uuid4().hex}@example.com"
         })
         course_response = client.post("/courses/", json={
             "title": "Enrollment Course",
@@ -262,3 +273,1733 @@ class TestEnrollments:
         data = response.json()
         assert isinstance(data, list)
         assert len(data) == 1
+
+class TestEnrollmentIndexes:
+    def setup_services(self):
+        from services.business_logic import UserService, CourseService, EnrollmentService
+        user_service = UserService()
+        course_service = CourseService()
+        return user_service, course_service, EnrollmentService(user_service, course_service)
+
+    def test_lookups_follow_create_and_delete(self):
+        from schemas.models import UserCreate, CourseCreate, EnrollmentCreate
+        user_service, course_service, enrollment_service = self.setup_services()
+        user = user_service.create_user(UserCreate(name="Index User", email="index@example.com"))
+        course_a = course_service.create_course(CourseCreate(title="A", description="A"))
+        course_b = course_service.create_course(CourseCreate(title="B", description="B"))
+
+        first = enrollment_service.enroll_user(EnrollmentCreate(user_id=user.id, course_id=course_a.id))
+        second = enrollment_service.enroll_user(EnrollmentCreate(user_id=user.id, course_id=course_b.id))
+        assert [e.id for e in enrollment_service.get_user_enrollments(user.id)] == [first.id, second.id]
+        assert enrollment_service.get_course_enrollments(course_a.id) == [first]
+        assert enrollment_service.get_user_course_enrollment(user.id, course_b.id) == second
+
+        assert enrollment_service.delete_enrollment(first.id)
+        assert not enrollment_service.delete_enrollment(first.id)
+        assert enrollment_service.get_user_enrollments(user.id) == [second]
+        assert enrollment_service.get_course_enrollments(course_a.id) == []
+        assert enrollment_service.get_user_course_enrollment(user.id, course_a.id) is None
+        assert enrollment_service.enroll_user(EnrollmentCreate(user_id=user.id, course_id=course_a.id))
+
+class TestPagination:
+    def test_cursor_walks_every_user_once(self):
+        created = {client.post("/users/", json={"name": f"Page {i}", "email": f"page{i}@example.com"}).json()["id"] for i in range(5)}
+
+        seen = []
+        cursor = None
+        while True:
+            params = {"limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            response = client.get("/users/", params=params)
+            assert response.status_code == 200
+            page = response.json()
+            assert len(page) <= 2
+            seen.extend(user["id"] for user in page)
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+
+        assert len(seen) == len(set(seen))
+        assert created <= set(seen)
+        assert seen == [user["id"] for user in client.get("/users/").json()]
+
+    def test_invalid_cursor(self):
+        response = client.get("/courses/", params={"cursor": "not-a-cursor"})
+        assert response.status_code == 400
+
+    def test_stream_ndjson(self):
+        client.post("/courses/", json={"title": "Streamed", "description": "NDJSON"})
+        response = client.get("/courses/", params={"stream": "true"})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        records = [json.loads(line) for line in response.text.splitlines()]
+        assert records == client.get("/courses/").json()
+
+class TestBatch:
+    def test_batch_create_users_and_courses(self):
+        response = client.post("/users/batch", json=[
+            {"name": "Batch One", "email": "batch1@example.com"},
+            {"name": "Batch Two", "email": "batch2@example.com"},
+        ])
+        assert response.status_code == 200
+        results = response.json()
+        assert [r["index"] for r in results] == [0, 1]
+        assert all(r["status"] == 201 for r in results)
+        assert client.get(f"/users/{results[1]['id']}").json()["name"] == "Batch Two"
+
+        response = client.post("/courses/batch", json=[{"title": "Batch Course", "description": "Batch"}])
+        assert response.status_code == 200
+        assert response.json()[0]["status"] == 201
+
+    def test_batch_enroll_reports_partial_failures(self):
+        user_id = client.post("/users/", json={"name": "Batch Enroll", "email": "batchenroll@example.com"}).json()["id"]
+        course_id = client.post("/courses/", json={"title": "Batch Enroll", "description": "Batch"}).json()["id"]
+
+        response = client.post("/enrollments/batch", json=[
+            {"user_id": user_id, "course_id": course_id},
+            {"user_id": user_id, "course_id": course_id},
+            {"user_id": "missing", "course_id": course_id},
+        ])
+        assert response.status_code == 200
+        assert [r["status"] for r in response.json()] == [201, 400, 400]
+        assert len(client.get(f"/enrollments/user/{user_id}").json()) == 1
+
+    def test_batch_rejects_invalid_items(self):
+        response = client.post("/users/batch", json=[{"name": "No Email"}])
+        assert response.status_code == 422
+
+class TestStorageBackends:
+    @pytest.fixture(params=["memory", "compact", "sqlite"])
+    def services(self, request, tmp_path):
+        from services.business_logic import UserService, CourseService, EnrollmentService
+        from services.storage import create_backend
+        backend = create_backend(
+            "memory" if request.param == "compact" else request.param,
+            sqlite_path=str(tmp_path / "edutrack.db"),
+            sqlite_pool_size=2,
+            compact_enrollments=request.param == "compact"
+        )
+        user_service = UserService(backend.users)
+        course_service = CourseService(backend.courses)
+        yield user_service, course_service, EnrollmentService(user_service, course_service, backend.enrollments)
+        backend.close()
+
+    def test_services_round_trip(self, services):
+        from datetime import datetime
+        from schemas.models import UserCreate, UserUpdate, CourseCreate, EnrollmentCreate
+        user_service, course_service, enrollment_service = services
+        user = user_service.create_user(UserCreate(name="Stored", email="stored@example.com"))
+        course = course_service.create_course(CourseCreate(title="Stored", description="Stored"))
+
+        assert user_service.update_user(user.id, UserUpdate(name="Renamed")).name == "Renamed"
+        assert user_service.get_user(user.id).name == "Renamed"
+
+        enrollment = enrollment_service.enroll_user(EnrollmentCreate(user_id=user.id, course_id=course.id))
+        assert enrollment_service.enroll_user(EnrollmentCreate(user_id=user.id, course_id=course.id)) is None
+        assert enrollment_service.mark_completion(enrollment.id).completed
+        assert enrollment_service.get_enrollment(enrollment.id).completed
+        assert enrollment_service.get_user_enrollments(user.id)[0].enrolled_date == enrollment.enrolled_date
+        assert [e.id for e in enrollment_service.get_course_enrollments(course.id)] == [enrollment.id]
+
+        assert [(r.total, r.completed) for r in enrollment_service.course_reports(since=datetime(2000, 1, 1))] == [(1, 1)]
+
+        users, cursor = user_service.list_users(1)
+        assert [u.id for u in users] == [user.id] and cursor is None
+        assert user_service.delete_user(user.id)
+        assert user_service.get_user(user.id) is None
+        assert len(user_service.users) == 0
+
+    def test_course_delete_cascades(self, services):
+        from schemas.models import UserCreate, CourseCreate, EnrollmentCreate
+        user_service, course_service, enrollment_service = services
+        course = course_service.create_course(CourseCreate(title="Cascade", description="Cascade"))
+        users = user_service.create_users([UserCreate(name=f"C{i}", email=f"cascade{i}@example.com") for i in range(700)])
+        enrollment_service.enroll_users([EnrollmentCreate(user_id=user.id, course_id=course.id) for user in users])
+
+        assert course_service.delete_course(course.id)
+        assert enrollment_service.get_all_enrollments() == []
+        assert enrollment_service.compactor.drain(timeout=10)
+        assert len(enrollment_service.enrollments) == 0
+        assert enrollment_service.compaction_status().rows_removed == 700
+
+    def test_sqlite_survives_restart(self, tmp_path):
+        from schemas.models import UserCreate
+        from services.business_logic import UserService
+        from services.storage import SQLiteBackend
+        path = str(tmp_path / "restart.db")
+        backend = SQLiteBackend(path, pool_size=1)
+        user = UserService(backend.users).create_user(UserCreate(name="Durable", email="durable@example.com"))
+        backend.close()
+
+        backend = SQLiteBackend(path, pool_size=1)
+        assert UserService(backend.users).get_user(user.id) == user
+        backend.close()
+
+    @pytest.mark.parametrize("kind", ["memory", "compact", "sqlite"])
+    def test_enrollment_stores_list_referenced_ids(self, tmp_path, kind):
+        from datetime import datetime
+        from schemas.models import Enrollment
+        from services.storage import MemoryBackend, SQLiteBackend
+        backend = SQLiteBackend(str(tmp_path / "ids.db"), pool_size=1) if kind == "sqlite" else MemoryBackend(kind == "compact")
+        users, courses = [str(uuid.uuid4()) for _ in range(2)], [str(uuid.uuid4()) for _ in range(3)]
+        enrollments = [
+            Enrollment(id=str(uuid.uuid4()), user_id=users[i % 2], course_id=courses[i], enrolled_date=datetime(2024, 1, 1))
+            for i in range(3)
+        ]
+        backend.enrollments.put_many(enrollments)
+        backend.enrollments.delete(enrollments[1].id)
+        assert backend.enrollments.user_ids() == [users[0]]
+        assert sorted(backend.enrollments.course_ids()) == sorted([courses[0], courses[2]])
+        backend.close()
+
+class TestCourseRoster:
+    def test_roster_reflects_enroll_deactivate_and_delete(self):
+        course_id = client.post("/courses/", json={"title": "Roster", "description": "Roster"}).json()["id"]
+        user_ids = [
+            client.post("/users/", json={"name": f"Roster {i}", "email": f"roster{i}@example.com"}).json()["id"]
+            for i in range(3)
+        ]
+        client.post("/enrollments/", json={"user_id": user_ids[0], "course_id": course_id})
+        assert [u["id"] for u in client.get(f"/courses/{course_id}/users").json()] == user_ids[:1]
+
+        for user_id in user_ids[1:]:
+            client.post("/enrollments/", json={"user_id": user_id, "course_id": course_id})
+        assert [u["id"] for u in client.get(f"/courses/{course_id}/users").json()] == user_ids
+
+        client.patch(f"/users/{user_ids[0]}/deactivate")
+        assert client.get(f"/courses/{course_id}/users").json()[0]["is_active"] == False
+
+        client.delete(f"/users/{user_ids[1]}")
+        assert [u["id"] for u in client.get(f"/courses/{course_id}/users").json()] == [user_ids[0], user_ids[2]]
+
+    def test_roster_pagination(self):
+        course_id = client.post("/courses/", json={"title": "Paged Roster", "description": "Roster"}).json()["id"]
+        for i in range(3):
+            user_id = client.post("/users/", json={"name": f"Paged {i}", "email": f"paged{i}@example.com"}).json()["id"]
+            client.post("/enrollments/", json={"user_id": user_id, "course_id": course_id})
+
+        first = client.get(f"/courses/{course_id}/users", params={"limit": 2})
+        assert len(first.json()) == 2
+        second = client.get(f"/courses/{course_id}/users", params={"limit": 2, "cursor": first.headers["X-Next-Cursor"]})
+        assert [u["name"] for u in second.json()] == ["Paged 2"]
+        assert "X-Next-Cursor" not in second.headers
+
+    def test_unknown_course_roster(self):
+        assert client.get("/courses/missing/users").status_code == 404
+
+class TestConditionalGet:
+    def test_list_etag_changes_on_mutation(self):
+        first = client.get("/courses/")
+        etag = first.headers["ETag"]
+        assert client.get("/courses/", headers={"If-None-Match": etag}).status_code == 304
+
+        client.post("/courses/", json={"title": "ETag Course", "description": "Versioned"})
+        second = client.get("/courses/", headers={"If-None-Match": etag})
+        assert second.status_code == 200
+        assert second.headers["ETag"] != etag
+
+    def test_entity_and_user_enrollments_etag(self):
+        user_id = client.post("/users/", json={"name": "ETag User", "email": "etag@example.com"}).json()["id"]
+        course_id = client.post("/courses/", json={"title": "ETag", "description": "ETag"}).json()["id"]
+
+        user_etag = client.get(f"/users/{user_id}").headers["ETag"]
+        assert client.get(f"/users/{user_id}", headers={"If-None-Match": user_etag}).status_code == 304
+        client.put(f"/users/{user_id}", json={"name": "Renamed"})
+        assert client.get(f"/users/{user_id}", headers={"If-None-Match": user_etag}).status_code == 200
+
+        enrollments_etag = client.get(f"/enrollments/user/{user_id}").headers["ETag"]
+        client.post("/courses/", json={"title": "Unrelated", "description": "Other course"})
+        assert client.get(f"/enrollments/user/{user_id}", headers={"If-None-Match": enrollments_etag}).status_code == 304
+        client.post("/enrollments/", json={"user_id": user_id, "course_id": course_id})
+        response = client.get(f"/enrollments/user/{user_id}", headers={"If-None-Match": enrollments_etag})
+        assert response.status_code == 200
+        assert len(response.json()) == 1
+
+    def test_roster_etag_follows_user_changes(self):
+        user_id = client.post("/users/", json={"name": "Roster ETag", "email": "rosteretag@example.com"}).json()["id"]
+        course_id = client.post("/courses/", json={"title": "Roster ETag", "description": "ETag"}).json()["id"]
+        client.post("/enrollments/", json={"user_id": user_id, "course_id": course_id})
+
+        etag = client.get(f"/courses/{course_id}/users").headers["ETag"]
+        client.patch(f"/users/{user_id}/deactivate")
+        response = client.get(f"/courses/{course_id}/users", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()[0]["is_active"] == False
+
+class TestCompactEnrollments:
+    def test_round_trip_and_compaction(self):
+        import uuid
+        from datetime import datetime, timezone
+        from schemas.models import Enrollment
+        from services.columnar import CompactEnrollmentCollection
+        store = CompactEnrollmentCollection()
+        enrollments = [
+            Enrollment(id=str(uuid.uuid4()), user_id=f"user-{i % 7}", course_id=f"course-{i % 5}",
+                       enrolled_date=datetime(2025, 1, 1, 12, 0, 0, i), completed=i % 2 == 0)
+            for i in range(3000)
+        ]
+        store.put_many(enrollments)
+        assert store.get(enrollments[10].id) == enrollments[10]
+        assert store.get("not-a-uuid") is None
+
+        aware = enrollments[0].model_copy(update={"enrolled_date": datetime(2025, 1, 1, tzinfo=timezone.utc)})
+        store.put(aware)
+        assert store.get(aware.id).enrolled_date == aware.enrolled_date
+
+        for enrollment in enrollments[1:2500]:
+            assert store.delete(enrollment.id) == enrollment
+        assert len(store) == 501
+        remaining = [aware] + enrollments[2500:]
+        assert store.values() == remaining
+        assert [e for _, e in store.scan(0, 10)] == remaining[:10]
+        assert store.by_user("user-3") == [e for e in remaining if e.user_id == "user-3"]
+        assert store.by_pair(remaining[-1].user_id, remaining[-1].course_id) is not None
+
+    def test_enrollment_versions_stay_bounded(self, monkeypatch):
+        from schemas.models import UserCreate, CourseCreate, EnrollmentCreate
+        from services.business_logic import UserService, CourseService, EnrollmentService
+        from services.columnar import CompactEnrollmentCollection
+        monkeypatch.setattr(EnrollmentService, "ENTITY_VERSIONS", 8)
+        users, courses = UserService(), CourseService()
+        enrollments = EnrollmentService(users, courses, CompactEnrollmentCollection())
+        created = users.create_users([UserCreate(name=f"V{i}", email=f"v{i}@example.com") for i in range(20)])
+        course = courses.create_course(CourseCreate(title="Versions", description="Versions"))
+        first, *rest = enrollments.enroll_users([EnrollmentCreate(user_id=user.id, course_id=course.id) for user in created])
+        assert len(enrollments.versions._entities) == 8
+        before = enrollments.version(first.id)
+        assert before == enrollments.version()
+        enrollments.mark_completion(first.id)
+        assert enrollments.version(first.id) > before
+        assert enrollments.version(rest[-1].id) < enrollments.version()
+
+
+class TestConcurrency:
+    def test_concurrent_enrolls_create_one_enrollment(self):
+        import threading
+        from schemas.models import UserCreate, CourseCreate, EnrollmentCreate
+        from services.business_logic import UserService, CourseService, EnrollmentService
+        user_service = UserService()
+        course_service = CourseService()
+        enrollment_service = EnrollmentService(user_service, course_service)
+        user = user_service.create_user(UserCreate(name="Racer", email="racer@example.com"))
+        course = course_service.create_course(CourseCreate(title="Race", description="Race"))
+
+        barrier = threading.Barrier(32)
+        results = []
+
+        def enroll():
+            barrier.wait()
+            results.append(enrollment_service.enroll_user(EnrollmentCreate(user_id=user.id, course_id=course.id)))
+
+        threads = [threading.Thread(target=enroll) for _ in range(32)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len([r for r in results if r is not None]) == 1
+        assert len(enrollment_service.get_user_enrollments(user.id)) == 1
+
+    def test_striped_lock_is_reentrant_across_keys(self):
+        from services.concurrency import StripedLock
+        locks = StripedLock(4)
+        with locks.hold("a", "b", "c", "d", "e"):
+            with locks.hold("a"):
+                pass
+
+def store_env():
+    import os
+    import secrets
+    authkey = secrets.token_hex(16)
+    return {**os.environ, "EDUTRACK_STORE_AUTHKEY": authkey}, authkey.encode()
+
+class TestSharedStore:
+    def test_workers_share_one_store(self, tmp_path):
+        import os
+        import stat
+        import subprocess
+        import sys
+        import time
+        from schemas.models import UserCreate, CourseCreate, EnrollmentCreate
+        from services.shared import connect_services
+        address = str(tmp_path / "private" / "store.sock")
+        env, authkey = store_env()
+        server = subprocess.Popen([sys.executable, "-m", "services.shared", "--address", address], env=env)
+        try:
+            for _ in range(100):
+                try:
+                    worker_a = connect_services(address, authkey)
+                    break
+                except (FileNotFoundError, ConnectionRefusedError):
+                    time.sleep(0.05)
+            worker_b = connect_services(address, authkey)
+            assert stat.S_IMODE(os.stat(address).st_mode) == 0o600
+            assert stat.S_IMODE(os.stat(os.path.dirname(address)).st_mode) == 0o700
+
+            user = worker_a[0].create_user(UserCreate(name="Shared", email="shared@example.com"))
+            course = worker_a[1].create_course(CourseCreate(title="Shared", description="Shared"))
+            assert worker_b[0].get_user(user.id) == user
+
+            version = worker_b[2].version(f"course:{course.id}")
+            assert worker_b[2].enroll_user(EnrollmentCreate(user_id=user.id, course_id=course.id)) is not None
+            assert worker_a[2].enroll_user(EnrollmentCreate(user_id=user.id, course_id=course.id)) is None
+            assert worker_a[2].version(f"course:{course.id}") > version
+            assert [u.id for u in worker_a[2].get_course_users(course.id)] == [user.id]
+        finally:
+            server.terminate()
+            server.wait()
+
+
+    def test_store_requires_a_secret_and_a_socket_path(self, tmp_path):
+        import os
+        import subprocess
+        import sys
+        from services.shared import check_authkey, connect_services, prepare_address
+        env = {key: value for key, value in os.environ.items() if key != "EDUTRACK_STORE_AUTHKEY"}
+        started = subprocess.run(
+            [sys.executable, "-m", "services.shared", "--address", str(tmp_path / "store.sock")], env=env, capture_output=True, text=True
+        )
+        assert started.returncode != 0 and "EDUTRACK_STORE_AUTHKEY" in started.stderr
+        with pytest.raises(ValueError):
+            check_authkey(b"edutrack")
+        with pytest.raises(ValueError):
+            connect_services(str(tmp_path / "store.sock"), None)
+
+        victim = tmp_path / "important.db"
+        victim.write_text("keep me")
+        with pytest.raises(ValueError):
+            prepare_address(str(victim))
+        assert victim.read_text() == "keep me"
+
+class TestSharding:
+    def shards(self, count=3):
+        from services.business_logic import UserService, CourseService, EnrollmentService
+        from services.sharding import ShardIds, ShardRouter, ShardedUserService, ShardedCourseService, ShardedEnrollmentService
+        nodes = []
+        for shard in range(count):
+            ids = ShardIds(shard, count)
+            user_service, course_service = UserService(ids=ids), CourseService(ids=ids)
+            nodes.append((user_service, course_service, EnrollmentService(user_service, course_service)))
+        router = ShardRouter(nodes)
+        return nodes, (ShardedUserService(router), ShardedCourseService(router), ShardedEnrollmentService(router))
+
+    def test_routes_users_and_enrollments_to_their_shard(self):
+        from schemas.models import UserCreate, CourseCreate, EnrollmentCreate
+        from services.sharding import shard_of
+        nodes, (users, courses, enrollments) = self.shards()
+        created = users.create_users([UserCreate(name=f"Shard {i}", email=f"shard-{i}@example.com") for i in range(30)])
+        course = courses.create_course(CourseCreate(title="Everywhere", description="Replicated"))
+        assert all(node[1].get_course(course.id) == course for node in nodes)
+
+        enrolled = enrollments.enroll_users([EnrollmentCreate(user_id=user.id, course_id=course.id) for user in created])
+        for user, enrollment in zip(created, enrolled):
+            node = nodes[shard_of(user.id, 3)]
+            assert node[0].get_user(user.id) == user
+            assert node[2].get_enrollment(enrollment.id) == enrollment
+            assert shard_of(enrollment.id, 3) == shard_of(user.id, 3)
+        assert sum(len(node[0].users) for node in nodes) == 30 and all(len(node[0].users) for node in nodes)
+
+        assert sorted(user.id for user in enrollments.get_course_users(course.id)) == sorted(user.id for user in created)
+        enrollments.mark_completion(enrolled[0].id)
+        assert enrollments.course_report(course.id).model_dump() == {"course_id": course.id, "total": 30, "completed": 1, "completion_rate": 1 / 30}
+
+        seen, cursor = [], None
+        while True:
+            page, cursor = users.list_users(7, cursor)
+            seen.extend(user.id for user in page)
+            if cursor is None:
+                break
+        assert sorted(seen) == sorted(user.id for user in created)
+
+        assert courses.close_enrollment(course.id).is_open is False
+        assert all(not node[1].get_course(course.id).is_open for node in nodes)
+        assert courses.delete_course(course.id)
+        assert enrollments.get_course_enrollments(course.id) == []
+
+    def test_course_reads_spread_over_replicas(self):
+        from schemas.models import CourseCreate
+        from services.sharding import replica_of
+        nodes, (_, courses, _) = self.shards()
+        created = courses.create_courses([CourseCreate(title=f"Spread {i}", description="Spread") for i in range(30)])
+        served = []
+        for shard, node in enumerate(nodes):
+            node[1].get_course = lambda course_id, shard=shard, read=node[1].get_course: served.append(shard) or read(course_id)
+        for course in created:
+            assert courses.get_course(course.id) == course
+        assert served == [replica_of(course.id, 3) for course in created] and set(served) == {0, 1, 2}
+        assert courses.get_many([course.id for course in created]) == created
+
+    def test_sharded_search_ranks_across_shards(self):
+        from schemas.models import UserCreate
+        _, (users, _, _) = self.shards()
+        weak = users.create_users([UserCreate(name=f"Weak {i}", email=f"ranked-{i}@example.com") for i in range(6)])
+        strong = users.create_users([UserCreate(name=f"Ranked {i}", email=f"strong-{i}@example.com") for i in range(6)])
+        first, cursor = users.search_users("ranked", 4)
+        rest, end = users.search_users("ranked", 20, cursor)
+        assert [user.id for user in first + rest[:2]] == sorted(user.id for user in strong)
+        assert [user.id for user in rest[2:]] == sorted(user.id for user in weak) and end is None
+
+    def test_email_stays_unique_across_shards(self):
+        from schemas.models import UserCreate, UserUpdate
+        from services.business_logic import DuplicateEmailError
+        from services.sharding import shard_of
+        _, (users, _, _) = self.shards()
+        user = users.create_user(UserCreate(name="Mover", email="mover@example.com"))
+        email = next(f"moved-{i}@example.com" for i in range(100) if shard_of(f"moved-{i}@example.com", 3) != shard_of(user.id, 3))
+        assert users.update_user(user.id, UserUpdate(email=email)).email == email
+        with pytest.raises(DuplicateEmailError):
+            users.create_user(UserCreate(name="Clash", email=email.upper()))
+        assert users.create_user(UserCreate(name="Reuse", email="mover@example.com")) is not None
+        assert users.delete_user(user.id)
+        assert users.create_user(UserCreate(name="Free", email=email)) is not None
+
+    def test_capacity_is_rejected_across_shards(self):
+        from schemas.models import CourseCreate, CourseUpdate
+        from services.business_logic import CapacityNotSupportedError
+        nodes, (_, courses, _) = self.shards()
+        with pytest.raises(CapacityNotSupportedError):
+            courses.create_course(CourseCreate(title="Capped", description="Capped", capacity=5))
+        with pytest.raises(CapacityNotSupportedError):
+            courses.create_courses([CourseCreate(title="Open", description="Open"), CourseCreate(title="Capped", description="Capped", capacity=5)])
+        assert all(len(node[1].courses) == 0 for node in nodes)
+        course = courses.create_course(CourseCreate(title="Open", description="Open"))
+        with pytest.raises(CapacityNotSupportedError):
+            courses.update_course(course.id, CourseUpdate(capacity=5))
+        assert courses.update_course(course.id, CourseUpdate(title="Renamed")).capacity is None
+
+    def test_shard_processes(self, tmp_path):
+        import subprocess
+        import sys
+        import time
+        from schemas.models import UserCreate, CourseCreate, EnrollmentCreate
+        from services.sharding import connect_shards
+        addresses = [str(tmp_path / f"shard-{i}.sock") for i in range(2)]
+        env, authkey = store_env()
+        servers = [
+            subprocess.Popen([sys.executable, "-m", "services.shared", "--address", address, "--shard", str(i), "--shards", "2"], env=env)
+            for i, address in enumerate(addresses)
+        ]
+        try:
+            for _ in range(100):
+                try:
+                    users, courses, enrollments = connect_shards(addresses, authkey)
+                    break
+                except (FileNotFoundError, ConnectionRefusedError):
+                    time.sleep(0.05)
+            created = users.create_users([UserCreate(name=f"Node {i}", email=f"node-{i}@example.com") for i in range(10)])
+            course = courses.create_course(CourseCreate(title="Nodes", description="Nodes"))
+            assert all(enrollments.enroll_users([EnrollmentCreate(user_id=user.id, course_id=course.id) for user in created]))
+            assert users.get_user(created[0].id) == created[0]
+            assert users.count() == 10 and enrollments.count() == 10
+            assert len(enrollments.get_course_users(course.id)) == 10
+        finally:
+            for server in servers:
+                server.terminate()
+                server.wait()
+
+
+class TestCapacity:
+    def test_waitlist_is_promoted_in_order(self):
+        course_id = client.post("/courses/", json={"title": "Capped", "description": "Two seats", "capacity": 2}).json()["id"]
+        user_ids = [
+            client.post("/users/", json={"name": f"Seat {i}", "email": f"seat-{uuid.uuid4()}@example.com"}).json()["id"] for i in range(4)
+        ]
+        responses = [client.post("/enrollments/", json={"user_id": user_id, "course_id": course_id}) for user_id in user_ids]
+        assert [response.status_code for response in responses] == [201, 201, 202, 202]
+        assert responses[3].json() == {"user_id": user_ids[3], "course_id": course_id, "position": 2}
+        assert client.post("/enrollments/", json={"user_id": user_ids[2], "course_id": course_id}).status_code == 400
+
+        assert client.delete(f"/enrollments/{responses[0].json()['id']}").status_code == 204
+        assert [e["course_id"] for e in client.get(f"/enrollments/user/{user_ids[2]}").json()] == [course_id]
+        assert client.get(f"/courses/{course_id}/waitlist").json() == [{"user_id": user_ids[3], "course_id": course_id, "position": 1}]
+
+        assert client.put(f"/courses/{course_id}", json={"capacity": 3}).json()["capacity"] == 3
+        assert client.get(f"/courses/{course_id}/waitlist").json() == []
+        assert len(client.get(f"/courses/{course_id}/users").json()) == 3
+        assert client.delete(f"/courses/{course_id}/waitlist/{user_ids[3]}").status_code == 404
+        assert client.post("/courses/", json={"title": "Bad", "description": "Bad", "capacity": 0}).status_code == 422
+
+    def test_batch_fills_seats_then_waitlists(self):
+        from schemas.models import UserCreate, CourseCreate, EnrollmentCreate, Enrollment, WaitlistEntry
+        from services.business_logic import UserService, CourseService, EnrollmentService
+        users, courses = UserService(), CourseService()
+        enrollments = EnrollmentService(users, courses)
+        created = users.create_users([UserCreate(name=f"B{i}", email=f"b{i}@example.com") for i in range(5)])
+        course = courses.create_course(CourseCreate(title="Batch", description="Batch", capacity=3))
+        results = enrollments.enroll_users([EnrollmentCreate(user_id=user.id, course_id=course.id) for user in created])
+        assert [type(result) for result in results] == [Enrollment] * 3 + [WaitlistEntry] * 2
+        assert [result.position for result in results[3:]] == [1, 2]
+        assert users.delete_user(created[0].id)
+        assert enrollments.compactor.drain(timeout=10)
+        assert [enrollment.user_id for enrollment in enrollments.get_course_enrollments(course.id)][-1] == created[3].id
+
+    def test_concurrent_rush_never_overbooks(self):
+        from concurrent.futures import ThreadPoolExecutor
+        from schemas.models import UserCreate, CourseCreate, EnrollmentCreate, Enrollment, WaitlistEntry
+        from services.business_logic import UserService, CourseService, EnrollmentService
+        users, courses = UserService(), CourseService()
+        enrollments = EnrollmentService(users, courses)
+        created = users.create_users([UserCreate(name=f"R{i}", email=f"r{i}@example.com") for i in range(400)])
+        hot = courses.create_course(CourseCreate(title="Hot", description="Hot", capacity=25))
+        cold = courses.create_course(CourseCreate(title="Cold", description="Cold"))
+        requests = [EnrollmentCreate(user_id=user.id, course_id=course.id) for user in created for course in (hot, cold)]
+        with ThreadPoolExecutor(32) as pool:
+            results = list(pool.map(enrollments.enroll_user, requests))
+        hot_results = results[0::2]
+        assert sum(isinstance(result, Enrollment) for result in hot_results) == 25
+        assert sorted(result.position for result in hot_results if isinstance(result, WaitlistEntry)) == list(range(1, 376))
+        assert all(isinstance(result, Enrollment) for result in results[1::2])
+        assert enrollments.course_report(hot.id).total == 25
+
+class TestSerialization:
+    def test_entity_responses_match_response_model(self):
+        user = client.post("/users/", json={"name": "Bytes", "email": "bytes@example.com"})
+        assert user.status_code == 201
+        assert user.headers["content-type"] == "application/json"
+        assert user.json() == client.get(f"/users/{user.json()['id']}").json()
+
+        updated = client.put(f"/users/{user.json()['id']}", json={"name": "Bytes 2"})
+        assert updated.json() == {**user.json(), "name": "Bytes 2"}
+
+    def test_batch_response_keeps_null_fields(self):
+        results = client.post("/users/batch", json=[{"name": "Batch", "email": "batchbytes@example.com"}]).json()
+        assert results == [{"index": 0, "status": 201, "id": results[0]["id"], "detail": None}]
+
+    def test_one_codec_for_responses_and_files(self):
+        from services import serialization
+        encoded = serialization.dumps({"a": [1, "é"]})
+        assert encoded == serialization.encode({"a": [1, "é"]}) == '{"a":[1,"é"]}'.encode()
+        assert serialization.decode(memoryview(encoded)) == {"a": [1, "é"]}
+
+
+class TestReports:
+    def test_counters_follow_enroll_complete_and_delete(self):
+        course_id = client.post("/courses/", json={"title": "Reports", "description": "Reports"}).json()["id"]
+        user_ids = [
+            client.post("/users/", json={"name": f"Report {i}", "email": f"report{i}@example.com"}).json()["id"]
+            for i in range(3)
+        ]
+        enrollment_ids = [
+            client.post("/enrollments/", json={"user_id": user_id, "course_id": course_id}).json()["id"]
+            for user_id in user_ids
+        ]
+        client.patch(f"/enrollments/{enrollment_ids[0]}/complete")
+        client.patch(f"/enrollments/{enrollment_ids[0]}/complete")
+
+        report = client.get(f"/reports/courses/{course_id}")
+        assert report.json() == {"course_id": course_id, "total": 3, "completed": 1, "completion_rate": 1 / 3}
+        assert client.get(f"/reports/courses/{course_id}", headers={"If-None-Match": report.headers["etag"]}).status_code == 304
+        assert course_id in [r["course_id"] for r in client.get("/reports/courses").json()]
+
+        daily = client.get("/reports/daily", params={"course_id": course_id}).json()
+        assert [(d["total"], d["completed"]) for d in daily] == [(3, 1)]
+
+        client.delete(f"/users/{user_ids[0]}")
+        client.delete(f"/courses/{course_id}")
+        assert client.get(f"/reports/courses/{course_id}").status_code == 404
+        assert client.get("/reports/courses/missing").status_code == 404
+
+    def test_date_range_reports_use_column_snapshots(self):
+        course_id = client.post("/courses/", json={"title": "Ranged", "description": "Ranged"}).json()["id"]
+        user_id = client.post("/users/", json={"name": "Ranged", "email": "ranged@example.com"}).json()["id"]
+        client.post("/enrollments/", json={"user_id": user_id, "course_id": course_id})
+
+        ranged = client.get("/reports/courses", params={"since": "2000-01-01T00:00:00"}).json()
+        assert {"course_id": course_id, "total": 1, "completed": 0, "completion_rate": 0.0} in ranged
+        assert client.get("/reports/courses", params={"since": "2999-01-01T00:00:00"}).json() == []
+        assert client.get("/reports/courses", params={"since": "2001-01-01", "until": "2000-01-01"}).status_code == 400
+
+    @pytest.mark.parametrize("vectorized", [True, False])
+    def test_compact_columns_match_counters(self, vectorized, monkeypatch):
+        import uuid
+        from datetime import datetime
+        from schemas.models import Enrollment
+        from services import analytics
+        from services.columnar import CompactEnrollmentCollection
+        if not vectorized:
+            monkeypatch.setattr(analytics, "numpy", None)
+        elif analytics.numpy is None:
+            pytest.skip("NumPy is not installed")
+        store = CompactEnrollmentCollection()
+        enrollments = [
+            Enrollment(id=str(uuid.uuid4()), user_id=f"user-{i}", course_id=f"course-{i % 3}",
+                       enrolled_date=datetime(2025, 1, 1 + i % 10), completed=i % 4 == 0)
+            for i in range(100)
+        ]
+        store.put_many(enrollments)
+        store.delete(enrollments[0].id)
+        stats = analytics.EnrollmentStats()
+        stats.rebuild(store.values())
+
+        for columns in (store.snapshot_columns(), analytics.EnrollmentColumns.from_enrollments(store.values())):
+            assert analytics.completion_by_course(columns) == stats.courses()
+            assert analytics.completion_by_course(columns, datetime(2025, 1, 5), datetime(2025, 1, 6)) == {
+                "course-0": (3, 2), "course-1": (4, 2), "course-2": (3, 1)
+            }
+        assert sum(total for _, total, _ in stats.daily()) == 99
+
+    def test_counters_are_rebuilt_from_an_existing_store(self, tmp_path):
+        from schemas.models import UserCreate, CourseCreate, EnrollmentCreate
+        from services.business_logic import UserService, CourseService, EnrollmentService
+        from services.storage import SQLiteBackend
+        path = str(tmp_path / "reports.db")
+        backend = SQLiteBackend(path, pool_size=1)
+        users, courses = UserService(backend.users), CourseService(backend.courses)
+        user = users.create_user(UserCreate(name="Durable", email="durable-report@example.com"))
+        course = courses.create_course(CourseCreate(title="Durable", description="Durable"))
+        EnrollmentService(users, courses, backend.enrollments).enroll_user(EnrollmentCreate(user_id=user.id, course_id=course.id))
+        backend.close()
+
+        backend = SQLiteBackend(path, pool_size=1)
+        enrollments = EnrollmentService(UserService(backend.users), CourseService(backend.courses), backend.enrollments)
+        assert enrollments.course_report(course.id).total == 1
+        backend.close()
+
+
+class TestSearch:
+    def test_users_ranked_paginated_and_kept_in_sync(self):
+        by_name = client.post("/users/", json={"name": "Zephyrine Quill", "email": "zq@example.com"}).json()
+        by_email = client.post("/users/", json={"name": "Other", "email": "zephyrine@example.com"}).json()
+        client.post("/users/", json={"name": "Zephyrinus", "email": "zephyrinus@example.com"})
+
+        results = client.get("/users/search", params={"q": "zephyrine"}).json()
+        assert [u["id"] for u in results] == [by_name["id"], by_email["id"]]
+
+        first = client.get("/users/search", params={"q": "zephyr", "limit": 2})
+        assert len(first.json()) == 2
+        rest = client.get("/users/search", params={"q": "zephyr", "cursor": first.headers["x-next-cursor"]})
+        assert len(rest.json()) == 1 and "x-next-cursor" not in rest.headers
+        assert client.get("/users/search", params={"q": "zephyrine quill"}).json() == [by_name]
+
+        client.put(f"/users/{by_name['id']}", json={"name": "Renamed"})
+        assert [u["id"] for u in client.get("/users/search", params={"q": "quill"}).json()] == []
+        client.delete(f"/users/{by_email['id']}")
+        assert [u["id"] for u in client.get("/users/search", params={"q": "zephyrine"}).json()] == []
+        assert client.get("/users/search", params={"q": ""}).status_code == 422
+
+    def test_courses_search_title_before_description(self):
+        described = client.post("/courses/", json={"title": "Intro", "description": "Quantumly entangled"}).json()
+        titled = client.post("/courses/", json={"title": "Quantumly Computing", "description": "Qubits"}).json()
+        assert [c["id"] for c in client.get("/courses/search", params={"q": "quantum"}).json()] == [titled["id"], described["id"]]
+        client.delete(f"/courses/{titled['id']}")
+        assert [c["id"] for c in client.get("/courses/search", params={"q": "quantum"}).json()] == [described["id"]]
+
+    def test_emails_are_unique(self):
+        user = client.post("/users/", json={"name": "Unique", "email": "unique@example.com"}).json()
+        assert client.post("/users/", json={"name": "Copy", "email": " Unique@Example.com"}).status_code == 409
+
+        other = client.post("/users/", json={"name": "Other", "email": "unique-other@example.com"}).json()
+        assert client.put(f"/users/{other['id']}", json={"email": "UNIQUE@example.com"}).status_code == 409
+        assert client.put(f"/users/{user['id']}", json={"email": "unique@example.com"}).status_code == 200
+
+        results = client.post("/users/batch", json=[
+            {"name": "A", "email": "unique@example.com"},
+            {"name": "B", "email": "unique-batch@example.com"},
+            {"name": "C", "email": "unique-batch@example.com"},
+        ]).json()
+        assert [r["status"] for r in results] == [409, 201, 409]
+
+        client.put(f"/users/{user['id']}", json={"email": "unique-moved@example.com"})
+        assert client.post("/users/", json={"name": "Reuse", "email": "unique@example.com"}).status_code == 201
+
+    def test_sorted_keys_prefix_scan_across_blocks(self):
+        from services.search import SortedKeys
+        keys = SortedKeys()
+        words = [f"w{i:05d}" for i in range(5000)]
+        for word in reversed(words):
+            keys.add(word)
+        assert list(keys.prefixed("w012")) == words[1200:1300]
+        for word in words[::2]:
+            keys.discard(word)
+        assert list(keys.prefixed("w0")) == words[1::2]
+        assert list(keys.prefixed("x")) == []
+
+
+class TestCascadingDeletes:
+    def enroll(self, count, title):
+        course_id = client.post("/courses/", json={"title": title, "description": title}).json()["id"]
+        results = client.post("/users/batch", json=[
+            {"name": f"{title} {i}", "email": f"{title.lower()}-{uuid.uuid4().hex}@example.com"} for i in range(count)
+        ]).json()
+        user_ids = [result["id"] for result in results]
+        client.post("/enrollments/batch", json=[{"user_id": user_id, "course_id": course_id} for user_id in user_ids])
+        return course_id, user_ids
+
+    def drain(self):
+        from services.dependencies import get_services
+        assert get_services()[2].compactor.drain(timeout=10)
+
+    def test_deleting_a_course_hides_then_purges_its_enrollments(self):
+        from services.dependencies import get_services
+        course_id, user_ids = self.enroll(1200, "Cascade")
+        self.drain()
+        before = client.get(f"/enrollments/user/{user_ids[0]}")
+        assert len(before.json()) == 1
+        status_before = client.get("/maintenance/compaction").json()
+
+        assert client.delete(f"/courses/{course_id}").status_code == 204
+        after = client.get(f"/enrollments/user/{user_ids[0]}", headers={"If-None-Match": before.headers["etag"]})
+        assert after.status_code == 200 and after.json() == []
+        assert course_id not in {e["course_id"] for e in client.get("/enrollments/").json()}
+        assert course_id not in {e["course_id"] for e in client.get("/enrollments/", params={"limit": 1000}).json()}
+
+        self.drain()
+        status = client.get("/maintenance/compaction").json()
+        assert status["rows_removed"] - status_before["rows_removed"] == 1200
+        assert status["batches"] - status_before["batches"] == 3
+        assert status["jobs"][-1] == {
+            "kind": "course", "entity_id": course_id, "state": "done", "attempt": 1, "total": 1200, "removed": 1200, "error": None
+        }
+        assert get_services()[2].enrollments.by_course(course_id) == []
+        assert get_services()[2].course_report(course_id).total == 0
+
+    def test_deleting_a_user_purges_enrollments_and_roster_entries(self):
+        course_id, user_ids = self.enroll(3, "Leaver")
+        enrollment_id = client.get(f"/enrollments/user/{user_ids[0]}").json()[0]["id"]
+        client.delete(f"/users/{user_ids[0]}")
+        assert client.get(f"/enrollments/{enrollment_id}").status_code == 404
+        assert client.patch(f"/enrollments/{enrollment_id}/complete").status_code == 404
+        assert [u["id"] for u in client.get(f"/courses/{course_id}/users").json()] == user_ids[1:]
+
+        self.drain()
+        from services.dependencies import get_services
+        assert get_services()[2].enrollments.get(enrollment_id) is None
+        assert client.get("/maintenance/compaction").json()["tombstones"] == 0
+
+
+class TestMetrics:
+    def test_metrics_report_routes_phases_and_store_sizes(self):
+        user_id = client.post("/users/", json={"name": "Metered", "email": f"metered-{uuid.uuid4().hex}@example.com"}).json()["id"]
+        client.get(f"/users/{user_id}")
+        client.get("/users/missing-user")
+        client.get("/no-such-path")
+
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        body = response.text
+        assert 'edutrack_http_requests_total{method="GET",route="/users/{user_id}",status="200"}' in body
+        assert 'edutrack_http_requests_total{method="GET",route="/users/{user_id}",status="404"}' in body
+        assert 'edutrack_http_requests_total{method="GET",route="unmatched",status="404"}' in body
+        assert 'edutrack_http_request_duration_seconds_bucket{method="POST",route="/users/",le="+Inf"}' in body
+        for phase in ("other", "validation", "service", "serialization"):
+            assert f'edutrack_http_request_phase_seconds_total{{route="/users/{{user_id}}",phase="{phase}"}}' in body
+        assert "edutrack_threadpool_queue_depth 0" in body
+        users = next(line for line in body.splitlines() if line.startswith('edutrack_store_rows{service="users"}'))
+        assert int(users.split()[-1]) >= 1
+
+    def test_validation_is_timed_as_its_own_phase(self):
+        import time
+        from fastapi import FastAPI, APIRouter
+        from pydantic import BaseModel
+        from routes.timing import TimedRoute
+        from services.metrics import begin_request, current_timings, end_request
+
+        class Payload(BaseModel):
+            name: str
+
+        router, seen = APIRouter(route_class=TimedRoute), []
+
+        @router.post("/timed")
+        async def timed_route(payload: Payload):
+            seen.append(dict(current_timings().phases))
+            return {"name": payload.name}
+
+        timed_app = FastAPI()
+        timed_app.include_router(router)
+
+        @timed_app.middleware("http")
+        async def track(request, call_next):
+            timings, token = begin_request()
+            try:
+                response = await call_next(request)
+            finally:
+                end_request(token)
+            seen.append(timings.breakdown(time.perf_counter() - timings.started))
+            return response
+
+        timed_client = TestClient(timed_app)
+        assert timed_client.post("/timed", json={"name": "ok"}).json() == {"name": "ok"}
+        assert seen[0]["validation"] > 0 and seen[1]["validation"] == seen[0]["validation"]
+        assert set(seen[1]) == {"other", "validation", "service", "serialization"}
+        assert timed_client.post("/timed", json={}).status_code == 422
+        assert seen[2]["validation"] > 0
+
+    def test_histogram_buckets_are_cumulative(self):
+        from services.metrics import Histogram
+        histogram = Histogram("latency", "Latency.", buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe((("route", "/"),), value)
+        assert histogram.render()[2:] == [
+            'latency_bucket{route="/",le="0.1"} 2',
+            'latency_bucket{route="/",le="1.0"} 3',
+            'latency_bucket{route="/",le="+Inf"} 4',
+            'latency_sum{route="/"} 2.65',
+            'latency_count{route="/"} 4',
+        ]
+
+    def test_profile_header_captures_a_flame_graph(self):
+        import time
+        from fastapi import FastAPI
+        from middleware.metrics import MetricsMiddleware
+        from middleware.profiling import ProfilingMiddleware
+        from services.metrics import RequestMetrics
+        from services.profiling import ProfileStore
+
+        def busy_work():
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                pass
+
+        profiled = FastAPI()
+
+        @profiled.get("/slow")
+        async def slow():
+            busy_work()
+        store = ProfileStore()
+        profiled_client = TestClient(MetricsMiddleware(ProfilingMiddleware(profiled, store, 0.001, token="secret"), RequestMetrics()))
+
+        assert "X-Profile-Id" not in profiled_client.get("/slow").headers
+        assert "X-Profile-Id" not in profiled_client.get("/slow", headers={"X-Profile": "wrong"}).headers
+        response = profiled_client.get("/slow", headers={"X-Profile": "secret"})
+        profile = store.get(response.headers["X-Profile-Id"])
+        assert profile.samples > 0
+        assert "busy_work" in profile.folded()
+        assert profile.svg().startswith("<svg") and "busy_work" in profile.svg()
+
+    def test_profiles_endpoint(self):
+        from services.profiling import Profile
+        profile = Profile("abc123", "GET", "/users/", 0.001)
+        profile.stacks = {"main (main.py:1);handler (routes.py:2)": 3}
+        app.state.profiles.add(profile)
+        assert client.get("/metrics/profiles/abc123").headers["content-type"] == "image/svg+xml"
+        assert client.get("/metrics/profiles/abc123", params={"format": "folded"}).text == "main (main.py:1);handler (routes.py:2) 3\n"
+        assert client.get("/metrics/profiles/missing").status_code == 404
+
+
+class TestEvents:
+    def last_seq(self):
+        from services.dependencies import get_event_log
+        return get_event_log().last_seq()
+
+    def sse_events(self, text):
+        events = []
+        for frame in text.strip().split("\n\n"):
+            fields = dict(line.split(": ", 1) for line in frame.splitlines())
+            events.append((fields.get("id"), fields.get("event"), json.loads(fields["data"])))
+        return events
+
+    def test_sse_replays_backlog_from_a_sequence_number(self):
+        after = self.last_seq()
+        user = client.post("/users/", json={"name": "Feed", "email": f"feed-{uuid.uuid4().hex}@example.com"}).json()
+        course = client.post("/courses/", json={"title": "Feed", "description": "Feed"}).json()
+        enrollment = client.post("/enrollments/", json={"user_id": user["id"], "course_id": course["id"]}).json()
+        client.patch(f"/enrollments/{enrollment['id']}/complete")
+
+        response = client.get("/events", params={"after": after, "follow": False})
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = self.sse_events(response.text)
+        assert [event for _, event, _ in events] == ["user.created", "course.created", "enrollment.created", "enrollment.completed"]
+        assert [int(seq) for seq, _, _ in events] == list(range(after + 1, after + 5))
+        assert events[2][2]["data"] == enrollment
+        assert events[0][2] == {"seq": after + 1, "type": "user.created", "data": user}
+
+        only_enrollments = self.sse_events(client.get("/events", params={"after": after, "follow": False, "types": "enrollment"}).text)
+        assert [event for _, event, _ in only_enrollments] == ["enrollment.created", "enrollment.completed"]
+        resumed = self.sse_events(client.get("/events", params={"follow": False}, headers={"Last-Event-ID": str(after + 3)}).text)
+        assert [event for _, event, _ in resumed] == ["enrollment.completed"]
+
+    def test_websocket_streams_new_events(self):
+        user = client.post("/users/", json={"name": "Socket", "email": f"socket-{uuid.uuid4().hex}@example.com"}).json()
+        course = client.post("/courses/", json={"title": "Socket", "description": "Socket"}).json()
+        with client.websocket_connect(f"/events/ws?after={self.last_seq()}&types=enrollment") as websocket:
+            enrollment = client.post("/enrollments/", json={"user_id": user["id"], "course_id": course["id"]}).json()
+            client.patch(f"/courses/{course['id']}/close-enrollment")
+            client.patch(f"/enrollments/{enrollment['id']}/complete")
+            created = websocket.receive_json()
+            assert created["type"] == "enrollment.created" and created["data"] == enrollment
+            assert websocket.receive_json()["type"] == "enrollment.completed"
+
+    def test_slow_consumer_gets_reset_after_ring_wraps(self):
+        import anyio
+        from schemas.models import Course
+        from services.async_services import AsyncEventFeed
+        from services.events import EventLog
+        from routes.events import EventQuery, sse_stream
+
+        log = EventLog(capacity=4)
+        for i in range(10):
+            log.publish("course.created", Course(id=str(i), title="Ring", description="Ring"))
+        assert log.read(0, 100)[0] == 7
+        assert [seq for seq, _, _ in log.read(0, 100)[1]] == [7, 8, 9, 10]
+
+        async def collect():
+            return [chunk async for chunk in sse_stream(AsyncEventFeed(log, False), EventQuery(2, None, False), 2)]
+
+        chunks = anyio.run(collect)
+        assert chunks[0].startswith(b'event: reset\ndata: {"missed_from":3,"resume_at":7}\n\n')
+        assert b"id: 7\n" in chunks[0] and b"id: 10\n" in chunks[0]
+
+    def test_many_subscribers_wake_on_one_publish(self):
+        import anyio
+        from schemas.models import Course
+        from services.async_services import AsyncEventFeed
+        from services.events import EventLog
+        from routes.events import EventQuery, event_batches
+
+        log = EventLog()
+        feed = AsyncEventFeed(log, False)
+        received = []
+
+        async def subscriber():
+            async for _, events in event_batches(feed, EventQuery(0, None, True), 0):
+                received.append(events[0][0])
+                return
+
+        async def run():
+            with anyio.fail_after(10):
+                async with anyio.create_task_group() as tasks:
+                    for _ in range(500):
+                        tasks.start_soon(subscriber)
+                    await anyio.sleep(0.05)
+                    await anyio.to_thread.run_sync(log.publish, "course.created", Course(id="c", title="Fan", description="Fan"))
+
+        anyio.run(run)
+        assert received == [1] * 500
+
+class TestAdmission:
+    def guarded_app(self, controller, client_header=None):
+        from fastapi import FastAPI
+        from middleware.admission import AdmissionMiddleware
+        guarded = FastAPI()
+        guarded.add_middleware(AdmissionMiddleware, controller=controller, client_header=client_header)
+        return guarded
+
+    def test_routes_are_classified_by_method_and_response_model(self):
+        from middleware.admission import AdmissionMiddleware
+        from services.admission import AdmissionController
+        middleware = AdmissionMiddleware(app, AdmissionController({}))
+
+        def classify(method, path):
+            return middleware.classify({"app": app, "method": method, "path": path})
+
+        assert classify("GET", "/users/abc") == "read"
+        assert classify("GET", "/users/") == "scan"
+        assert classify("GET", "/users/search") == "scan"
+        assert classify("GET", "/courses/abc/users") == "scan"
+        assert classify("POST", "/enrollments/") == "write"
+        assert classify("POST", "/users/lookup") == "read"
+        assert classify("POST", "/courses/lookup") == "read"
+        assert classify("PATCH", "/enrollments/abc/complete") == "write"
+        assert classify("GET", "/export") == "scan"
+        assert classify("POST", "/import") == "write"
+        assert classify("GET", "/metrics") is None
+        assert classify("GET", "/events") is None
+
+    def test_rate_limit_ignores_unverified_key_headers(self):
+        from services.admission import AdmissionController, RateLimiter
+        guarded = self.guarded_app(AdmissionController({}, RateLimiter(rate=0.5, burst=2)))
+
+        @guarded.get("/ping")
+        async def ping():
+            return {}
+        guarded_client = TestClient(guarded)
+
+        statuses = [guarded_client.get("/ping", headers={"X-API-Key": str(i)}).status_code for i in range(3)]
+        assert statuses == [200, 200, 429]
+
+    def test_rate_limit_returns_429_per_client(self):
+        from services.admission import AdmissionController, RateLimiter
+        guarded = self.guarded_app(AdmissionController({}, RateLimiter(rate=0.5, burst=2)), client_header="X-API-Key")
+
+        @guarded.get("/ping")
+        async def ping():
+            return {}
+        guarded_client = TestClient(guarded)
+
+        statuses = [guarded_client.get("/ping", headers={"X-API-Key": "a"}).status_code for _ in range(3)]
+        assert statuses == [200, 200, 429]
+        response = guarded_client.get("/ping", headers={"X-API-Key": "a"})
+        assert response.headers["Retry-After"] == "2"
+        assert guarded_client.get("/ping", headers={"X-API-Key": "b"}).status_code == 200
+
+    def test_rate_limiter_refills_over_time(self):
+        from services.admission import RateLimiter
+        limiter = RateLimiter(rate=10, burst=1)
+        assert limiter.take("a", now=0.0) == 0.0
+        assert limiter.take("a", now=0.05) == pytest.approx(0.05)
+        assert limiter.take("a", now=0.1) == 0.0
+
+    def test_scans_are_shed_once_their_queue_budget_is_spent(self):
+        import anyio
+        from services.admission import SCAN, AdmissionController, ClassLimiter
+        limiter = ClassLimiter(SCAN, limit=1, budget=0.05, initial_service_time=0.03)
+        controller = AdmissionController({SCAN: limiter})
+
+        async def run():
+            first, _ = await controller.admit(SCAN)
+            waiting = []
+
+            async def queue():
+                waiting.append(await controller.admit(SCAN))
+
+            async with anyio.create_task_group() as tasks:
+                tasks.start_soon(queue)
+                await anyio.sleep(0.01)
+                assert limiter.queued == 1
+                _, rejection = await controller.admit(SCAN)
+                assert rejection.status_code == 503 and rejection.retry_after == 1
+                first.release(0.03)
+            admitted, rejection = waiting[0]
+            assert admitted is limiter and rejection is None
+            assert limiter.active == 1 and limiter.queued == 0
+            admitted.release(0.03)
+            assert limiter.active == 0
+
+        anyio.run(run)
+        assert 'edutrack_admission_rejected_total{class="scan",reason="queue_budget"} 1' in controller.render()
+
+    def test_queued_request_times_out_with_503(self):
+        import asyncio
+        from services.admission import READ, AdmissionController, ClassLimiter
+        limiter = ClassLimiter(READ, limit=1, budget=0.02, initial_service_time=0.001)
+        guarded = self.guarded_app(AdmissionController({READ: limiter}))
+
+        @guarded.get("/slow")
+        async def slow():
+            await asyncio.sleep(0.2)
+            return {}
+
+        @guarded.get("/fast")
+        async def fast():
+            return {}
+
+        async def run():
+            import httpx
+            transport = httpx.ASGITransport(app=guarded)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                slow_request = asyncio.create_task(http.get("/slow"))
+                await asyncio.sleep(0.05)
+                shed = await http.get("/fast")
+                return (await slow_request).status_code, shed
+
+        slow_status, shed = asyncio.run(run())
+        assert slow_status == 200
+        assert shed.status_code == 503
+        assert shed.headers["Retry-After"] == "1"
+        assert limiter.active == 0 and limiter.queued == 0
+
+    def test_admission_metrics_are_exported(self):
+        client.get("/users/")
+        body = client.get("/metrics").text
+        assert 'edutrack_admission_limit{class="scan"}' in body
+        assert 'edutrack_admission_in_flight{class="read"} 0' in body
+
+class TestTransfer:
+    def test_import_users_reports_row_errors(self):
+        run = uuid.uuid4().hex
+        body = "\n".join([
+            json.dumps({"name": "Imported", "email": f"imported-{run}@example.com"}),
+            json.dumps({"name": "No email"}),
+            "{not json",
+            "",
+            json.dumps({"name": "Again", "email": f"IMPORTED-{run}@example.com"}),
+            json.dumps(["not", "an", "object"]),
+        ])
+        response = client.post("/import", params={"entity": "users"}, content=body.encode())
+        assert response.status_code == 200
+        summary = response.json()
+        assert (summary["rows"], summary["created"], summary["failed"]) == (5, 1, 4)
+        errors = {error["row"]: error["detail"] for error in summary["errors"]}
+        assert sorted(errors) == [2, 3, 4, 5]
+        assert errors[2] == "email: Field required"
+        assert errors[3].startswith("Invalid JSON")
+        assert errors[4] == "A user with this email already exists"
+        assert errors[5] == "Expected a JSON object"
+
+    def test_csv_import_resolves_enrollment_foreign_keys(self):
+        user = client.post("/users/", json={"name": "Csv", "email": f"csv-{uuid.uuid4().hex}@example.com"}).json()
+        course_body = 'title,description\r\n"Quoted, title","Line one\nline two"\r\nPlain,Course\r\n'
+        summary = client.post("/import", params={"entity": "courses", "format": "csv"}, content=course_body.encode()).json()
+        assert (summary["rows"], summary["created"], summary["failed"]) == (2, 2, 0)
+        courses = client.get("/courses/search", params={"q": "quoted"}).json()
+        assert any(course["description"] == "Line one\nline two" for course in courses)
+        course_id = courses[0]["id"]
+
+        enrollment_body = f"user_id,course_id\n{user['id']},{course_id}\nmissing-user,{course_id}\n{user['id']},{course_id}\n{user['id']}\n"
+        summary = client.post("/import", params={"entity": "enrollments", "format": "csv"}, content=enrollment_body.encode()).json()
+        assert (summary["rows"], summary["created"], summary["failed"]) == (4, 1, 3)
+        assert [error["row"] for error in summary["errors"]] == [2, 3, 4]
+        assert summary["errors"][2]["detail"] == "Expected 2 columns, got 1"
+        assert len(client.get(f"/enrollments/user/{user['id']}").json()) == 1
+
+    def test_reader_handles_records_split_across_chunks(self):
+        from services.transfer import CSV, NDJSON, RecordReader
+        body = '\ufeffname,email\n"Ada, ""the first""",ada@example.com\n"Multi\nline",m@example.com\n'.encode()
+        reader = RecordReader(CSV)
+        records = [record for byte in range(len(body)) for record in reader.feed(body[byte:byte + 1])] + reader.close()
+        assert [data for _, data, _ in records] == [
+            {"name": 'Ada, "the first"', "email": "ada@example.com"},
+            {"name": "Multi\nline", "email": "m@example.com"},
+        ]
+        reader = RecordReader(NDJSON)
+        records = reader.feed(b'{"a": 1}\n{"a"') + reader.feed(b': 2}') + reader.close()
+        assert [(row, data) for row, data, _ in records] == [(1, {"a": 1}), (2, {"a": 2})]
+
+    def test_reader_reports_over_long_records(self):
+        from services.transfer import CSV, NDJSON, RecordReader
+        reader = RecordReader(NDJSON, max_record_bytes=16)
+        chunks = [b'{"a": 1}\n{"a": "', b"x" * 20, b"x" * 20, b'"}\n{"a": 2}\n']
+        records = [record for chunk in chunks for record in reader.feed(chunk)] + reader.close()
+        assert records == [(1, {"a": 1}, None), (2, None, "Record is longer than 16 bytes"), (3, {"a": 2}, None)]
+        assert reader._buffer == b""
+
+        reader = RecordReader(CSV, max_record_bytes=16)
+        chunks = [b'name\nAda\n"never closed', b"\n" + b"x" * 20, b"\nGrace\n"]
+        records = [record for chunk in chunks for record in reader.feed(chunk)] + reader.close()
+        assert records == [(1, {"name": "Ada"}, None), (2, None, "Record is longer than 16 bytes"), (3, {"name": "Grace"}, None)]
+
+    def test_export_streams_every_record(self):
+        from services.dependencies import get_services
+        user_count = get_services()[0].count()
+        response = client.get("/export", params={"entity": "users"})
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = response.content.splitlines()
+        assert len(lines) == user_count
+        assert set(json.loads(lines[0])) == {"id", "name", "email", "is_active"}
+
+        response = client.get("/export", params={"entity": "enrollments", "format": "csv"})
+        assert response.headers["content-type"].startswith("text/csv")
+        assert response.headers["content-disposition"] == 'attachment; filename="enrollments.csv"'
+        rows = response.text.splitlines()
+        assert rows[0] == "id,user_id,course_id,enrolled_date,completed"
+        assert all(row.endswith((",true", ",false")) for row in rows[1:])
+
+    def test_export_then_import_round_trip(self):
+        client.post("/courses/", json={"title": "Round trip", "description": 'Has "quotes", commas\nand lines'})
+        exported = client.get("/export", params={"entity": "courses", "format": "csv"}).content
+        summary = client.post("/import", params={"entity": "courses", "format": "csv"}, content=exported).json()
+        assert summary["failed"] == 0 and summary["created"] == summary["rows"] > 0
+
+class TestDurability:
+    def open(self, directory, compact=False, **options):
+        from services.business_logic import UserService, CourseService, EnrollmentService
+        from services.durability import DurableBackend
+        from services.storage import MemoryBackend
+        backend = DurableBackend(MemoryBackend(compact), str(directory), commit_delay=0, **options)
+        user_service = UserService(backend.users)
+        course_service = CourseService(backend.courses)
+        enrollment_service = EnrollmentService(user_service, course_service, backend.enrollments, waitlist=backend.waitlist)
+        return backend, (user_service, course_service, enrollment_service)
+
+    def populate(self, services, prefix):
+        from schemas.models import UserCreate, CourseCreate, EnrollmentCreate
+        user_service, course_service, enrollment_service = services
+        users = user_service.create_users([UserCreate(name=f"{prefix} {i}", email=f"{prefix}-{i}@example.com") for i in range(20)])
+        course = course_service.create_course(CourseCreate(title=prefix, description=prefix))
+        enrollments = enrollment_service.enroll_users([EnrollmentCreate(user_id=user.id, course_id=course.id) for user in users])
+        enrollment_service.mark_completion(enrollments[0].id)
+        user_service.delete_user(users[-1].id)
+        return course
+
+    def state(self, services):
+        user_service, course_service, enrollment_service = services
+        return (
+            sorted(user.model_dump_json() for user in user_service.users.values()),
+            sorted(course.model_dump_json() for course in course_service.courses.values()),
+            sorted(enrollment.model_dump_json() for enrollment in enrollment_service.get_all_enrollments()),
+            [report.model_dump() for report in enrollment_service.course_reports()]
+        )
+
+    def test_journal_truncates_torn_tail(self, tmp_path):
+        from services.journal import Journal, read_records, segment_path
+        journal = Journal(str(tmp_path), 1, commit_delay=0)
+        for payload in (b"one", b"two"):
+            journal.wait_for(journal.append(payload))
+        journal.close()
+        path = segment_path(str(tmp_path), 1)
+        with open(path, "ab") as file:
+            file.write(b"\x10\x00\x00\x00torn")
+        assert read_records(path)[0] == [b"one", b"two"]
+
+    @pytest.mark.parametrize("compact", [False, True])
+    def test_recovers_snapshot_and_journal_tail(self, tmp_path, compact):
+        from schemas.models import UserCreate
+        from services.business_logic import DuplicateEmailError
+        from services.journal import list_segments, segment_path
+        backend, services = self.open(tmp_path, compact)
+        course = self.populate(services, "before")
+        backend.snapshot()
+        self.populate(services, "after")
+        services[1].delete_course(course.id)
+        services[2].compactor.drain(timeout=10)
+        expected = self.state(services)
+        backend.close()
+        with open(segment_path(str(tmp_path), list_segments(str(tmp_path))[-1]), "ab") as file:
+            file.write(b"\xff\x00\x00\x00partial")
+
+        backend, services = self.open(tmp_path, compact)
+        assert backend.progress.snapshot_segment == 2 and backend.progress.journal_records > 0
+        assert self.state(services) == expected
+        with pytest.raises(DuplicateEmailError):
+            services[0].create_user(UserCreate(name="Again", email="after-0@example.com"))
+        assert "after 0" in [user.name for user in services[0].search_users("after", 50)[0]]
+        backend.close()
+
+    def test_snapshot_drops_older_segments(self, tmp_path):
+        from services.journal import list_segments
+        from services.snapshot import list_snapshots
+        backend, services = self.open(tmp_path)
+        self.populate(services, "first")
+        backend.snapshot()
+        self.populate(services, "second")
+        backend.snapshot()
+        assert list_snapshots(str(tmp_path)) == [3] and list_segments(str(tmp_path)) == [3]
+        backend.close()
+
+    @pytest.mark.parametrize("snapshot", [False, True])
+    def test_waitlist_survives_restart(self, tmp_path, snapshot):
+        from schemas.models import UserCreate, CourseCreate, EnrollmentCreate
+        backend, (user_service, course_service, enrollment_service) = self.open(tmp_path)
+        users = user_service.create_users([UserCreate(name=f"Queue {i}", email=f"queue-{i}@example.com") for i in range(4)])
+        course = course_service.create_course(CourseCreate(title="Queue", description="Queue", capacity=1))
+        results = enrollment_service.enroll_users([EnrollmentCreate(user_id=user.id, course_id=course.id) for user in users])
+        assert enrollment_service.leave_waitlist(course.id, users[2].id)
+        if snapshot:
+            backend.snapshot()
+        backend.close()
+
+        backend, (_, _, enrollment_service) = self.open(tmp_path)
+        assert [(entry.user_id, entry.position) for entry in enrollment_service.get_waitlist(course.id)] == [(users[1].id, 1), (users[3].id, 2)]
+        assert enrollment_service.delete_enrollment(results[0].id)
+        assert [e.user_id for e in enrollment_service.get_course_enrollments(course.id)] == [users[1].id]
+        assert [entry.user_id for entry in enrollment_service.get_waitlist(course.id)] == [users[3].id]
+        backend.close()
+
+        backend, (_, _, enrollment_service) = self.open(tmp_path)
+        assert [entry.user_id for entry in enrollment_service.get_waitlist(course.id)] == [users[3].id]
+        backend.close()
+
+    @pytest.mark.parametrize("compact", [False, True])
+    def test_restart_purges_orphans_left_by_a_crash(self, tmp_path, compact):
+        from schemas.models import UserCreate, CourseCreate, EnrollmentCreate
+        backend, services = self.open(tmp_path, compact)
+        user_service, course_service, enrollment_service = services
+        users = user_service.create_users([UserCreate(name=f"Orphan {i}", email=f"orphan-{i}@example.com") for i in range(3)])
+        courses = course_service.create_courses([CourseCreate(title=f"Orphan {i}", description="Orphan") for i in range(2)])
+        enrollment_service.enroll_users([EnrollmentCreate(user_id=user.id, course_id=course.id) for user in users for course in courses])
+        backend.users.delete(users[0].id)
+        backend.courses.delete(courses[0].id)
+        backend.close()
+
+        backend, (user_service, course_service, enrollment_service) = self.open(tmp_path, compact)
+        assert enrollment_service.reap_orphans() == 2
+        assert enrollment_service.compactor.drain(timeout=10)
+        assert [(e.user_id, e.course_id) for e in enrollment_service.get_all_enrollments()] == [
+            (user.id, courses[1].id) for user in users[1:]
+        ]
+        assert len(enrollment_service.enrollments) == 2
+        assert enrollment_service.compaction_status().tombstones == 0
+        assert enrollment_service.reap_orphans() == 0
+        backend.close()
+
+    def test_failed_purge_jobs_are_retried(self):
+        from services.compaction import CompactionWorker, PurgeJob
+        failures = iter([RuntimeError("locked")])
+
+        def purge(keys):
+            for error in failures:
+                raise error
+            return len(keys)
+
+        finished = []
+        worker = CompactionWorker(lambda job: ["a", "b"], purge, finished.append, retry_delay=0.01)
+        worker.submit(PurgeJob("user", "u1"))
+        assert worker.drain(timeout=10)
+        assert [(job.state, job.attempt) for job in worker.jobs()] == [("failed", 1), ("done", 2)]
+        assert worker.jobs_failed == 1 and worker.rows_removed == 2 and len(finished) == 1
+
+    def test_snapshot_thread_survives_failures(self, tmp_path, monkeypatch):
+        import time
+        from services import durability
+        from services.snapshot import list_snapshots
+        backend, services = self.open(tmp_path, snapshot_bytes=1)
+        monkeypatch.setattr(backend, "CHECK_INTERVAL", 0.01)
+        write_snapshot = durability.write_snapshot
+        failures = iter([OSError("disk full")])
+
+        def flaky(*args):
+            for error in failures:
+                raise error
+            return write_snapshot(*args)
+
+        monkeypatch.setattr(durability, "write_snapshot", flaky)
+        backend.start()
+        self.populate(services, "flaky")
+        deadline = time.monotonic() + 10
+        while backend.snapshots == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert backend.snapshot_failures == 1 and backend.snapshots >= 1
+        assert backend.snapshot_error is None and list_snapshots(str(tmp_path))
+        backend.close()
+
+    def test_compact_columns_rebuild_counters(self):
+        from datetime import datetime
+        from schemas.models import Enrollment
+        from services import analytics
+        from services.columnar import CompactEnrollmentCollection
+        store = CompactEnrollmentCollection()
+        store.put_many([
+            Enrollment(id=str(uuid.uuid4()), user_id=f"user-{i}", course_id=f"course-{i % 3}",
+                       enrolled_date=datetime(2025, 1, 1 + i % 10), completed=i % 4 == 0)
+            for i in range(50)
+        ])
+        rebuilt, expected = analytics.EnrollmentStats(), analytics.EnrollmentStats()
+        rebuilt.rebuild_columns(store.snapshot_columns())
+        expected.rebuild(store.values())
+        assert rebuilt.courses() == expected.courses() and rebuilt.daily() == expected.daily()
+
+    def test_readiness_gates_requests_while_recovering(self, monkeypatch):
+        from services import dependencies
+        from services.durability import RecoveryProgress
+        assert client.get("/users/").status_code == 200
+        assert client.get("/ready").json()["ready"]
+        progress = RecoveryProgress()
+        progress.enter("journal")
+        monkeypatch.setattr(dependencies, "_recovery", progress)
+        monkeypatch.setattr(dependencies, "_recovery_thread", object())
+        response = client.get("/ready")
+        assert response.status_code == 503 and response.json()["phase"] == "journal"
+        response = client.get("/users/")
+        assert response.status_code == 503 and response.headers["retry-after"] == "1"
+        progress.finish()
+        assert client.get("/ready").status_code == 200
+        assert client.get("/users/").status_code == 200
+
+
+class TestRangeQueries:
+    @pytest.fixture(params=["memory", "compact", "sqlite"])
+    def enrollments(self, request, tmp_path):
+        from services.business_logic import UserService, CourseService, EnrollmentService
+        from services.storage import create_backend
+        backend = create_backend(
+            "memory" if request.param == "compact" else request.param,
+            sqlite_path=str(tmp_path / "edutrack.db"),
+            sqlite_pool_size=2,
+            compact_enrollments=request.param == "compact"
+        )
+        user_service = UserService(backend.users)
+        course_service = CourseService(backend.courses)
+        yield EnrollmentService(user_service, course_service, backend.enrollments)
+        backend.close()
+
+    def test_range_pages_in_date_order(self, enrollments):
+        import random
+        from datetime import datetime, timedelta
+        from schemas.models import Enrollment
+        start = datetime(2024, 1, 1)
+        dates = [start + timedelta(hours=random.randrange(200)) for _ in range(300)]
+        stored = [
+            Enrollment(id=str(uuid.uuid4()), user_id=f"u{i}", course_id="c", enrolled_date=date)
+            for i, date in enumerate(dates)
+        ]
+        enrollments.enrollments.put_many(stored)
+        for enrollment in stored[::5]:
+            enrollments.enrollments.delete(enrollment.id)
+        live = [enrollment for i, enrollment in enumerate(stored) if i % 5]
+
+        since, until = start + timedelta(hours=50), start + timedelta(hours=150)
+        seen, cursor = [], None
+        while True:
+            page, cursor = enrollments.list_enrollments_between(since, until, 17, cursor)
+            seen.extend(page)
+            if cursor is None:
+                break
+        expected = [enrollment for enrollment in live if since <= enrollment.enrolled_date < until]
+        assert [enrollment.enrolled_date for enrollment in seen] == sorted(enrollment.enrolled_date for enrollment in expected)
+        assert sorted(enrollment.id for enrollment in seen) == sorted(enrollment.id for enrollment in expected)
+        assert len(enrollments.list_enrollments_between(None, since, 1000)[0]) == sum(1 for e in live if e.enrolled_date < since)
+        assert enrollments.list_enrollments_between(until, None, 1000)[0][-1].enrolled_date == max(dates[i] for i in range(300) if i % 5)
+
+    def test_time_ordered_ids(self):
+        from services.business_logic import UserService, time_ordered_id
+        from schemas.models import UserCreate
+        ids = [time_ordered_id() for _ in range(5000)]
+        assert ids == sorted(ids) and len(set(ids)) == len(ids)
+        assert {uuid.UUID(value).version for value in ids} == {7}
+        users = UserService(ids=time_ordered_id)
+        created = users.create_users([UserCreate(name=f"T{i}", email=f"t{i}@example.com") for i in range(50)])
+        assert [user.id for user in created] == sorted(user.id for user in created)
+
+    def test_sharded_range_merges_shards(self):
+        from datetime import datetime, timedelta
+        from schemas.models import UserCreate, CourseCreate, EnrollmentCreate
+        _, (users, courses, enrollments) = TestSharding().shards()
+        created = users.create_users([UserCreate(name=f"Range {i}", email=f"range-{i}@example.com") for i in range(40)])
+        course = courses.create_course(CourseCreate(title="Ranged", description="Merged"))
+        started = datetime.now()
+        for user in created:
+            enrollments.enroll_user(EnrollmentCreate(user_id=user.id, course_id=course.id))
+        seen, cursor = [], None
+        while True:
+            page, cursor = enrollments.list_enrollments_between(started, None, 6, cursor)
+            seen.extend(page)
+            if cursor is None:
+                break
+        assert [enrollment.user_id for enrollment in seen] == [user.id for user in created]
+        assert enrollments.list_enrollments_between(started + timedelta(days=1), None, 10) == ([], None)
+
+    def test_enrollments_endpoint_filters_by_date(self):
+        from datetime import datetime, timedelta
+        course_id = client.post("/courses/", json={"title": "Dated", "description": "Range"}).json()["id"]
+        user_ids = [
+            client.post("/users/", json={"name": f"Dated {i}", "email": f"dated-{uuid.uuid4()}@example.com"}).json()["id"] for i in range(3)
+        ]
+        since = datetime.now().isoformat()
+        for user_id in user_ids:
+            client.post("/enrollments/", json={"user_id": user_id, "course_id": course_id})
+        first = client.get("/enrollments/", params={"since": since, "limit": 2})
+        assert [e["user_id"] for e in first.json()] == user_ids[:2]
+        rest = client.get("/enrollments/", params={"since": since, "cursor": first.headers["X-Next-Cursor"]})
+        assert [e["user_id"] for e in rest.json()] == user_ids[2:] and "X-Next-Cursor" not in rest.headers
+        assert client.get("/enrollments/", params={"until": since, "limit": 1000}).status_code == 200
+        later = (datetime.now() + timedelta(days=1)).isoformat()
+        assert client.get("/enrollments/", params={"since": later, "until": since}).status_code == 400
+        assert client.get("/enrollments/", params={"since": "yesterday"}).status_code == 422
+
+class TestTiering:
+    def services(self, directory, store=None):
+        from services.archive import EnrollmentArchive
+        from services.business_logic import UserService, CourseService, EnrollmentService
+        user_service, course_service = UserService(), CourseService()
+        archive = EnrollmentArchive(str(directory), segment_bytes=256)
+        return user_service, course_service, EnrollmentService(user_service, course_service, store, archive=archive)
+
+    def seed(self, user_service, course_service, enrollments):
+        from datetime import datetime, timedelta
+        from schemas.models import CourseCreate, Enrollment, UserCreate
+        users = user_service.create_users([UserCreate(name=f"Old {i}", email=f"old-{i}@example.com") for i in range(30)])
+        course = course_service.create_course(CourseCreate(title="Archived", description="Cold"))
+        start = datetime.now() - timedelta(days=400)
+        stored = [
+            Enrollment(id=str(uuid.uuid4()), user_id=user.id, course_id=course.id, enrolled_date=start + timedelta(days=i), completed=i % 3 != 0)
+            for i, user in enumerate(users)
+        ]
+        enrollments.enrollments.put_many(stored)
+        enrollments.rebuild()
+        return users, course, stored
+
+    def migrate(self, enrollments, cutoff, batch=7):
+        moved = 0
+        while True:
+            archived, done = enrollments.archive_completed(cutoff, batch)
+            moved += archived
+            if done:
+                return moved
+
+    def test_completed_rows_move_and_stay_readable(self, tmp_path):
+        from datetime import timedelta
+        from schemas.models import EnrollmentCreate
+        user_service, course_service, enrollments = self.services(tmp_path)
+        users, course, stored = self.seed(user_service, course_service, enrollments)
+        report = enrollments.course_report(course.id)
+        cutoff = stored[20].enrolled_date + timedelta(hours=1)
+        old = [enrollment for enrollment in stored[:21] if enrollment.completed]
+
+        assert self.migrate(enrollments, cutoff) == len(old)
+        assert self.migrate(enrollments, cutoff) == 0
+        assert len(enrollments.enrollments) == len(stored) - len(old) and len(enrollments.archive) == len(old)
+        assert enrollments.enrollments.get(old[0].id) is None
+        assert enrollments.get_enrollment(old[0].id) == old[0]
+        assert enrollments.get_user_enrollments(old[1].user_id) == [old[1]]
+        assert enrollments.mark_completion(old[2].id) == old[2]
+        assert enrollments.enroll_user(EnrollmentCreate(user_id=old[3].user_id, course_id=course.id)) is None
+        assert enrollments.course_report(course.id) == report
+        assert enrollments.course_reports(since=stored[0].enrolled_date)[0].total == len(stored)
+        assert sorted(e.id for e in enrollments.get_course_enrollments(course.id)) == sorted(e.id for e in stored)
+
+        assert enrollments.delete_enrollment(old[4].id)
+        assert enrollments.get_enrollment(old[4].id) is None
+        assert enrollments.course_report(course.id).total == report.total - 1
+        status = enrollments.tiering_status()
+        assert status.archived_rows == len(old) - 1 and status.archive_bytes > 0 and status.archive_hits > 0
+
+    def test_archived_rows_stay_in_lists_rosters_and_exports(self, tmp_path):
+        from datetime import timedelta
+        from services.pagination import iter_pages
+        user_service, course_service, enrollments = self.services(tmp_path)
+        users, course, stored = self.seed(user_service, course_service, enrollments)
+        roster = enrollments.get_course_users(course.id)
+        archived = next(enrollment for enrollment in stored if enrollment.completed)
+        versions = enrollments.version(f"user:{archived.user_id}"), enrollments.version(f"course:{course.id}")
+
+        assert self.migrate(enrollments, stored[-1].enrolled_date + timedelta(hours=1)) > 0
+        assert enrollments.version(f"user:{archived.user_id}") > versions[0]
+        assert enrollments.version(f"course:{course.id}") > versions[1]
+        expected = sorted(enrollment.id for enrollment in stored)
+        assert sorted(enrollment.id for enrollment in iter_pages(enrollments.list_enrollments, chunk_size=4)) == expected
+        assert sorted(enrollment.id for enrollment in enrollments.get_all_enrollments()) == expected
+        assert sorted(user.id for user in enrollments.get_course_users(course.id)) == sorted(user.id for user in roster)
+
+        user_service.delete_user(archived.user_id)
+        assert archived.user_id not in {enrollment.user_id for enrollment in iter_pages(enrollments.list_enrollments, chunk_size=4)}
+        assert archived.user_id not in {user.id for user in enrollments.get_course_users(course.id)}
+
+    def test_cascades_reach_the_archive(self, tmp_path):
+        from datetime import timedelta
+        user_service, course_service, enrollments = self.services(tmp_path)
+        users, course, stored = self.seed(user_service, course_service, enrollments)
+        self.migrate(enrollments, stored[-1].enrolled_date + timedelta(hours=1))
+        archived = next(enrollment for enrollment in stored if enrollment.completed)
+        user_service.delete_user(archived.user_id)
+        assert enrollments.compactor.drain(5)
+        assert enrollments.get_user_enrollments(archived.user_id) == []
+        assert not enrollments.archive.has_user(archived.user_id)
+
+        course_service.delete_course(course.id)
+        assert enrollments.compactor.drain(5)
+        assert len(enrollments.archive) == 0 and len(enrollments.enrollments) == 0
+        assert enrollments.course_report(course.id).total == 0
+
+    def test_archive_survives_reopen(self, tmp_path):
+        from datetime import timedelta
+        from services.archive import EnrollmentArchive, archive_path, list_archive_segments
+        from services.business_logic import EnrollmentService
+        user_service, course_service, enrollments = self.services(tmp_path)
+        users, course, stored = self.seed(user_service, course_service, enrollments)
+        self.migrate(enrollments, stored[-1].enrolled_date + timedelta(hours=1), batch=4)
+        enrollments.delete_enrollment(stored[1].id)
+        live, report = enrollments.enrollments, enrollments.course_report(course.id)
+        enrollments.stop_tiering()
+        assert len(list_archive_segments(str(tmp_path))) > 1
+
+        last = archive_path(str(tmp_path), list_archive_segments(str(tmp_path))[-1])
+        with open(last, "ab") as file:
+            file.write(b"\x07torn")
+        reopened = EnrollmentService(user_service, course_service, live, archive=EnrollmentArchive(str(tmp_path)))
+        assert reopened.course_report(course.id) == report
+        assert reopened.get_enrollment(stored[1].id) is None
+        assert reopened.get_enrollment(stored[2].id) == stored[2]
+        assert len(reopened.archive) == len([e for e in stored if e.completed]) - 1
+        reopened.archive.close()
+
+    def test_worker_and_status_endpoint(self, tmp_path):
+        from datetime import timedelta
+        user_service, course_service, enrollments = self.services(tmp_path)
+        users, course, stored = self.seed(user_service, course_service, enrollments)
+        enrollments.start_tiering(timedelta(days=1), 5, 3600)
+        try:
+            enrollments.tiering.sweep()
+            status = enrollments.tiering_status()
+            assert status.enabled and status.migrated == len([e for e in stored if e.completed])
+            assert status.sweeps >= 1 and status.error is None
+        finally:
+            enrollments.stop_tiering()
+
+        response = client.get("/maintenance/tiering")
+        assert response.status_code == 200
+        assert response.json()["enabled"] is False and response.json()["live_rows"] >= 0
+
+class TestLookup:
+    def test_lookup_endpoints_return_found_rows_in_order(self):
+        user_ids = [
+            client.post("/users/", json={"name": f"Lookup {i}", "email": f"lookup-{uuid.uuid4()}@example.com"}).json()["id"] for i in range(3)
+        ]
+        response = client.post("/users/lookup", json=[user_ids[2], "missing", user_ids[0], user_ids[2]])
+        assert response.status_code == 200
+        assert [user["id"] for user in response.json()] == [user_ids[2], user_ids[0]]
+
+        course_ids = [client.post("/courses/", json={"title": f"Lookup {i}", "description": "Bulk"}).json()["id"] for i in range(2)]
+        response = client.post("/courses/lookup", json=course_ids[::-1])
+        assert [course["id"] for course in response.json()] == course_ids[::-1]
+        assert client.post("/courses/lookup", json=[]).json() == []
+        assert client.post("/users/lookup", json=["x"] * 10_001).status_code == 413
+
+    def test_expand_embeds_courses(self):
+        user_id = client.post("/users/", json={"name": "Dashboard", "email": f"dash-{uuid.uuid4()}@example.com"}).json()["id"]
+        course_ids = [client.post("/courses/", json={"title": f"Dash {i}", "description": "Expand"}).json()["id"] for i in range(3)]
+        enrollment_ids = [
+            client.post("/enrollments/", json={"user_id": user_id, "course_id": course_id}).json()["id"] for course_id in course_ids
+        ]
+
+        plain = client.get(f"/enrollments/user/{user_id}").json()
+        assert all("course" not in enrollment for enrollment in plain)
+        expanded = client.get(f"/enrollments/user/{user_id}", params={"expand": "course"})
+        assert [enrollment["course"]["id"] for enrollment in expanded.json()] == course_ids
+        assert expanded.json()[0]["course"]["title"] == "Dash 0"
+
+        client.put(f"/courses/{course_ids[0]}", json={"title": "Renamed"})
+        refreshed = client.get(f"/enrollments/user/{user_id}", params={"expand": "course"}, headers={"If-None-Match": expanded.headers["ETag"]})
+        assert refreshed.status_code == 200 and refreshed.json()[0]["course"]["title"] == "Renamed"
+
+        single = client.get(f"/enrollments/{enrollment_ids[1]}", params={"expand": "course"}).json()
+        assert single["id"] == enrollment_ids[1] and single["course"]["id"] == course_ids[1]
+        page = client.get("/enrollments/", params={"expand": "course", "limit": 1000}).json()
+        assert all(enrollment["course"]["id"] == enrollment["course_id"] for enrollment in page)
+        assert client.get(f"/enrollments/user/{user_id}", params={"expand": "user"}).status_code == 422
+
+        paths = client.get("/openapi.json").json()["paths"]
+        expanded_ref = {"$ref": "#/components/schemas/ExpandedEnrollment"}
+        assert expanded_ref in paths["/enrollments/{enrollment_id}"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]["anyOf"]
+        for path in ("/enrollments/", "/enrollments/user/{user_id}"):
+            assert expanded_ref in paths[path]["get"]["responses"]["200"]["content"]["application/json"]["schema"]["items"]["anyOf"]
+
+    def test_single_flight_shares_one_call(self):
+        import asyncio
+        from services.async_services import SingleFlight
+
+        async def scenario():
+            flights, calls, release = SingleFlight(), [], asyncio.Event()
+
+            async def slow():
+                calls.append(1)
+                await release.wait()
+                return ["shared"]
+
+            waiters = [asyncio.ensure_future(flights.run("key", slow)) for _ in range(5)]
+            await asyncio.sleep(0)
+            waiters[0].cancel()
+            release.set()
+            results = await asyncio.gather(*waiters[1:])
+            assert len(calls) == 1 and all(result is results[0] for result in results)
+            assert (flights.leaders, flights.followers) == (1, 4)
+
+            async def failing():
+                raise ValueError("boom")
+
+            for outcome in await asyncio.gather(flights.run("bad", failing), flights.run("bad", failing), return_exceptions=True):
+                assert isinstance(outcome, ValueError)
+            assert await flights.run("key", slow) == ["shared"] and len(calls) == 2
+
+        asyncio.run(scenario())
+
+    def test_concurrent_reads_coalesce_until_a_write(self):
+        import asyncio
+        import time
+        from schemas.models import CourseCreate, CourseUpdate
+        from services.async_services import AsyncCourseService
+        from services.business_logic import CourseService
+
+        class SlowCourses(CourseService):
+            reads = 0
+
+            def get_course(self, course_id):
+                SlowCourses.reads += 1
+                time.sleep(0.2)
+                return super().get_course(course_id)
+
+        courses = SlowCourses()
+        course = courses.create_course(CourseCreate(title="Hot", description="Course"))
+        service = AsyncCourseService(courses, True)
+
+        async def scenario():
+            first = await asyncio.gather(*(service.get_course(course.id) for _ in range(8)))
+            courses.update_course(course.id, CourseUpdate(title="Hotter"))
+            second = await service.get_course(course.id)
+            return first, second
+
+        first, second = asyncio.run(scenario())
+        assert SlowCourses.reads == 2 and {result.title for result in first} == {"Hot"} and second.title == "Hotter"
+        assert service.flights.followers == 7
+        assert AsyncCourseService(courses, True, coalesce=False).flights is None